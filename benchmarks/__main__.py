@@ -0,0 +1,11 @@
+"""
+Runs every benchmark: ``python -m benchmarks``.
+"""
+from __future__ import print_function
+
+from . import bench_indexing, bench_search, bench_serializer
+
+for benchmark in (bench_serializer, bench_indexing, bench_search):
+    print('== {0}'.format(benchmark.__name__))
+    benchmark.main()
+    print()
@@ -0,0 +1,92 @@
+"""
+Benchmark of the indexing paths against a fake ES node: ``save`` overhead
+per indexing mode, and bulk reindexing throughput.
+
+Run it with ``python -m benchmarks.bench_indexing``.
+"""
+from __future__ import print_function
+
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from elastic_django.management.commands.index_models import index_queryset
+from elastic_django.manager import get_client
+from tests.models import Book
+
+from .utils import fake_backend, setup_database
+
+
+def new_book(i):
+    return Book(
+        title='Effective Python {0}'.format(i), author='Brett Slatkin',
+        isbn='9780134034287', publication_year=2015,
+        description='59 Specific Ways to Write Better Python.')
+
+
+def measure_saves(count, auto_index=True, mode='sync'):
+    """
+    :return: Average time of ``save`` calls, in milliseconds.
+    """
+    settings.ELASTICSEARCH_AUTO_INDEX = auto_index
+    settings.ELASTICSEARCH_INDEXING_MODE = mode
+    books = [new_book(i) for i in range(count)]
+
+    start = time.time()
+    if mode == 'on_commit':
+        with transaction.atomic():
+            for book in books:
+                book.save()
+    else:
+        for book in books:
+            book.save()
+    elapsed = time.time() - start
+
+    Book.objects.filter(pk__in=[book.pk for book in books]).delete()
+    return elapsed * 1000 / count
+
+
+def measure_reindex(count):
+    """
+    :return: Throughput of ``index_models`` bulk indexing and of
+    ``index_objects``, in documents per second.
+    """
+    settings.ELASTICSEARCH_AUTO_INDEX = False
+    Book.objects.bulk_create(new_book(i) for i in range(count))
+    client = get_client()
+
+    start = time.time()
+    indexed, errors = index_queryset(
+        client, Book.objects.all(), client.index_name)
+    command = indexed / (time.time() - start)
+    assert (indexed, errors) == (count, 0)
+
+    start = time.time()
+    results = Book.elastic.index_objects(Book.objects.iterator())
+    manager = len(results) / (time.time() - start)
+
+    Book.objects.all().delete()
+    return command, manager
+
+
+def main(saves=2000, documents=20000):
+    setup_database()
+
+    with fake_backend():
+        print('save() overhead ({0} saves)'.format(saves))
+        for label, auto_index, mode in (
+                ('no auto indexing', False, 'sync'),
+                ('sync', True, 'sync'),
+                ('on_commit', True, 'on_commit')):
+            print('  {0:<20}{1:>10.3f} ms/save'.format(
+                label, measure_saves(saves, auto_index, mode)))
+
+        command, manager = measure_reindex(documents)
+        print('Bulk reindex ({0} documents)'.format(documents))
+        print('  {0:<20}{1:>10.0f} docs/s'.format('index_models', command))
+        print('  {0:<20}{1:>10.0f} docs/s'.format('index_objects', manager))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark of search latency against a fake ES node, including the hydration
+of hits into model instances.
+
+The fake node evaluates queries over every document, which is part of the
+latency measured: figures are meant to be compared between runs only.
+
+Run it with ``python -m benchmarks.bench_search``.
+"""
+from __future__ import print_function
+
+from django.conf import settings
+
+from tests.models import Book
+
+from .utils import fake_backend, percentile, setup_database, timings
+
+
+def main(count=1000, repeat=200):
+    setup_database()
+    settings.ELASTICSEARCH_AUTO_INDEX = False
+
+    with fake_backend():
+        Book.objects.bulk_create(
+            Book(title='Effective Python {0}'.format(i),
+                 author='Brett Slatkin', isbn='9780134034287',
+                 publication_year=2015,
+                 description='59 Specific Ways to Write Better Python.')
+            for i in range(count))
+        Book.elastic.index_objects(Book.objects.iterator())
+        book = Book.objects.order_by('pk')[count // 2]
+
+        print('Search latency ({0} documents, {1} runs)'.format(
+            count, repeat))
+        print('{0:<24}{1:>10}{2:>10}'.format('', 'p50 (ms)', 'p95 (ms)'))
+        for label, func in (
+                ('raw search_match', lambda: Book.elastic.search_match(
+                    title='python')),
+                ('search + hydration', lambda: list(
+                    Book.elastic.search(title='python')[:20])),
+                ('get_object', lambda: Book.elastic.get_object(book))):
+            results = timings(func, repeat)
+            print('{0:<24}{1:>10.2f}{2:>10.2f}'.format(
+                label, percentile(results, 0.5), percentile(results, 0.95)))
+
+
+if __name__ == '__main__':
+    main()
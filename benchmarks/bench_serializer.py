@@ -0,0 +1,72 @@
+"""
+Benchmark of ``ElasticModel.elastic_serializer`` against the former Django
+serializer based implementation (JSON encoding plus decoding round trip).
+
+Run it with ``python -m benchmarks.bench_serializer``.
+"""
+from __future__ import print_function
+
+import json
+import timeit
+
+from django.core import serializers
+
+from tests.models import Book, BookExclusion, BookSelection
+
+
+def django_serializer(obj):
+    """
+    Former ``elastic_serializer`` implementation.
+    """
+    if obj._meta.elastic_fields:
+        data = serializers.serialize(
+            'json', [obj], fields=obj._meta.elastic_fields)
+    elif obj._meta.elastic_exclude:
+        fields = [field.name for field in obj._meta.fields
+                  if field.name not in obj._meta.elastic_exclude]
+        data = serializers.serialize('json', [obj], fields=fields)
+    else:
+        data = serializers.serialize('json', [obj])
+
+    data = json.loads(data)
+    doc = data[0]['fields']
+    doc.update({'pk': data[0]['pk']})
+
+    return doc
+
+
+def make_objects(model, count):
+    return [
+        model(
+            pk=i, title='Effective Python', author='Brett Slatkin',
+            isbn='9780134034287', publication_year=2015,
+            description='59 Specific Ways to Write Better Python.')
+        for i in range(1, count + 1)
+    ]
+
+
+def measure(func, objects, repeat=5):
+    """
+    :return: Best serialization throughput, in objects per second.
+    """
+    best = min(timeit.repeat(
+        lambda: [func(obj) for obj in objects], number=1, repeat=repeat))
+    return len(objects) / best
+
+
+def main(count=5000):
+    print('{0:<16}{1:>18}{2:>18}{3:>10}'.format(
+        'model', 'django (obj/s)', 'compiled (obj/s)', 'speedup'))
+    for model in (Book, BookSelection, BookExclusion):
+        objects = make_objects(model, count)
+        assert [django_serializer(obj) for obj in objects[:10]] == \
+            [obj.elastic_serializer() for obj in objects[:10]]
+
+        before = measure(django_serializer, objects)
+        after = measure(lambda obj: obj.elastic_serializer(), objects)
+        print('{0:<16}{1:>18.0f}{2:>18.0f}{3:>9.1f}x'.format(
+            model.__name__, before, after, after / before))
+
+
+if __name__ == '__main__':
+    main()
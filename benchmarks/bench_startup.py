@@ -0,0 +1,58 @@
+"""
+Benchmark of the time spent importing ``ElasticModel`` models at process
+start up, with the ES backend unreachable.
+
+Managers used to connect to the ES backend when models were defined, so the
+former import cost was the import itself plus an ``ElasticsearchClient``
+creation, which is measured as well.
+
+Run it with ``python -m benchmarks.bench_startup``.
+"""
+from __future__ import print_function
+
+import subprocess
+import sys
+
+IMPORT_SCRIPT = """
+import time
+start = time.time()
+import tests.models
+print(time.time() - start)
+"""
+
+CONNECT_SCRIPT = """
+import time
+import tests.models
+from elastic_django.client import ElasticsearchClient
+start = time.time()
+try:
+    ElasticsearchClient()
+except Exception:
+    pass
+print(time.time() - start)
+"""
+
+
+def measure(script, repeat=3):
+    """
+    :return: Best time, in seconds, reported by the given script when run in
+    a brand new interpreter.
+    """
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, '-c', script], stderr=subprocess.DEVNULL)
+        timings.append(float(output.decode().split()[-1]))
+    return min(timings)
+
+
+def main():
+    imported = measure(IMPORT_SCRIPT)
+    connected = measure(CONNECT_SCRIPT)
+    print('Import of models (lazy connection):  {0:.3f}s'.format(imported))
+    print('Import of models (eager connection): {0:.3f}s'.format(
+        imported + connected))
+
+
+if __name__ == '__main__':
+    main()
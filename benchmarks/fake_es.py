@@ -0,0 +1,253 @@
+"""
+In-process stand-in for the ES HTTP API, so benchmarks need no ES cluster.
+
+It implements just what elastic-django uses (ping, single document
+operations, ``_bulk``, ``_mget``, ``_search`` with ``match``/``bool``
+queries, index creation and refresh), keeping documents in memory. Requests
+go through the actual HTTP client stack, so client side costs (connection
+pool, JSON encoding, bulk bodies) are part of the measures.
+
+Usage::
+
+    with FakeElasticsearch() as es:
+        settings.ELASTICSEARCH_HOSTS = es.hosts
+        ...
+"""
+import json
+import re
+import threading
+
+from django.utils.six.moves import BaseHTTPServer, socketserver
+from django.utils.six.moves.urllib.parse import urlsplit
+
+
+class FakeIndex(object):
+    def __init__(self):
+        self.docs = {}
+        self.versions = {}
+
+    def put(self, doc_type, doc_id, source):
+        key = (doc_type, doc_id)
+        created = key not in self.docs
+        self.docs[key] = source
+        self.versions[key] = self.versions.get(key, 0) + 1
+        return created, self.versions[key]
+
+
+def _matches(query, source):
+    """
+    Poor man's query evaluation: ``match`` queries look for any of the query
+    words in the field value, case insensitively.
+    """
+    if not query or 'match_all' in query:
+        return True
+    if 'match' in query:
+        field, value = list(query['match'].items())[0]
+        if isinstance(value, dict):
+            value = value.get('query', '')
+        text = '{0}'.format(source.get(field, '')).lower()
+        return any(
+            word in text for word in '{0}'.format(value).lower().split())
+    if 'bool' in query:
+        should = query['bool'].get('should', [])
+        must = query['bool'].get('must', [])
+        return all(_matches(q, source) for q in must) and (
+            not should or any(_matches(q, source) for q in should))
+    return True
+
+
+class FakeElasticsearchHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Responses are written in two parts (headers and body): avoid waiting
+    # for delayed ACKs in between.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def indices(self):
+        return self.server.indices
+
+    def reply(self, status, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length).decode('utf-8') if length else ''
+
+    def handle_request(self):
+        path = [part for part in urlsplit(self.path).path.split('/') if part]
+        raw = self.read_body()
+        with self.server.lock:
+            status, body = self.route(self.command, path, raw)
+        self.reply(status, body)
+
+    do_GET = do_PUT = do_POST = do_DELETE = do_HEAD = handle_request
+
+    def route(self, method, path, raw):
+        if not path:
+            return 200, {'version': {'number': '6.8.0'}}
+        if path[-1] == '_bulk':
+            return self.bulk(raw)
+        if path[-1] == '_mget':
+            return self.mget(json.loads(raw))
+        if path[-1] == '_search':
+            return self.search(path[0], json.loads(raw) if raw else {})
+        if path[-1] == '_update':
+            return self.update(path[0], path[1], path[2], json.loads(raw))
+        if path[-1] == '_refresh':
+            return 200, {'_shards': {'total': 1, 'successful': 1}}
+
+        index_name = path[0]
+        if len(path) == 1:
+            if method == 'HEAD':
+                return (200 if index_name in self.indices else 404), None
+            if method == 'PUT':
+                self.indices.setdefault(index_name, FakeIndex())
+                return 200, {'acknowledged': True, 'index': index_name}
+            if method == 'DELETE':
+                self.indices.pop(index_name, None)
+                return 200, {'acknowledged': True}
+
+        if len(path) == 3:
+            doc_type, doc_id = path[1], path[2]
+            if method in ('PUT', 'POST'):
+                return self.index(
+                    index_name, doc_type, doc_id, json.loads(raw))
+            if method == 'GET':
+                return self.get(index_name, doc_type, doc_id)
+            if method == 'DELETE':
+                return self.delete(index_name, doc_type, doc_id)
+
+        return 400, {'error': 'Unsupported request', 'status': 400}
+
+    def index(self, index_name, doc_type, doc_id, source):
+        index = self.indices.setdefault(index_name, FakeIndex())
+        created, version = index.put(doc_type, doc_id, source)
+        return (201 if created else 200), {
+            '_index': index_name, '_type': doc_type, '_id': doc_id,
+            '_version': version, 'result': 'created' if created else 'updated',
+        }
+
+    def update(self, index_name, doc_type, doc_id, body):
+        status, current = self.get(index_name, doc_type, doc_id)
+        if status == 404:
+            current.update({'error': 'document_missing_exception'})
+            return 404, current
+        source = dict(current['_source'], **body.get('doc', {}))
+        return self.index(index_name, doc_type, doc_id, source)
+
+    def get(self, index_name, doc_type, doc_id):
+        index = self.indices.get(index_name)
+        source = index.docs.get((doc_type, doc_id)) if index else None
+        doc = {'_index': index_name, '_type': doc_type, '_id': doc_id}
+        if source is None:
+            doc['found'] = False
+            return 404, doc
+        doc.update({
+            'found': True, '_source': source,
+            '_version': index.versions[(doc_type, doc_id)]})
+        return 200, doc
+
+    def delete(self, index_name, doc_type, doc_id):
+        index = self.indices.get(index_name)
+        found = index is not None and \
+            index.docs.pop((doc_type, doc_id), None) is not None
+        return (200 if found else 404), {
+            '_index': index_name, '_type': doc_type, '_id': doc_id,
+            'result': 'deleted' if found else 'not_found'}
+
+    def bulk(self, raw):
+        lines = [line for line in raw.split('\n') if line.strip()]
+        items = []
+        i = 0
+        while i < len(lines):
+            action = json.loads(lines[i])
+            op_type, meta = list(action.items())[0]
+            i += 1
+            if op_type == 'delete':
+                status, result = self.delete(
+                    meta['_index'], meta['_type'], '{0}'.format(meta['_id']))
+            else:
+                source = json.loads(lines[i])
+                i += 1
+                operation = self.update if op_type == 'update' else self.index
+                status, result = operation(
+                    meta['_index'], meta['_type'], '{0}'.format(meta['_id']),
+                    source)
+            result['status'] = status
+            items.append({op_type: result})
+        return 200, {'took': 1, 'errors': False, 'items': items}
+
+    def mget(self, body):
+        return 200, {'docs': [
+            self.get(doc['_index'], doc['_type'], '{0}'.format(doc['_id']))[1]
+            for doc in body['docs']]}
+
+    def search(self, index_name, body):
+        names = [
+            name for name in self.indices
+            if any(re.match(pattern.replace('*', '.*') + '$', name)
+                   for pattern in index_name.split(','))]
+        query = body.get('query')
+        start, size = body.get('from', 0), body.get('size', 10)
+
+        # Only the hits of the requested page are built.
+        total, hits = 0, []
+        for name in names:
+            for (doc_type, doc_id), source in self.indices[name].docs.items():
+                if not _matches(query, source):
+                    continue
+                if start <= total < start + size:
+                    hits.append({
+                        '_index': name, '_type': doc_type, '_id': doc_id,
+                        '_score': 1.0, '_source': source})
+                total += 1
+
+        return 200, {
+            'took': 1, 'timed_out': False,
+            'hits': {'total': total, 'max_score': 1.0, 'hits': hits},
+        }
+
+
+class FakeElasticsearch(socketserver.ThreadingMixIn,
+                        BaseHTTPServer.HTTPServer):
+    """
+    Fake ES node listening on a random local port, served by a background
+    thread.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(
+            self, ('127.0.0.1', 0), FakeElasticsearchHandler)
+        self.indices = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def hosts(self):
+        return [{'host': '127.0.0.1', 'port': self.server_address[1]}]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,56 @@
+"""
+Helpers shared by the benchmarks.
+"""
+from __future__ import print_function
+
+import contextlib
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from elastic_django import manager
+
+from .fake_es import FakeElasticsearch
+
+
+def setup_database():
+    """
+    Creates the tables of the test models in the (in-memory) test DB.
+    """
+    connection.creation.create_test_db(verbosity=0)
+
+
+@contextlib.contextmanager
+def fake_backend():
+    """
+    Context manager pointing elastic-django to a brand new fake ES node.
+    """
+    with FakeElasticsearch() as es:
+        hosts = settings.ELASTICSEARCH_HOSTS
+        settings.ELASTICSEARCH_HOSTS = es.hosts
+        # Connect to the fake node on first use.
+        manager._client = None
+        try:
+            yield es
+        finally:
+            settings.ELASTICSEARCH_HOSTS = hosts
+            manager._client = None
+
+
+def timings(func, repeat):
+    """
+    :return: Sorted list of the wall times of ``repeat`` calls to ``func``,
+    in milliseconds.
+    """
+    result = []
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        result.append((time.time() - start) * 1000)
+    return sorted(result)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(
+        len(sorted_values) - 1, int(len(sorted_values) * fraction))]
@@ -0,0 +1,298 @@
+import asyncio
+import logging
+import time
+import weakref
+
+from django.conf import settings
+
+from elasticsearch.helpers import expand_action
+
+from .cache import (
+    DocumentCache, get_document_cache, get_search_cache,
+    get_search_cache_timeout, invalidate_searches, search_key)
+from .exceptions import ElasticsearchClientConfigurationError
+from .manager import ElasticManager, chunked
+from .signals import instrumented_connection_class, measure
+
+
+# Async ES clients, one per event loop (their connections are bound to it).
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _async_client_class():
+    """
+    :return: The async ES client class, and its default connection class.
+    """
+    try:
+        # elasticsearch-py >= 7.8, with aiohttp installed.
+        from elasticsearch import AIOHttpConnection, AsyncElasticsearch
+    except ImportError:
+        try:
+            # elasticsearch-async package, for elasticsearch-py 6.x. It fails
+            # to import on Python 3.11+ (no ``asyncio.coroutine``).
+            from elasticsearch_async import AsyncElasticsearch
+            from elasticsearch_async.connection import AIOHttpConnection
+        except (ImportError, AttributeError):
+            raise ElasticsearchClientConfigurationError(
+                'Async operations require elasticsearch-py>=7.8 with aiohttp, '
+                'or elasticsearch-async package, to be installed.')
+    return AsyncElasticsearch, AIOHttpConnection
+
+
+def get_async_client():
+    """
+    Returns the async ES client of the running event loop, created on first
+    use with ``ELASTICSEARCH_HOSTS`` and ``ELASTICSEARCH_CONNECTION_OPTIONS``
+    settings.
+
+    Unlike ``get_client``, the ES backend is not pinged on creation, which
+    would need to wait for it.
+    """
+    loop = asyncio.get_event_loop()
+    if loop not in _async_clients:
+        hosts = getattr(settings, 'ELASTICSEARCH_HOSTS', None) or [
+            {'host': 'localhost', 'port': '9200'}]
+        options = dict(
+            getattr(settings, 'ELASTICSEARCH_CONNECTION_OPTIONS', None) or {})
+        client_class, connection_class = _async_client_class()
+        options['connection_class'] = instrumented_connection_class(
+            options.get('connection_class', connection_class))
+        _async_clients[loop] = client_class(hosts=hosts, **options)
+
+    return _async_clients[loop]
+
+
+def _caches_block():
+    """
+    Whether the search or document caches are backed by a Django cache, whose
+    calls block (e.g. on a network round trip to memcached).
+    """
+    document_cache = get_document_cache()
+    return get_search_cache() is not None or (
+        document_cache is not None and document_cache.shared is not None)
+
+
+async def close_async_client():
+    """
+    Closes the async ES client of the running event loop, if any.
+    """
+    client = _async_clients.pop(asyncio.get_event_loop(), None)
+    if client is not None:
+        if hasattr(client, 'close'):
+            await client.close()
+        else:
+            await client.transport.close()
+
+
+class AsyncElasticManager(ElasticManager):
+    """
+    ``ElasticManager`` extended with coroutine counterparts of its operations,
+    prefixed with ``a`` (e.g. ``aindex_object``), which send their requests
+    with an asyncio ES client instead of blocking the event loop.
+
+    DB queries involved (e.g. to turn search hits into model instances) are
+    run in a thread, as Django's ORM is synchronous.
+    """
+    @property
+    def _async_connection(self):
+        return get_async_client()
+
+    async def _run_serializing(self, func, *args):
+        # Values of many to many relations are queried from DB.
+        if self.model is not None and \
+                not self.model._meta.document_serializer.queries_db:
+            return func(*args)
+
+        from asgiref.sync import sync_to_async
+        return await sync_to_async(func)(*args)
+
+    async def _run_caching(self, func, *args):
+        # The per-process LRU of documents doesn't block, Django caches do.
+        if not _caches_block():
+            return func(*args)
+
+        from asgiref.sync import sync_to_async
+        return await sync_to_async(func)(*args)
+
+    async def aindex_object(self, obj):
+        """
+        Indexes a single Django ``models.Model`` object in the ES backend.
+        """
+        index_name = self.get_index_name(obj)
+        doc_type = obj.__class__.__name__
+
+        start = time.time()
+        body = await self._run_serializing(obj.elastic_serializer)
+
+        with measure(obj.__class__, 'index', index_name,
+                     serialization_time=time.time() - start) as request:
+            response = request.response = await self._async_connection.index(
+                index=index_name,
+                doc_type=doc_type,
+                body=body,
+                id=obj.pk
+            )
+
+        await self._run_caching(invalidate_searches, index_name)
+        await self._run_caching(
+            self.cache_document, index_name, doc_type, obj.pk, body, response)
+
+        if settings.DEBUG:
+            logging.debug("Indexed object '{0}' with PK '{1}' in '{2}'".format(
+                obj.__class__.__name__, obj.pk, index_name))
+
+    async def aupdate_object(self, obj, doc):
+        """
+        Updates some fields of the document of a Django ``models.Model``
+        object in the ES backend.
+        """
+        index_name = self.get_index_name(obj)
+
+        with measure(obj.__class__, 'update', index_name) as request:
+            request.response = await self._async_connection.update(
+                index=index_name,
+                doc_type=obj.__class__.__name__,
+                body={'doc': doc},
+                id=obj.pk
+            )
+
+        await self._run_caching(invalidate_searches, index_name)
+        await self._run_caching(self.evict_object, obj)
+
+    async def aremove_object(self, obj):
+        """
+        Removes an object from the ES backend index.
+        """
+        index_name = self.get_index_name(obj)
+
+        with measure(obj.__class__, 'delete', index_name) as request:
+            request.response = await self._async_connection.delete(
+                index=index_name,
+                doc_type=obj.__class__.__name__,
+                id=obj.pk
+            )
+
+        await self._run_caching(invalidate_searches, index_name)
+        await self._run_caching(self.evict_object, obj)
+
+    async def aget_object(self, obj):
+        """
+        Retrieves a specific object via its ``Model.pk`` from the ES backend.
+        """
+        cache = get_document_cache()
+        if cache is not None:
+            key = self.document_key(obj)
+            doc = await self._run_caching(cache.get, key)
+            if doc is not None:
+                return doc
+
+        index_name = self.get_index_name(obj)
+        with measure(obj.__class__, 'get', index_name) as request:
+            doc = request.response = await self._async_connection.get(
+                index=index_name,
+                doc_type=obj.__class__.__name__,
+                id=obj.pk
+            )
+
+        if cache is not None:
+            await self._run_caching(cache.set, key, doc)
+
+        return doc
+
+    async def abulk(self, actions, chunk_size=500):
+        """
+        Sends the given ``_bulk`` API actions to the ES backend, in requests of
+        ``chunk_size`` actions at most.
+
+        Failures don't stop the process: they are reported with the results.
+
+        :return: A list with a ``(success, item)`` tuple per action, in the
+        same order as the actions.
+        """
+        results = []
+        indices = set()
+        keys = []
+        for chunk in chunked(actions, chunk_size):
+            body = []
+            chunk_indices = set()
+            for action in chunk:
+                chunk_indices.add(action.get('_index'))
+                keys.append(DocumentCache.key(
+                    action.get('_index'), action.get('_type'),
+                    action.get('_id')))
+                op, source = expand_action(action)
+                body.append(op)
+                if source is not None:
+                    body.append(source)
+
+            chunk_indices.discard(None)
+            indices.update(chunk_indices)
+
+            with measure(self.model, 'bulk', ','.join(sorted(chunk_indices)),
+                         docs=len(chunk)) as request:
+                response = request.response = \
+                    await self._async_connection.bulk(body=body)
+
+                for item in response['items']:
+                    result = list(item.values())[0]
+                    ok = 200 <= result.get('status', 500) < 300
+                    results.append((ok, item))
+                    request.failed += not ok
+
+        await self._run_caching(invalidate_searches, *indices)
+
+        cache = get_document_cache()
+        if cache is not None:
+            await self._run_caching(cache.delete, *keys)
+
+        return results
+
+    async def aindex_objects(self, objs, chunk_size=500):
+        """
+        Indexes several Django ``models.Model`` objects in the ES backend,
+        using as many ``_bulk`` requests as needed.
+        """
+        actions = await self._run_serializing(
+            lambda: [self.index_action(obj) for obj in objs])
+        return await self.abulk(actions, chunk_size=chunk_size)
+
+    async def aremove_objects(self, objs, chunk_size=500):
+        """
+        Removes several objects from the ES backend index, using as many
+        ``_bulk`` requests as needed.
+        """
+        return await self.abulk(
+            [self.delete_action(obj) for obj in objs], chunk_size=chunk_size)
+
+    async def asearch(self, query=None, index=None, start=0, size=20,
+                      **fields):
+        """
+        Searches the documents of the model the manager is bound to.
+
+        Unlike ``search``, results are not lazy: a single page of ``size``
+        hits from ``start`` is retrieved, and returned as a list of model
+        instances, in ES score order.
+        """
+        from asgiref.sync import sync_to_async
+
+        results = self.search(query, index=index, page_size=size, **fields)
+        doc_type = self.model.__name__
+        body = {'query': results.query, 'from': start, 'size': size}
+
+        cache, key, response = get_search_cache(), None, None
+        if cache is not None:
+            # Django caches are synchronous.
+            key = await sync_to_async(search_key)(
+                cache, results.index, doc_type, body, {})
+            response = await sync_to_async(cache.get)(key)
+
+        if response is None:
+            with measure(self.model, 'search', results.index) as request:
+                response = request.response = \
+                    await self._async_connection.search(
+                        index=results.index, doc_type=doc_type, body=body)
+            if key is not None:
+                await sync_to_async(cache.set)(
+                    key, response, get_search_cache_timeout())
+
+        return await sync_to_async(results.hydrate)(response['hits']['hits'])
@@ -0,0 +1,243 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+KEY_PREFIX = 'elastic-django'
+
+# Pseudo index standing for searches over every index.
+ALL_INDICES = '_all'
+
+
+def get_search_cache():
+    """
+    Django cache where search responses are kept, as per
+    ``ELASTICSEARCH_SEARCH_CACHE`` setting (a cache alias), if any.
+    """
+    alias = getattr(settings, 'ELASTICSEARCH_SEARCH_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def get_search_cache_timeout():
+    """
+    Seconds search responses are kept, from
+    ``ELASTICSEARCH_SEARCH_CACHE_TIMEOUT`` setting.
+    """
+    return getattr(settings, 'ELASTICSEARCH_SEARCH_CACHE_TIMEOUT', 10)
+
+
+def _generation_key(index):
+    return '{0}:generation:{1}'.format(KEY_PREFIX, index)
+
+
+def _search_indices(index):
+    """
+    Indices whose changes are relevant for a search.
+    """
+    indices = sorted(set((index or ALL_INDICES).split(',')))
+    if ALL_INDICES in indices or any('*' in name for name in indices):
+        # Changes of any index are relevant.
+        return [ALL_INDICES]
+    return indices
+
+
+def _generations(cache, indices):
+    """
+    Current generation of every index, i.e. a token changed every time the
+    documents of the index change.
+    """
+    keys = [_generation_key(index) for index in indices]
+    generations = cache.get_many(keys)
+
+    for key in keys:
+        if key not in generations:
+            generation = uuid.uuid4().hex
+            # Another process may have set it meanwhile.
+            if not cache.add(key, generation, None):
+                generation = cache.get(key, generation)
+            generations[key] = generation
+
+    return [generations[key] for key in keys]
+
+
+def search_key(cache, index, doc_type, body, params):
+    """
+    Cache key of a search request. Keys include the generation of every index
+    searched, so they change once the documents of any of them change.
+    """
+    names = sorted(set((index or ALL_INDICES).split(',')))
+    request = json.dumps(
+        [names, doc_type, body, params], sort_keys=True,
+        separators=(',', ':'), default=str)
+
+    generations = _generations(cache, _search_indices(index))
+
+    return '{0}:search:{1}'.format(KEY_PREFIX, hashlib.sha1(
+        ':'.join(generations + [request]).encode('utf-8')).hexdigest())
+
+
+def cached_search(search, index, doc_type, body, params):
+    """
+    Runs a search request through the search cache, if enabled.
+
+    :param search: Function sending the request to the ES backend.
+    :return: The raw ES backend response.
+    """
+    cache = get_search_cache()
+    if cache is None or 'scroll' in params:
+        return search()
+
+    key = search_key(cache, index, doc_type, body, params)
+    response = cache.get(key)
+    if response is None:
+        response = search()
+        cache.set(key, response, get_search_cache_timeout())
+
+    return response
+
+
+def invalidate_searches(*indices):
+    """
+    Discards the cached search responses involving any of the given indices.
+
+    Documents are searchable only after the next index refresh, so responses
+    cached meanwhile may still be stale, until they time out.
+    """
+    cache = get_search_cache()
+    if cache is None or not indices:
+        return
+
+    cache.set_many(dict(
+        (_generation_key(index), uuid.uuid4().hex)
+        for index in set(indices) | set([ALL_INDICES])), None)
+
+
+class DocumentCache(object):
+    """
+    Cache of ES documents, as returned by the ``get`` API, keyed by index,
+    document type and id.
+
+    Documents are kept in a per-process LRU of ``max_size`` documents at most,
+    backed by a Django cache shared by several processes, if given. Both
+    keep documents for ``timeout`` seconds at most (forever if ``None``), as
+    other processes may change them meanwhile. Number of hits and misses are
+    counted, per process.
+
+    Documents are copied in and out, so callers may change them freely.
+    """
+    def __init__(self, max_size=1000, shared=None, timeout=60):
+        self.max_size = max_size
+        self.shared = shared
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._docs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(index, doc_type, pk):
+        return '{0}:doc:{1}:{2}:{3}'.format(KEY_PREFIX, index, doc_type, pk)
+
+    def _set_local(self, key, doc):
+        if self.max_size <= 0:
+            return
+        expires = None
+        if self.timeout is not None:
+            expires = time.time() + self.timeout
+        with self._lock:
+            self._docs.pop(key, None)
+            self._docs[key] = (expires, doc)
+            while len(self._docs) > self.max_size:
+                self._docs.popitem(last=False)
+
+    def get(self, key):
+        """
+        :return: The cached document, or ``None``.
+        """
+        with self._lock:
+            entry = self._docs.pop(key, None)
+            if entry is not None and (
+                    entry[0] is None or entry[0] > time.time()):
+                # Most recently used go last.
+                self._docs[key] = entry
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+
+        if self.shared is not None:
+            doc = self.shared.get(key)
+            if doc is not None:
+                self._set_local(key, doc)
+                with self._lock:
+                    self.hits += 1
+                return copy.deepcopy(doc)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, doc):
+        doc = copy.deepcopy(doc)
+        self._set_local(key, doc)
+        if self.shared is not None:
+            self.shared.set(key, doc, self.timeout)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._docs.pop(key, None)
+        if self.shared is not None and keys:
+            self.shared.delete_many(keys)
+
+    def clear(self):
+        """
+        Empties the per-process cache, and resets the counters.
+        """
+        with self._lock:
+            self._docs.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """
+        :return: A ``dict`` with the number of ``hits``, ``misses`` and
+        documents in the per-process cache (``size``).
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._docs)}
+
+
+_document_cache = None
+_document_cache_config = None
+
+
+def get_document_cache():
+    """
+    Cache of the documents retrieved by ``get_object`` in this process, if
+    enabled with ``ELASTICSEARCH_DOCUMENT_CACHE_SIZE`` (per-process LRU size)
+    and/or ``ELASTICSEARCH_DOCUMENT_CACHE`` (alias of a shared Django cache)
+    settings. Documents are kept for
+    ``ELASTICSEARCH_DOCUMENT_CACHE_TIMEOUT`` seconds.
+    """
+    global _document_cache, _document_cache_config
+
+    config = (
+        getattr(settings, 'ELASTICSEARCH_DOCUMENT_CACHE_SIZE', 0),
+        getattr(settings, 'ELASTICSEARCH_DOCUMENT_CACHE', None),
+        getattr(settings, 'ELASTICSEARCH_DOCUMENT_CACHE_TIMEOUT', 60),
+    )
+    if config != _document_cache_config:
+        size, alias, timeout = config
+        if size or alias:
+            _document_cache = DocumentCache(
+                max_size=size, shared=caches[alias] if alias else None,
+                timeout=timeout)
+        else:
+            _document_cache = None
+        _document_cache_config = config
+
+    return _document_cache
@@ -1,11 +1,15 @@
 import logging
 
 from django.conf import settings
+from django.utils import six
+from django.utils.module_loading import import_string
 
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, Urllib3HttpConnection
+from elasticsearch.exceptions import TransportError
 from elasticsearch.transport import Transport
 
 from .exceptions import ElasticsearchClientConfigurationError
+from .signals import instrumented_connection_class
 
 
 class ElasticsearchClient(object):
@@ -26,9 +30,13 @@ class ElasticsearchClient(object):
                     },
                 ]``
         :param transport_class: The ``elasticsearch.transport.Transport``
-        subclass to be used, if any.
+        subclass to be used, if any. Defaults to the one specified (as a
+        class or a dotted path) in ``ELASTICSEARCH_TRANSPORT_CLASS`` setting.
         :param kwargs: Additional parameters to be passed to ``Transport``
-        class instance.
+        class instance, and to its connections. They take precedence over
+        the ones in ``ELASTICSEARCH_CONNECTION_OPTIONS`` setting, e.g.
+        ``{'maxsize': 25, 'http_compress': True, 'timeout': 30,
+        'retry_on_timeout': True, 'sniff_on_start': True}``.
         """
         # Sanity checks.
         if hosts:
@@ -48,13 +56,32 @@ class ElasticsearchClient(object):
                 self.hosts = [{'host': 'localhost', 'port': '9200'}]
 
         if not transport_class:
-            self.transport = Transport
+            transport_class = getattr(
+                settings, 'ELASTICSEARCH_TRANSPORT_CLASS', None) or Transport
+        if isinstance(transport_class, six.string_types):
+            try:
+                transport_class = import_string(transport_class)
+            except ImportError as e:
+                raise ElasticsearchClientConfigurationError(e)
+        self.transport = transport_class
+
+        options = dict(
+            getattr(settings, 'ELASTICSEARCH_CONNECTION_OPTIONS', None) or {})
+        options.update(kwargs)
+        # Request sizes and retries are counted by the connections.
+        options['connection_class'] = instrumented_connection_class(
+            options.get('connection_class', Urllib3HttpConnection))
 
-        self.connection = Elasticsearch(
-            hosts=self.hosts, transport_class=self.transport, **kwargs)
+        try:
+            self.connection = Elasticsearch(
+                hosts=self.hosts, transport_class=self.transport, **options)
+            # Check connection before continuing.
+            connected = self.connection.ping()
+        except TransportError as e:
+            # Sniffing on start may fail already.
+            raise ElasticsearchClientConfigurationError(e)
 
-        # Check connection before continuing.
-        if not self.connection.ping():
+        if not connected:
             raise ElasticsearchClientConfigurationError(
                 'Elasticsearch backend unreachable. Check host configuration.')
         else:
@@ -0,0 +1,105 @@
+"""
+Dumps of the contents of an index: NDJSON files, gzip compressed if their
+name ends with ``.gz``.
+
+The first line is a header with the name, the mappings and the settings
+needed to recreate the dumped index (its analysis and number of shards),
+followed by a line per document, with its ``_type``, ``_id`` and
+``_source``.
+"""
+import gzip
+import io
+import json
+import os
+
+from elasticsearch.exceptions import NotFoundError
+
+from .indices import get_index_settings
+
+
+def _open(path, mode, compressed=None):
+    if compressed is None:
+        compressed = path.endswith('.gz')
+    if compressed:
+        return io.TextIOWrapper(gzip.open(path, mode + 'b'), encoding='utf-8')
+    return io.open(path, mode, encoding='utf-8')
+
+
+def _line(data):
+    return json.dumps(data, separators=(',', ':')) + '\n'
+
+
+def get_index_mappings(connection, index):
+    """
+    :return: The mappings of an index (or the index an alias points to).
+    """
+    response = connection.indices.get_mapping(index=index)
+    for index_data in response.values():
+        return index_data.get('mappings', {})
+    raise NotFoundError(404, 'index_not_found_exception', index)
+
+
+def dump(manager, path, index, page_size=1000):
+    """
+    Streams all the documents of an index into a dump file, a page of hits at
+    a time (with the scroll API), so memory usage is bounded by
+    ``page_size``.
+
+    The dump is written into a temporary file, renamed once complete.
+
+    :param manager: ``ElasticManager`` to scan the index with.
+    :return: Number of documents dumped.
+    """
+    connection = manager._connection
+    header = {
+        'index': index,
+        'mappings': get_index_mappings(connection, index),
+        'settings': get_index_settings(connection, index),
+    }
+
+    count = 0
+    partial_path = path + '.partial'
+    try:
+        with _open(partial_path, 'w', path.endswith('.gz')) as output:
+            output.write(_line(header))
+            for hits in manager.scan_pages(index=index, page_size=page_size):
+                output.write(''.join(
+                    _line({
+                        '_type': hit['_type'],
+                        '_id': hit['_id'],
+                        '_source': hit['_source'],
+                    }) for hit in hits))
+                count += len(hits)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    os.rename(partial_path, path)
+    return count
+
+
+def read_header(path):
+    """
+    :return: The header of a dump file, as a ``dict`` with the ``index`` name,
+    its ``mappings`` and its ``settings`` (missing in older dumps).
+    """
+    with _open(path, 'r') as dump_file:
+        return json.loads(dump_file.readline())
+
+
+def read_actions(path, index):
+    """
+    Streams the documents of a dump file as ``_bulk`` API actions indexing
+    them into the given index, a line at a time.
+
+    :return: A generator of actions.
+    """
+    with _open(path, 'r') as dump_file:
+        dump_file.readline()
+        for line in dump_file:
+            if not line.strip():
+                continue
+            doc = json.loads(line)
+            doc['_index'] = index
+            yield doc
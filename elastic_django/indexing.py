@@ -0,0 +1,323 @@
+import atexit
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.six.moves import queue
+
+from elasticsearch.exceptions import ConnectionError
+
+from . import outbox
+from .exceptions import ElasticsearchClientNotConnectedError
+from .manager import ElasticManager
+
+# Indexing operations are sent to the ES backend right away.
+SYNC = 'sync'
+# Indexing operations within DB transactions are sent in bulk on commit.
+ON_COMMIT = 'on_commit'
+# Indexing operations are sent in bulk by background threads.
+ASYNC = 'async'
+# Indexing operations are stored in the outbox, to be replayed later on.
+OUTBOX = 'outbox'
+
+INDEXING_MODES = (SYNC, ON_COMMIT, ASYNC, OUTBOX)
+
+# Errors meaning that the ES backend can't be reached at all.
+UNAVAILABLE_ERRORS = (ElasticsearchClientNotConnectedError, ConnectionError)
+
+elastic = ElasticManager()
+
+_buffers = threading.local()
+
+_async_indexer = None
+_async_indexer_pid = None
+_async_indexer_lock = threading.Lock()
+
+# Signals worker threads to exit.
+_STOP = object()
+
+
+def get_indexing_mode():
+    """
+    Indexing mode configured in ``ELASTICSEARCH_INDEXING_MODE`` setting.
+    """
+    return getattr(settings, 'ELASTICSEARCH_INDEXING_MODE', SYNC)
+
+
+class IndexingBuffer(object):
+    """
+    Indexing operations pending on the ongoing transaction of a database.
+
+    Every operation is confirmed by an ``on_commit`` hook, so operations of
+    rolled back transactions, or savepoints, are discarded along with their
+    hooks. Confirmed operations are deduplicated by object (the last one
+    wins) and sent to the ES backend in a single ``_bulk`` request, by the
+    last hook run on commit, unless operations were queued within savepoints
+    after the last operation of an enclosing block: as their savepoints may
+    be rolled back, their operations are sent in additional requests.
+    """
+    def __init__(self, using):
+        self.using = using
+        self.hooks = itertools.count()
+        # Savepoint ids the hooks sending the operations confirmed so far
+        # were registered within, per hook number.
+        self.senders = {}
+        # Confirmed operations per `(index, doc type, id)`.
+        self.confirmed = OrderedDict()
+
+    def add(self, action):
+        """
+        Queues a ``_bulk`` API action until the transaction is committed.
+        """
+        savepoint_ids = tuple(
+            transaction.get_connection(self.using).savepoint_ids)
+
+        # Hooks registered within the same savepoints, or nested ones, run
+        # only if this one runs too, which sends their operations then.
+        for number, hook_savepoint_ids in list(self.senders.items()):
+            if hook_savepoint_ids[:len(savepoint_ids)] == savepoint_ids:
+                del self.senders[number]
+
+        number = next(self.hooks)
+        self.senders[number] = savepoint_ids
+        transaction.on_commit(
+            partial(self.confirm, number, action), using=self.using)
+
+    def confirm(self, number, action):
+        key = (action['_index'], action['_type'], action['_id'])
+        self.confirmed.pop(key, None)
+        self.confirmed[key] = action
+
+        if number in self.senders:
+            self.flush(number)
+
+    def flush(self, number):
+        """
+        Sends the confirmed operations to the ES backend.
+        """
+        # Hooks registered before already ran, or were discarded.
+        for earlier in [n for n in self.senders if n <= number]:
+            del self.senders[earlier]
+
+        actions = list(self.confirmed.values())
+        self.confirmed.clear()
+
+        if not actions:
+            return
+
+        # The transaction is committed already, and raising would prevent
+        # the rest of its commit hooks from running.
+        try:
+            send(actions)
+        except Exception:
+            logging.exception(
+                '{0} indexing operations of a committed transaction '
+                'failed.'.format(len(actions)))
+
+
+def send(actions):
+    """
+    Sends ``_bulk`` API actions to the ES backend.
+
+    If an outbox is configured, actions failing temporarily, or all of them if
+    the ES backend is unreachable, are stored there to be replayed later on.
+
+    :return: A list with a ``(success, item)`` tuple per action.
+    """
+    try:
+        results = elastic.bulk(actions)
+    except ElasticsearchClientNotConnectedError:
+        if not outbox.write(actions):
+            raise
+        logging.warning(
+            'Elasticsearch backend unavailable. {0} indexing operations '
+            'stored in the outbox.'.format(len(actions)))
+        return [(False, {}) for _ in actions]
+
+    failed = [item for ok, item in results if not ok]
+    if failed:
+        logging.error(
+            '{0} of {1} indexing operations failed ({2} stored in the '
+            'outbox): {3}'.format(
+                len(failed), len(actions),
+                outbox.write_failed(actions, results), failed))
+
+    return results
+
+
+def get_buffer(using=None):
+    """
+    Indexing buffer of the given database, for the current thread.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    buffers = getattr(_buffers, 'buffers', None)
+    if buffers is None:
+        buffers = _buffers.buffers = {}
+    if using not in buffers:
+        buffers[using] = IndexingBuffer(using)
+    return buffers[using]
+
+
+class AsyncIndexer(object):
+    """
+    Indexing operations sent to the ES backend by a pool of background
+    threads.
+
+    Every worker thread drains its own bounded queue, sending ``_bulk``
+    requests of ``batch_size`` operations at most, and never waiting more
+    than ``max_delay`` seconds for a batch to be filled. Operations on the same
+    document always go to the same worker, so they are sent in order. When a
+    queue is full, adding operations blocks until there is room.
+    """
+    def __init__(self, workers=2, queue_size=10000, batch_size=500,
+                 max_delay=1.0):
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.queues = [
+            queue.Queue(maxsize=max(queue_size // workers, 1))
+            for _ in range(workers)]
+        self.threads = []
+
+    def start(self):
+        for index, worker_queue in enumerate(self.queues):
+            thread = threading.Thread(
+                target=self.work, args=(worker_queue,),
+                name='elastic-django-indexer-{0}'.format(index))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def put(self, action):
+        """
+        Queues a ``_bulk`` API action to be sent by a worker thread.
+        """
+        key = (action['_index'], action['_type'], action['_id'])
+        self.queues[hash(key) % len(self.queues)].put(action)
+
+    def work(self, worker_queue):
+        stop = False
+        while not stop:
+            batch = [worker_queue.get()]
+            deadline = time.time() + self.max_delay
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(worker_queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            if batch[-1] is _STOP:
+                stop = True
+                batch.pop()
+
+            try:
+                self.send(batch)
+            finally:
+                for _ in range(len(batch) + stop):
+                    worker_queue.task_done()
+
+    def send(self, actions):
+        """
+        Sends a batch of actions to the ES backend, keeping only the last
+        action of every document.
+        """
+        latest = OrderedDict()
+        for action in actions:
+            key = (action['_index'], action['_type'], action['_id'])
+            latest.pop(key, None)
+            latest[key] = action
+        actions = list(latest.values())
+
+        if not actions:
+            return
+
+        try:
+            send(actions)
+        except Exception:
+            logging.exception(
+                '{0} background indexing operations failed.'.format(
+                    len(actions)))
+
+    def flush(self):
+        """
+        Blocks until all the queued operations have been sent.
+        """
+        for worker_queue in self.queues:
+            worker_queue.join()
+
+    def shutdown(self):
+        """
+        Sends all the queued operations and stops the worker threads.
+        """
+        for worker_queue in self.queues:
+            worker_queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+
+def get_async_indexer():
+    """
+    Background indexer of the current process, started on first use and
+    configured through ``ELASTICSEARCH_ASYNC_*`` settings. Pending operations
+    are sent before the process exits.
+    """
+    global _async_indexer, _async_indexer_pid
+
+    pid = os.getpid()
+    if _async_indexer is None or _async_indexer_pid != pid:
+        with _async_indexer_lock:
+            if _async_indexer is None or _async_indexer_pid != pid:
+                indexer = AsyncIndexer(
+                    workers=getattr(
+                        settings, 'ELASTICSEARCH_ASYNC_WORKERS', 2),
+                    queue_size=getattr(
+                        settings, 'ELASTICSEARCH_ASYNC_QUEUE_SIZE', 10000),
+                    batch_size=getattr(
+                        settings, 'ELASTICSEARCH_ASYNC_BATCH_SIZE', 500),
+                    max_delay=getattr(
+                        settings, 'ELASTICSEARCH_ASYNC_MAX_DELAY', 1.0))
+                indexer.start()
+                atexit.register(indexer.shutdown)
+                _async_indexer = indexer
+                _async_indexer_pid = pid
+
+    return _async_indexer
+
+
+def is_deferred(obj):
+    """
+    Checks if indexing operations of the given object must not be sent to the
+    ES backend right away.
+    """
+    mode = get_indexing_mode()
+    if mode in (ASYNC, OUTBOX):
+        return True
+    if mode == ON_COMMIT:
+        return transaction.get_connection(obj._state.db).in_atomic_block
+    return False
+
+
+def defer(obj, action):
+    """
+    Queues an indexing operation of the given object, as per the configured
+    indexing mode.
+    """
+    mode = get_indexing_mode()
+    if mode == ASYNC:
+        # Operations within transactions are queued once committed.
+        transaction.on_commit(
+            partial(get_async_indexer().put, action), using=obj._state.db)
+    elif mode == OUTBOX:
+        transaction.on_commit(
+            partial(outbox.write, [action]), using=obj._state.db)
+    else:
+        get_buffer(obj._state.db).add(action)
@@ -0,0 +1,160 @@
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils import timezone
+
+from elasticsearch.exceptions import TransportError
+
+# Index settings speeding up the load of large amounts of documents: no
+# periodic refreshes, no replica writes and less frequent translog flushes.
+BULK_LOAD_SETTINGS = {
+    'refresh_interval': '-1',
+    'number_of_replicas': 0,
+    'translog.flush_threshold_size': '1gb',
+}
+
+
+def new_index_name(alias):
+    """
+    Unique name for a brand new index to be served under the given alias.
+    """
+    return '{0}-{1}'.format(
+        alias, timezone.now().strftime('%Y%m%d%H%M%S%f'))
+
+
+def get_alias_indices(connection, alias):
+    """
+    :return: List of the indices the given alias points to.
+    """
+    if not connection.indices.exists_alias(name=alias):
+        return []
+    return sorted(connection.indices.get_alias(name=alias).keys())
+
+
+def get_index_setting(connection, index, name):
+    """
+    :return: The value of an index setting (e.g. ``'number_of_replicas'``),
+    or ``None`` if the index doesn't exist or the setting is not set.
+    """
+    response = connection.indices.get_settings(
+        index=index, name='index.' + name, ignore=404)
+    for index_data in response.values():
+        if not isinstance(index_data, dict):
+            # Error response.
+            return None
+        value = index_data.get('settings', {}).get('index', {})
+        for key in name.split('.'):
+            value = value.get(key, {}) if isinstance(value, dict) else {}
+        return value if value != {} else None
+    return None
+
+
+def get_index_settings(connection, index):
+    """
+    :return: The settings of an index (or the index an alias points to)
+    needed to recreate it: its ``analysis`` (custom analyzers the mappings
+    may refer to) and ``number_of_shards``, if set. Empty if the index
+    doesn't exist.
+    """
+    response = connection.indices.get_settings(index=index, ignore=404)
+    for index_data in response.values():
+        if not isinstance(index_data, dict):
+            # Error response.
+            return {}
+        index_settings = index_data.get('settings', {}).get('index', {})
+        return dict(
+            (name, index_settings[name])
+            for name in ('analysis', 'number_of_shards')
+            if name in index_settings)
+    return {}
+
+
+def swap_alias(connection, alias, index):
+    """
+    Atomically points an alias to the given index only.
+
+    A concrete index named like the alias, if any, is removed in the same
+    operation, so the alias can take its place.
+
+    :return: List of the indices the alias pointed to before.
+    """
+    old_indices = get_alias_indices(connection, alias)
+
+    actions = [
+        {'remove': {'index': old_index, 'alias': alias}}
+        for old_index in old_indices]
+    if not old_indices and connection.indices.exists(index=alias):
+        actions.append({'remove_index': {'index': alias}})
+    actions.append({'add': {'index': index, 'alias': alias}})
+
+    connection.indices.update_aliases(body={'actions': actions})
+
+    return old_indices
+
+
+def get_bulk_load_settings():
+    """
+    Index settings applied while bulk loading, from
+    ``ELASTICSEARCH_BULK_LOAD_SETTINGS`` setting.
+    """
+    return getattr(
+        settings, 'ELASTICSEARCH_BULK_LOAD_SETTINGS', BULK_LOAD_SETTINGS)
+
+
+def optimize_indices(connection, *indices):
+    """
+    Refreshes and force merges the given indices after a bulk load, waiting
+    up to ``ELASTICSEARCH_FORCEMERGE_TIMEOUT`` seconds for every merge.
+
+    Failures (e.g. merges taking longer) are logged, as the indices remain
+    fully usable.
+    """
+    timeout = getattr(settings, 'ELASTICSEARCH_FORCEMERGE_TIMEOUT', 3600)
+    for index in indices:
+        try:
+            connection.indices.refresh(index=index)
+            connection.indices.forcemerge(
+                index=index, request_timeout=timeout)
+        except TransportError:
+            logging.exception(
+                "Index '{0}' couldn't be refreshed and force merged.".format(
+                    index))
+
+
+@contextmanager
+def bulk_load_settings(connection, *indices):
+    """
+    Context manager tuning the settings of the given indices for bulk loading
+    (see ``get_bulk_load_settings``).
+
+    The original settings of every index are restored on exit, even if
+    loading failed, and the indices are then refreshed and force merged (see
+    ``optimize_indices``), so every loaded document is searchable afterwards.
+    Failures restoring an index are logged, so that the rest are restored
+    and the original exception, if any, is kept.
+    """
+    tuned = get_bulk_load_settings()
+    original = dict(
+        (index, dict(
+            (name, get_index_setting(connection, index, name))
+            for name in tuned))
+        for index in indices)
+
+    for index in indices:
+        connection.indices.put_settings(index=index, body={'index': tuned})
+    try:
+        yield
+    finally:
+        for index in indices:
+            try:
+                # Settings not set before (``None``) go back to their
+                # defaults.
+                connection.indices.put_settings(
+                    index=index, body={'index': original[index]})
+            except TransportError:
+                logging.exception(
+                    "Settings of index '{0}' couldn't be restored: {1}".format(
+                        index, original[index]))
+
+        optimize_indices(connection, *indices)
@@ -0,0 +1,123 @@
+"""
+Receivers of the ``es_request`` signal reporting ES requests metrics to
+monitoring systems.
+
+Usage, e.g. in an ``AppConfig.ready`` method::
+
+    from elastic_django.instrumentation import PrometheusReceiver
+
+    PrometheusReceiver().connect()
+"""
+from .signals import es_request
+
+
+class MetricsReceiver(object):
+    """
+    Base class of the ``es_request`` signal receivers.
+    """
+    def connect(self):
+        es_request.connect(self, weak=False, dispatch_uid=id(self))
+        return self
+
+    def disconnect(self):
+        es_request.disconnect(dispatch_uid=id(self))
+
+    def __call__(self, sender, **kwargs):
+        raise NotImplementedError
+
+
+class StatsdReceiver(MetricsReceiver):
+    """
+    Reports ES requests metrics with a statsd client (e.g. ``statsd``
+    package's ``StatsClient``), as ``<prefix>.<operation>.<metric>``.
+
+    Timings are reported in milliseconds.
+    """
+    def __init__(self, client, prefix='elasticsearch'):
+        self.client = client
+        self.prefix = prefix
+
+    def __call__(self, sender, operation, duration, took, request_bytes,
+                 response_bytes, retries, docs, failed, serialization_time,
+                 error, **kwargs):
+        name = '{0}.{1}.{{0}}'.format(self.prefix, operation).format
+
+        self.client.incr(name('requests'))
+        self.client.timing(name('duration'), duration * 1000)
+        if took is not None:
+            self.client.timing(name('took'), took)
+        if serialization_time is not None:
+            self.client.timing(
+                name('serialization'), serialization_time * 1000)
+        self.client.timing(name('request_bytes'), request_bytes)
+        self.client.timing(name('response_bytes'), response_bytes)
+        self.client.timing(name('docs'), docs)
+        if retries:
+            self.client.incr(name('retries'), retries)
+        if failed:
+            self.client.incr(name('failed'), failed)
+        if error is not None:
+            self.client.incr(name('errors'))
+
+
+class PrometheusReceiver(MetricsReceiver):
+    """
+    Reports ES requests metrics as ``prometheus_client`` histograms and
+    counters, labelled by operation and index.
+
+    :param registry: Registry of the metrics, the default one if not given.
+    """
+    def __init__(self, registry=None, namespace='elasticsearch'):
+        from prometheus_client import REGISTRY, Counter, Histogram
+
+        registry = registry or REGISTRY
+        labels = ['operation', 'index']
+        size_buckets = (
+            100, 1000, 10000, 100000, 1000000, 10000000, float('inf'))
+
+        def histogram(name, documentation, **kwargs):
+            return Histogram(
+                name, documentation, labels, namespace=namespace,
+                registry=registry, **kwargs)
+
+        def counter(name, documentation):
+            return Counter(
+                name, documentation, labels, namespace=namespace,
+                registry=registry)
+
+        self.duration = histogram(
+            'request_duration_seconds', 'ES requests wall time.')
+        self.serialization = histogram(
+            'serialization_seconds', 'Time spent serializing documents.')
+        self.request_bytes = histogram(
+            'request_bytes', 'Size of ES requests bodies.',
+            buckets=size_buckets)
+        self.response_bytes = histogram(
+            'response_bytes', 'Size of ES responses bodies.',
+            buckets=size_buckets)
+        self.docs = histogram(
+            'request_docs', 'Documents per ES request.',
+            buckets=(1, 10, 50, 100, 500, 1000, 5000, float('inf')))
+        self.retries = counter(
+            'retries', 'ES requests sent again after failed attempts.')
+        self.failed = counter(
+            'failed_docs', 'Documents whose operation failed.')
+        self.errors = counter('errors', 'ES requests raising errors.')
+
+    def __call__(self, sender, operation, index, duration, request_bytes,
+                 response_bytes, retries, docs, failed, serialization_time,
+                 error, **kwargs):
+        labels = {'operation': operation, 'index': index or ''}
+
+        self.duration.labels(**labels).observe(duration)
+        if serialization_time is not None:
+            self.serialization.labels(**labels).observe(serialization_time)
+        self.request_bytes.labels(**labels).observe(request_bytes)
+        self.response_bytes.labels(**labels).observe(response_bytes)
+        self.docs.labels(**labels).observe(docs)
+        if retries:
+            self.retries.labels(**labels).inc(retries)
+        if failed:
+            self.failed.labels(**labels).inc(failed)
+        if error is not None:
+            self.errors.labels(**labels).inc()
@@ -0,0 +1,137 @@
+from __future__ import unicode_literals
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from elasticsearch.exceptions import TransportError
+
+from ...exceptions import ElasticsearchClientNotConnectedError
+from ...models import ElasticModel
+from ...related import iter_objects
+from ...serializers import FINGERPRINT_FIELD
+
+
+class Command(BaseCommand):
+    help = 'Compares the objects in the database with their documents in ' \
+           'Elasticsearch, reporting (and optionally repairing) missing, ' \
+           'stale and orphaned documents.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'app_label', nargs='?',
+            help='App label(s) of applications to check.')
+        parser.add_argument(
+            '--repair', action='store_true', dest='repair', default=False,
+            help='Index missing and stale documents, and remove orphaned '
+                 'ones.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000, dest='chunk_size',
+            help='Number of objects and documents fetched per round trip, '
+                 'and of repairs sent per `_bulk` request.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+
+        app_label = options['app_label']
+        if app_label:
+            try:
+                models = apps.get_app_config(app_label).get_models()
+            except LookupError as e:
+                raise CommandError(e)
+        else:
+            models = apps.get_models()
+
+        models = [model for model in models if issubclass(model, ElasticModel)]
+        if not models:
+            self.stderr.write('No `ElasticModel` models found to be checked.')
+            return
+
+        for model in models:
+            try:
+                self.check_model(
+                    model, options['repair'], options['chunk_size'])
+            except (ElasticsearchClientNotConnectedError, TransportError) as e:
+                raise CommandError(e)
+
+    def check_model(self, model, repair, chunk_size):
+        """
+        Walks the objects of a model and its ES documents, both ordered by
+        primary key, comparing them by their fingerprint. Only the ``pk`` and
+        the fingerprint stored in the documents are fetched, not their source.
+
+        Documents are ordered by their ``pk`` field, so the primary key of the
+        model must be sortable in the same way in both sides (e.g. integers).
+        """
+        elastic = model.elastic
+
+        objects = iter_objects(
+            model._default_manager.order_by('pk'), chunk_size=chunk_size)
+        hits = elastic.scan(
+            sort=[{'pk': 'asc'}], page_size=chunk_size,
+            source=['pk', FINGERPRINT_FIELD])
+
+        checked = missing = stale = orphaned = 0
+        to_index, to_remove = [], []
+
+        obj, hit = next(objects, None), next(hits, None)
+        doc = obj.elastic_serializer() if obj is not None else None
+        while obj is not None or hit is not None:
+            if hit is None or (
+                    obj is not None and doc['pk'] < hit['_source']['pk']):
+                missing += 1
+                self.log('Missing', model, obj.pk)
+                if repair:
+                    to_index.append(obj)
+                advance_object, advance_hit = True, False
+            elif obj is None or hit['_source']['pk'] < doc['pk']:
+                orphaned += 1
+                self.log('Orphaned', model, hit['_id'])
+                if repair:
+                    to_remove.append({
+                        '_op_type': 'delete',
+                        '_index': hit['_index'],
+                        '_type': hit['_type'],
+                        '_id': hit['_id'],
+                    })
+                advance_object, advance_hit = False, True
+            else:
+                # Documents indexed without fingerprint count as stale.
+                stored = hit['_source'].get(FINGERPRINT_FIELD)
+                if doc[FINGERPRINT_FIELD] != stored:
+                    stale += 1
+                    self.log('Stale', model, obj.pk)
+                    if repair:
+                        to_index.append(obj)
+                advance_object, advance_hit = True, True
+
+            if advance_object:
+                checked += 1
+                obj = next(objects, None)
+                doc = obj.elastic_serializer() if obj is not None else None
+            if advance_hit:
+                hit = next(hits, None)
+
+            # Repairs are sent as they pile up, to keep memory bounded.
+            if len(to_index) >= chunk_size:
+                elastic.index_objects(to_index, chunk_size=chunk_size)
+                to_index = []
+            if len(to_remove) >= chunk_size:
+                elastic.bulk(to_remove, chunk_size=chunk_size)
+                to_remove = []
+
+        if to_index:
+            elastic.index_objects(to_index, chunk_size=chunk_size)
+        if to_remove:
+            elastic.bulk(to_remove, chunk_size=chunk_size)
+
+        self.stdout.write(
+            'Checked {0} objects of model {1}: {2} missing, {3} stale, {4} '
+            'orphaned documents{5}.'.format(
+                checked, model._meta.object_name, missing, stale, orphaned,
+                ' (repaired)' if repair and (missing or stale or orphaned)
+                else ''))
+
+    def log(self, status, model, pk):
+        if self.verbosity > 1:
+            self.stdout.write('{0} document: {1} {2}'.format(
+                status, model._meta.object_name, pk))
@@ -0,0 +1,68 @@
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from elasticsearch.exceptions import TransportError
+
+from ...client import ElasticsearchClient
+from ...exceptions import ElasticsearchClientConfigurationError
+from ...mappings import get_index_body, get_mapping
+from ...models import ElasticModel
+
+
+class Command(BaseCommand):
+    help = 'Creates the Elasticsearch indices of the `ElasticModel` models, ' \
+           'with mappings derived from their fields.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'app_label', nargs='?',
+            help='App label of an application to create the indices of its '
+                 'models.')
+
+    def handle(self, *args, **options):
+        app_label = options['app_label']
+        if app_label:
+            try:
+                models = apps.get_app_config(app_label).get_models()
+            except LookupError as e:
+                raise CommandError(e)
+        else:
+            models = apps.get_models()
+
+        models = [model for model in models if issubclass(model, ElasticModel)]
+        if not models:
+            self.stderr.write('No `ElasticModel` models found.')
+            return
+
+        try:
+            client = ElasticsearchClient()
+        except ElasticsearchClientConfigurationError as e:
+            raise CommandError(e)
+
+        indices = OrderedDict()
+        for model in models:
+            index_name = model._meta.index_name or client.index_name
+            indices.setdefault(index_name, []).append(model)
+
+        connection = client.connection
+        for index_name, index_models in indices.items():
+            try:
+                if connection.indices.exists(index=index_name):
+                    # Only new fields can be added to existing mappings.
+                    for model in index_models:
+                        connection.indices.put_mapping(
+                            index=index_name, doc_type=model.__name__,
+                            body=get_mapping(model))
+                    self.stdout.write(
+                        "Updated mappings of index '{0}'.".format(index_name))
+                else:
+                    connection.indices.create(
+                        index=index_name, body=get_index_body(index_models))
+                    self.stdout.write(
+                        "Created index '{0}'.".format(index_name))
+            except TransportError as e:
+                raise CommandError(e)
@@ -0,0 +1,46 @@
+from __future__ import unicode_literals
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from elasticsearch.exceptions import TransportError
+
+from ... import dumps
+from ...exceptions import ElasticsearchClientNotConnectedError
+from ...manager import ElasticManager
+
+
+class Command(BaseCommand):
+    help = 'Exports all the documents of an Elasticsearch index to a dump ' \
+           'file (NDJSON, gzip compressed if its name ends with `.gz`).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Dump file to be written.')
+        parser.add_argument(
+            'index_name', nargs='?',
+            help='Name of the Elasticsearch index to be dumped. Defaults to '
+                 '`ELASTICSEARCH_INDEX_NAME`.')
+        parser.add_argument(
+            '--page-size', type=int, default=1000, dest='page_size',
+            help='Number of documents retrieved per scroll request.')
+
+    def handle(self, *args, **options):
+        index_name = options['index_name'] or getattr(
+            settings, 'ELASTICSEARCH_INDEX_NAME', 'elastic-django')
+
+        start = time.time()
+        try:
+            count = dumps.dump(
+                ElasticManager(), options['path'], index_name,
+                page_size=options['page_size'])
+        except (ElasticsearchClientNotConnectedError, TransportError) as e:
+            raise CommandError(e)
+        elapsed = time.time() - start
+
+        self.stdout.write(
+            "Dumped {0} documents of index '{1}' to '{2}' in {3:.2f}s "
+            "({4:.0f} docs/s).".format(
+                count, index_name, options['path'], elapsed,
+                count / elapsed if elapsed else 0))
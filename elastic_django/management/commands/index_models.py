@@ -1,9 +1,116 @@
 from __future__ import unicode_literals
 
+import datetime
+import multiprocessing
+import time
+from collections import OrderedDict
+
 from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
 from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils import six, timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from elasticsearch.exceptions import TransportError
+from elasticsearch.helpers import streaming_bulk
 
+from ...cache import invalidate_searches
+from ...client import ElasticsearchClient
+from ...exceptions import ElasticsearchClientConfigurationError
+from ...indices import (
+    bulk_load_settings, get_index_setting, get_index_settings, new_index_name,
+    swap_alias)
+from ...mappings import get_index_body
 from ...models import ElasticModel
+from ...related import iter_objects
+from ...state import get_high_water_mark, set_high_water_mark
+
+
+def index_queryset(client, queryset, index_name, chunk_size=2000,
+                   batch_size=500, batch_bytes=10 * 1024 * 1024):
+    """
+    Streams all the objects of a ``QuerySet`` into the ES backend.
+
+    Rows are fetched from the DB in chunks of ``chunk_size``, with their
+    embedded relations retrieved in bulk (see ``iter_objects``), and documents
+    are sent using the ``_bulk`` API in batches limited both by number of
+    documents (``batch_size``) and by request size (``batch_bytes``). The
+    whole table is never held in memory.
+
+    :return: A tuple with the number of indexed documents and the number of
+    documents rejected by the ES backend.
+    """
+    doc_type = queryset.model.__name__
+    actions = (
+        {
+            '_index': index_name,
+            '_type': doc_type,
+            '_id': obj.pk,
+            '_source': obj.elastic_serializer(),
+        } for obj in iter_objects(queryset, chunk_size=chunk_size)
+    )
+
+    indexed = errors = 0
+    for ok, item in streaming_bulk(
+            client.connection, actions, chunk_size=batch_size,
+            max_chunk_bytes=batch_bytes, raise_on_error=False):
+        if ok:
+            indexed += 1
+        else:
+            errors += 1
+
+    return indexed, errors
+
+
+def pk_ranges(queryset, parts):
+    """
+    Splits the primary key space of a ``QuerySet`` into (at most) ``parts``
+    contiguous, non-overlapping ``(first, last)`` inclusive ranges.
+
+    Only integer primary keys can be partitioned.
+    """
+    bounds = queryset.aggregate(first=Min('pk'), last=Max('pk'))
+    first, last = bounds['first'], bounds['last']
+    if first is None:
+        return []
+
+    if not isinstance(first, six.integer_types):
+        raise CommandError(
+            "Model '{0}' doesn't have an integer primary key and its objects "
+            "can't be split among workers.".format(
+                queryset.model._meta.object_name))
+
+    step = (last - first) // parts + 1
+    return [
+        (start, min(start + step - 1, last))
+        for start in range(first, last + 1, step)
+    ]
+
+
+# ES client of the current worker process. Every worker opens its own one.
+_worker_client = None
+
+
+def _index_pk_range(task):
+    """
+    Worker process entry point: indexes the objects of a model whose primary
+    keys lie in the given range.
+    """
+    global _worker_client
+
+    model_label, index_name, filters, first, last, options = task
+    if _worker_client is None:
+        _worker_client = ElasticsearchClient()
+
+    model = apps.get_model(model_label)
+    queryset = model._default_manager.filter(
+        pk__gte=first, pk__lte=last, **filters)
+
+    return model_label, index_queryset(
+        _worker_client, queryset, index_name, **options)
 
 
 class Command(BaseCommand):
@@ -14,6 +121,42 @@ class Command(BaseCommand):
         parser.add_argument(
             'app_label', nargs='?',
             help='App label(s) of applications to index.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000, dest='chunk_size',
+            help='Number of rows fetched from the database per round trip.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500, dest='batch_size',
+            help='Maximum number of documents sent per `_bulk` request.')
+        parser.add_argument(
+            '--batch-bytes', type=int, default=10 * 1024 * 1024,
+            dest='batch_bytes',
+            help='Maximum size in bytes of each `_bulk` request.')
+        parser.add_argument(
+            '--workers', type=int, default=1, dest='workers',
+            help='Number of processes to index with. Each model is split in '
+                 'primary key ranges that are indexed in parallel.')
+        parser.add_argument(
+            '--updated-field', dest='updated_field',
+            help='Date/time field of the models holding their last '
+                 'modification. Only objects changed since the last '
+                 'successful run are indexed.')
+        parser.add_argument(
+            '--bulk-load', action='store_true', dest='bulk_load',
+            default=False,
+            help='Disable refresh and replicas of the indices while indexing, '
+                 'restoring them at the end.')
+        parser.add_argument(
+            '--rebuild', action='store_true', dest='rebuild', default=False,
+            help='Build brand new indices, replacing the current ones only '
+                 'once complete, with no downtime. Objects saved meanwhile '
+                 'are indexed again before and after the swap if '
+                 '`--updated-field` is given; otherwise their changes, as '
+                 'well as deletions, may be lost.')
+        parser.add_argument(
+            '--since', dest='since',
+            help='Only index objects changed since this ISO 8601 timestamp, '
+                 'instead of since the last successful run. Requires '
+                 '`--updated-field`.')
 
     def handle(self, *args, **options):
         app_label = options['app_label']
@@ -25,13 +168,336 @@ class Command(BaseCommand):
         else:
             models = apps.get_models()
 
-        checked = False
+        models = [model for model in models if issubclass(model, ElasticModel)]
+        if not models:
+            self.stderr.write('No `ElasticModel` models found to be indexed.')
+            return
+
+        updated_field = options['updated_field']
+        since = options['since']
+        if since:
+            if not updated_field:
+                raise CommandError('`--since` requires `--updated-field`.')
+            since = self.parse_timestamp(since)
+
+        rebuild = options['rebuild']
+        if rebuild and since:
+            raise CommandError(
+                '`--rebuild` indexes all the objects, it cannot be combined '
+                'with `--since`.')
+
+        try:
+            client = ElasticsearchClient()
+        except ElasticsearchClientConfigurationError as e:
+            raise CommandError(e)
+
+        # Models to index, with their index and the lookups selecting the
+        # objects to be indexed.
+        jobs = []
         for model in models:
-            if issubclass(model, ElasticModel):
-                checked = True
-                items = model.objects.all()
-                self.stdout.write('Indexed {0} items for model {1}.'.format(
-                    len(items), model._meta.object_name))
+            index_name = model._meta.index_name or client.index_name
+            filters = {}
+            if updated_field and not rebuild:
+                try:
+                    model._meta.get_field(updated_field)
+                except FieldDoesNotExist:
+                    self.stderr.write(
+                        "Model {0} has no field '{1}'. Skipped.".format(
+                            model._meta.object_name, updated_field))
+                    continue
 
-        if not checked:
-            self.stderr.write('No `ElasticModel` models found to be indexed.')
+                model_since = since or get_high_water_mark(
+                    client.connection, index_name, model)
+                if model_since:
+                    filters[updated_field + '__gte'] = model_since
+            jobs.append((model, index_name, filters))
+
+        bulk_options = {
+            'chunk_size': options['chunk_size'],
+            'batch_size': options['batch_size'],
+            'batch_bytes': options['batch_bytes'],
+        }
+
+        if rebuild:
+            self.rebuild(
+                client, jobs, options['workers'], bulk_options, app_label,
+                updated_field)
+            return
+
+        # Changes made from now on will be picked up by the next run.
+        started = timezone.now()
+
+        if options['bulk_load']:
+            # Indices not created yet are left to the ES defaults.
+            indices = [
+                index_name for index_name in OrderedDict(
+                    (job[1], None) for job in jobs)
+                if client.connection.indices.exists(index=index_name)]
+            with bulk_load_settings(client.connection, *indices):
+                results = self.run(
+                    client, jobs, options['workers'], bulk_options)
+        else:
+            results = self.run(client, jobs, options['workers'], bulk_options)
+
+        invalidate_searches(*set(job[1] for job in jobs))
+
+        for model, index_name, filters in jobs:
+            indexed, errors, elapsed = results[model._meta.label]
+            self.report(model, indexed, errors, elapsed)
+
+            if updated_field:
+                if errors:
+                    self.stderr.write(
+                        'Indexing of model {0} had errors. Its changes will '
+                        'be indexed again on the next run.'.format(
+                            model._meta.object_name))
+                else:
+                    set_high_water_mark(
+                        client.connection, index_name, model, updated_field,
+                        started)
+
+    def rebuild(self, client, jobs, workers, bulk_options, app_label=None,
+                updated_field=None):
+        """
+        Indexes the models into brand new indices, built with bulk load
+        settings. Once complete, every index name is atomically
+        turned into an alias of its new index, and the former indices are
+        removed. Searches keep being served by the former indices meanwhile.
+
+        Objects saved during the build are indexed into the former indices,
+        so with an ``updated_field`` the ones changed since the build started
+        are indexed again into the new index before the swap, and the ones
+        changed since then once more after the swap. Objects deleted during
+        the build can't be caught up this way.
+        """
+        connection = client.connection
+
+        # Models whose changes made while rebuilding are indexed again.
+        catch_up_models = []
+        if updated_field:
+            for model, _, _ in jobs:
+                try:
+                    model._meta.get_field(updated_field)
+                except FieldDoesNotExist:
+                    self.stderr.write(
+                        "Model {0} has no field '{1}'. Changes made while "
+                        "rebuilding won't be caught up.".format(
+                            model._meta.object_name, updated_field))
+                else:
+                    catch_up_models.append(model)
+
+        aliases = OrderedDict()
+        for job in jobs:
+            aliases.setdefault(job[1], []).append(job)
+
+        if app_label:
+            for model in apps.get_models():
+                if not issubclass(model, ElasticModel) or \
+                        model._meta.app_label == app_label:
+                    continue
+                index_name = model._meta.index_name or client.index_name
+                if index_name in aliases:
+                    raise CommandError(
+                        "Index '{0}' also holds documents of model {1}, which "
+                        "wouldn't be rebuilt. Rebuild it without specifying "
+                        "an app label.".format(
+                            index_name, model._meta.object_name))
+
+        for alias, alias_jobs in aliases.items():
+            index = new_index_name(alias)
+            # The new index keeps the analyzers, shards and replicas of the
+            # current one.
+            index_settings = get_index_settings(connection, alias)
+            replicas = get_index_setting(
+                connection, alias, 'number_of_replicas')
+            if replicas is not None:
+                index_settings['number_of_replicas'] = replicas
+
+            body = get_index_body(
+                [job[0] for job in alias_jobs],
+                settings=index_settings or None)
+            # Changes made from now on may only reach the former index.
+            started = timezone.now()
+            connection.indices.create(index=index, body=body)
+            self.stdout.write("Building index '{0}' for '{1}'.".format(
+                index, alias))
+            catch_up_jobs = [
+                job for job in alias_jobs if job[0] in catch_up_models]
+
+            try:
+                with bulk_load_settings(connection, index):
+                    results = self.run(
+                        client,
+                        [(model, index, filters)
+                         for model, _, filters in alias_jobs],
+                        workers, bulk_options)
+
+                failed = False
+                for model, _, _ in alias_jobs:
+                    indexed, errors, elapsed = results[model._meta.label]
+                    self.report(model, indexed, errors, elapsed)
+                    failed = failed or errors
+                if failed:
+                    raise CommandError(
+                        "Some documents couldn't be indexed. '{0}' was left "
+                        "untouched.".format(alias))
+
+                caught_up = timezone.now()
+                if self.catch_up(
+                        client, catch_up_jobs, index, updated_field, started,
+                        bulk_options):
+                    raise CommandError(
+                        "Some changes made while rebuilding couldn't be "
+                        "indexed. '{0}' was left untouched.".format(alias))
+
+                old_indices = swap_alias(connection, alias, index)
+            except BaseException:
+                connection.indices.delete(index=index, ignore=404)
+                raise
+
+            # Changes made until the swap may only have reached the former
+            # index, which still takes them until it is removed.
+            finished = timezone.now()
+            if self.catch_up(
+                    client, catch_up_jobs, alias, updated_field, caught_up,
+                    bulk_options):
+                self.stderr.write(
+                    "Some changes made while swapping '{0}' couldn't be "
+                    "indexed. Index them again with `--updated-field {1} "
+                    "--since {2}`.".format(
+                        alias, updated_field, caught_up.isoformat()))
+            else:
+                for model, _, _ in catch_up_jobs:
+                    set_high_water_mark(
+                        connection, alias, model, updated_field, finished)
+
+            invalidate_searches(alias)
+
+            for old_index in old_indices:
+                connection.indices.delete(index=old_index)
+
+            self.stdout.write("'{0}' now points to index '{1}'.".format(
+                alias, index))
+
+    def catch_up(self, client, jobs, index, updated_field, since,
+                 bulk_options):
+        """
+        Indexes into the given index the objects of the models changed since
+        ``since``, as per their ``updated_field``.
+
+        :return: Whether any document failed to be indexed.
+        """
+        if not jobs:
+            return False
+
+        self.stdout.write(
+            "Indexing changes made since {0} into '{1}'.".format(
+                since.isoformat(), index))
+        results = self.run(
+            client,
+            [(model, index, {updated_field + '__gte': since})
+             for model, _, _ in jobs],
+            1, bulk_options)
+
+        failed = False
+        for model, _, _ in jobs:
+            indexed, errors, elapsed = results[model._meta.label]
+            self.report(model, indexed, errors, elapsed)
+            failed = failed or errors
+        return failed
+
+    def run(self, client, jobs, workers, bulk_options):
+        """
+        Indexes the given models, with as many processes as ``workers``.
+        """
+        try:
+            if workers > 1:
+                return self.index_parallel(jobs, workers, bulk_options)
+            return self.index_serial(client, jobs, bulk_options)
+        except TransportError as e:
+            raise CommandError(e)
+
+    def parse_timestamp(self, value):
+        """
+        Parses an ISO 8601 date or datetime given in the CLI.
+        """
+        try:
+            timestamp = parse_datetime(value)
+            if timestamp is None:
+                day = parse_date(value)
+                if day is not None:
+                    timestamp = datetime.datetime.combine(
+                        day, datetime.time())
+        except ValueError:
+            timestamp = None
+
+        if timestamp is None:
+            raise CommandError(
+                "Invalid timestamp '{0}'. Use ISO 8601 format, e.g. "
+                "'2015-06-30T22:00:00'.".format(value))
+
+        if settings.USE_TZ and timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp)
+
+        return timestamp
+
+    def index_serial(self, client, jobs, bulk_options):
+        """
+        Indexes the given models one after another, in this process.
+
+        :return: A dictionary with the indexed and failed documents, and the
+        time spent, per model label.
+        """
+        results = {}
+        for model, index_name, filters in jobs:
+            start = time.time()
+            indexed, errors = index_queryset(
+                client, model._default_manager.filter(**filters), index_name,
+                **bulk_options)
+            results[model._meta.label] = (
+                indexed, errors, time.time() - start)
+
+        return results
+
+    def index_parallel(self, jobs, workers, bulk_options):
+        """
+        Indexes the given models using a pool of ``workers`` processes, each
+        one taking care of a primary key range of a model.
+
+        :return: A dictionary with the indexed and failed documents, and the
+        time spent, per model label.
+        """
+        tasks = []
+        for model, index_name, filters in jobs:
+            for first, last in pk_ranges(
+                    model._default_manager.filter(**filters), workers):
+                tasks.append((
+                    model._meta.label, index_name, filters, first, last,
+                    bulk_options))
+
+        # Forked workers must not share the DB connections of this process.
+        connections.close_all()
+
+        counts = dict((model._meta.label, [0, 0]) for model, _, _ in jobs)
+        start = time.time()
+        pool = multiprocessing.get_context('fork').Pool(workers)
+        try:
+            for label, (indexed, errors) in pool.imap_unordered(
+                    _index_pk_range, tasks):
+                counts[label][0] += indexed
+                counts[label][1] += errors
+        finally:
+            pool.terminate()
+            pool.join()
+        elapsed = time.time() - start
+
+        return dict(
+            (label, (indexed, errors, elapsed))
+            for label, (indexed, errors) in counts.items())
+
+    def report(self, model, indexed, errors, elapsed):
+        self.stdout.write(
+            'Indexed {0} items for model {1} in {2:.2f}s ({3:.0f} docs/s, '
+            '{4} errors).'.format(
+                indexed, model._meta.object_name, elapsed,
+                indexed / elapsed if elapsed else indexed, errors))
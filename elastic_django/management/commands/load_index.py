@@ -0,0 +1,102 @@
+from __future__ import unicode_literals
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from elasticsearch.exceptions import TransportError
+from elasticsearch.helpers import streaming_bulk
+
+from ... import dumps
+from ...cache import invalidate_searches
+from ...client import ElasticsearchClient
+from ...exceptions import ElasticsearchClientConfigurationError
+from ...indices import bulk_load_settings
+
+
+class Command(BaseCommand):
+    help = 'Loads the documents of a dump file written by `dump_index` into ' \
+           'an Elasticsearch index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Dump file to be loaded.')
+        parser.add_argument(
+            'index_name', nargs='?',
+            help='Name of the Elasticsearch index to load the documents into. '
+                 'Defaults to the index dumped.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500, dest='batch_size',
+            help='Maximum number of documents sent per `_bulk` request.')
+        parser.add_argument(
+            '--batch-bytes', type=int, default=10 * 1024 * 1024,
+            dest='batch_bytes',
+            help='Maximum size in bytes of each `_bulk` request.')
+        parser.add_argument(
+            '--bulk-load', action='store_true', dest='bulk_load',
+            default=False,
+            help='Disable refresh and replicas of the index while loading, '
+                 'restoring them at the end.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            header = dumps.read_header(path)
+        except (IOError, ValueError) as e:
+            raise CommandError(
+                "'{0}' is not a valid dump file: {1}".format(path, e))
+        index_name = options['index_name'] or header['index']
+
+        try:
+            client = ElasticsearchClient()
+        except ElasticsearchClientConfigurationError as e:
+            raise CommandError(e)
+
+        start = time.time()
+        try:
+            connection = client.connection
+            if not connection.indices.exists(index=index_name):
+                body = {'mappings': header['mappings']}
+                if header.get('settings'):
+                    body['settings'] = {'index': header['settings']}
+                connection.indices.create(index=index_name, body=body)
+
+            bulk_options = dict(
+                chunk_size=options['batch_size'],
+                max_chunk_bytes=options['batch_bytes'])
+            if options['bulk_load']:
+                with bulk_load_settings(connection, index_name):
+                    loaded, errors = self.load(
+                        client, path, index_name, bulk_options)
+            else:
+                loaded, errors = self.load(
+                    client, path, index_name, bulk_options)
+        except TransportError as e:
+            raise CommandError(e)
+        elapsed = time.time() - start
+
+        invalidate_searches(index_name)
+
+        self.stdout.write(
+            "Loaded {0} documents into index '{1}' in {2:.2f}s ({3:.0f} "
+            "docs/s, {4} errors).".format(
+                loaded, index_name, elapsed,
+                loaded / elapsed if elapsed else 0, errors))
+
+    def load(self, client, path, index_name, bulk_options):
+        """
+        Streams the documents of the dump file into the index through the
+        ``_bulk`` API, with bounded memory.
+
+        :return: A tuple with the number of documents loaded and the number of
+        documents rejected by the ES backend.
+        """
+        loaded = errors = 0
+        for ok, item in streaming_bulk(
+                client.connection, dumps.read_actions(path, index_name),
+                raise_on_error=False, **bulk_options):
+            if ok:
+                loaded += 1
+            else:
+                errors += 1
+
+        return loaded, errors
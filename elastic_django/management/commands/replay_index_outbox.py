@@ -0,0 +1,63 @@
+from __future__ import unicode_literals
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import outbox
+from ...exceptions import ElasticsearchClientNotConnectedError
+from ...manager import ElasticManager
+
+
+class Command(BaseCommand):
+    help = 'Sends to the Elasticsearch backend the indexing operations ' \
+           'stored in the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', dest='path',
+            help='Outbox file. Defaults to `ELASTICSEARCH_OUTBOX_PATH`.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500, dest='batch_size',
+            help='Maximum number of operations sent per `_bulk` request.')
+
+    def handle(self, *args, **options):
+        path = options['path'] or outbox.get_outbox_path()
+        if not path:
+            raise CommandError(
+                'No outbox configured. Please set `ELASTICSEARCH_OUTBOX_PATH` '
+                'or specify a path.')
+
+        # Operations are taken out of the outbox before being replayed, so
+        # new ones can keep being stored meanwhile. They are appended to the
+        # operations still to be replayed (interrupted or failed before), so
+        # that the last operation per document is the newest one.
+        replaying = path + '.replaying'
+        pending = path + '.pending'
+        if os.path.exists(path) and not os.path.exists(pending):
+            os.rename(path, pending)
+        if os.path.exists(pending):
+            outbox.move(pending, replaying)
+
+        if not os.path.exists(replaying):
+            self.stdout.write('The outbox is empty.')
+            return
+
+        actions, count = outbox.read(replaying)
+
+        try:
+            results = ElasticManager().bulk(
+                actions, chunk_size=options['batch_size'])
+        except ElasticsearchClientNotConnectedError as e:
+            raise CommandError(e)
+
+        # Operations failing temporarily are retried on the next run, before
+        # the ones stored meanwhile.
+        kept = outbox.rewrite_failed(actions, results, replaying)
+
+        succeeded = len([ok for ok, _ in results if ok])
+        self.stdout.write(
+            'Replayed {0} operations ({1} stored): {2} succeeded, {3} failed, '
+            '{4} kept in the outbox.'.format(
+                len(actions), count, succeeded, len(actions) - succeeded,
+                kept))
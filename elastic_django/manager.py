@@ -1,28 +1,128 @@
+import copy
+import itertools
 import logging
+import os
+import threading
+import time
 
 from django.conf import settings
+from django.utils import six
 
+from elasticsearch.helpers import streaming_bulk
+
+from .cache import (
+    DocumentCache, cached_search, get_document_cache, invalidate_searches)
 from .client import ElasticsearchClient
 from .exceptions import (
     ElasticsearchClientConfigurationError,
-    ElasticsearchClientNotConnectedError)
+    ElasticsearchClientNotConnectedError,
+    InvalidElasticsearchOperationError)
+from .search import SearchResults
+from .signals import measure
+
+
+# Process-wide ES client, shared by all the managers.
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+# Time of the last failed connection attempt, and its process id.
+_client_failed_at = None
+_client_failed_pid = None
+
+
+def get_client():
+    """
+    Returns the ES client of the current process, connecting to the ES
+    backend on first use. Forked processes get a client of their own.
+
+    Once a connection attempt fails, no other is made for
+    ``ELASTICSEARCH_RECONNECT_BACKOFF`` seconds, so that operations don't
+    wait for an unreachable ES backend each time.
+
+    :raises ElasticsearchClientConfigurationError: If the ES backend is
+    unreachable.
+    :raises ElasticsearchClientNotConnectedError: If the last connection
+    attempt failed less than ``ELASTICSEARCH_RECONNECT_BACKOFF`` seconds ago.
+    """
+    global _client, _client_pid, _client_failed_at, _client_failed_pid
+
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                backoff = getattr(
+                    settings, 'ELASTICSEARCH_RECONNECT_BACKOFF', 10)
+                if (_client_failed_pid == pid and backoff and
+                        time.time() - _client_failed_at < backoff):
+                    raise ElasticsearchClientNotConnectedError()
+
+                try:
+                    _client = ElasticsearchClient()
+                except ElasticsearchClientConfigurationError:
+                    _client_failed_at = time.time()
+                    _client_failed_pid = pid
+                    raise
+                _client_pid = pid
+                _client_failed_at = _client_failed_pid = None
+
+    return _client
+
+
+def chunked(iterable, size):
+    """
+    Splits any iterable in lists of ``size`` items at most.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
 
 class ElasticManager(object):
-    def __init__(self):
-        self._client = None
-        self._connection = None
+    """
+    Entry point for ES operations on ``ElasticModel`` objects.
+
+    No connection is attempted until the first ES operation is performed, so
+    defining and importing models doesn't involve any network round trip.
+
+    Accessed from a model class (e.g. ``Book.elastic``), the manager is bound
+    to that model, which enables model-wide operations like ``search``.
+    """
+    def __init__(self, model=None):
+        self.model = model
+        self._bound_managers = {}
+
+    def __get__(self, instance, owner):
+        if owner is None or owner is self.model:
+            return self
 
+        if owner not in self._bound_managers:
+            manager = copy.copy(self)
+            manager.model = owner
+            manager._bound_managers = {}
+            self._bound_managers[owner] = manager
+
+        return self._bound_managers[owner]
+
+    @property
+    def _client(self):
         try:
             # Attempt to connect to ES active backend(s).
-            self._client = ElasticsearchClient()
-            self._connection = self._client.connection
+            return get_client()
         except ElasticsearchClientConfigurationError:
             # Inform about the issue and continue, if no ES backend available.
             message = 'Elasticsearch connection unavailable.'
             logging.exception(message) if settings.DEBUG else logging.critical(
                 message)
 
+    @property
+    def _connection(self):
+        client = self._client
+        return client.connection if client else None
+
     def is_connected(self):
         """
         Checks if the manager is able to perform operations against an ES
@@ -31,38 +131,164 @@ class ElasticManager(object):
         if not self._client:
             raise ElasticsearchClientNotConnectedError()
 
+    def get_index_name(self, model):
+        """
+        Name of the ES index where objects of the given model are stored.
+        """
+        return model._meta.index_name or getattr(
+            settings, 'ELASTICSEARCH_INDEX_NAME', 'elastic-django')
+
+    def index_action(self, obj):
+        """
+        ``_bulk`` API action to index a single Django ``models.Model`` object.
+        """
+        return {
+            '_op_type': 'index',
+            '_index': self.get_index_name(obj),
+            '_type': obj.__class__.__name__,
+            '_id': obj.pk,
+            '_source': obj.elastic_serializer(),
+        }
+
+    def delete_action(self, obj):
+        """
+        ``_bulk`` API action to remove a single object from the ES index.
+        """
+        return {
+            '_op_type': 'delete',
+            '_index': self.get_index_name(obj),
+            '_type': obj.__class__.__name__,
+            '_id': obj.pk,
+        }
+
+    def bulk(self, actions, chunk_size=500):
+        """
+        Sends the given ``_bulk`` API actions to the ES backend, in requests of
+        ``chunk_size`` actions at most.
+
+        Failures don't stop the process: they are reported with the results.
+
+        :return: A list with a ``(success, item)`` tuple per action, in the
+        same order as the actions.
+        """
+        self.is_connected()
+
+        indices = set()
+        keys = []
+        results = []
+
+        actions = iter(actions)
+        while True:
+            # Actions are usually built (and objects serialized) lazily.
+            start = time.time()
+            chunk = list(itertools.islice(actions, chunk_size))
+            if not chunk:
+                break
+
+            request = measure(
+                self.model, 'bulk', docs=len(chunk),
+                serialization_time=time.time() - start)
+            chunk_indices = set()
+            for action in chunk:
+                chunk_indices.add(action.get('_index'))
+                keys.append(DocumentCache.key(
+                    action.get('_index'), action.get('_type'),
+                    action.get('_id')))
+            chunk_indices.discard(None)
+            request.index = ','.join(sorted(chunk_indices))
+            indices.update(chunk_indices)
+
+            with request:
+                chunk_results = list(streaming_bulk(
+                    self._connection, chunk, chunk_size=chunk_size,
+                    raise_on_error=False, raise_on_exception=False))
+                request.failed = len(
+                    [ok for ok, _ in chunk_results if not ok])
+            results.extend(chunk_results)
+
+        invalidate_searches(*indices)
+
+        cache = get_document_cache()
+        if cache is not None:
+            cache.delete(*keys)
+
+        if settings.DEBUG:
+            logging.debug('Sent {0} bulk actions ({1} failed)'.format(
+                len(results), len([ok for ok, _ in results if not ok])))
+
+        return results
+
     def index_object(self, obj):
         """
         Indexes a single Django ``models.Model`` object in the ES backend.
         """
         self.is_connected()
 
-        index_name = obj._meta.index_name or self._client.index_name
+        index_name = self.get_index_name(obj)
+        doc_type = obj.__class__.__name__
 
-        self._connection.index(
-            index=index_name,
-            doc_type=obj.__class__.__name__,
-            body=obj.elastic_serializer(),
-            id=obj.pk
-        )
+        start = time.time()
+        body = obj.elastic_serializer()
+
+        with measure(obj.__class__, 'index', index_name,
+                     serialization_time=time.time() - start) as request:
+            response = request.response = self._connection.index(
+                index=index_name,
+                doc_type=doc_type,
+                body=body,
+                id=obj.pk
+            )
+
+        invalidate_searches(index_name)
+        self.cache_document(index_name, doc_type, obj.pk, body, response)
 
         if settings.DEBUG:
             logging.debug("Indexed object '{0}' with PK '{1}' in '{2}'".format(
                 obj.__class__.__name__, obj.pk, index_name))
 
+    def update_object(self, obj, doc):
+        """
+        Updates some fields of the document of a Django ``models.Model``
+        object in the ES backend.
+
+        :param doc: Partial document, with the values of the changed fields.
+        """
+        self.is_connected()
+
+        index_name = self.get_index_name(obj)
+
+        with measure(obj.__class__, 'update', index_name) as request:
+            request.response = self._connection.update(
+                index=index_name,
+                doc_type=obj.__class__.__name__,
+                body={'doc': doc},
+                id=obj.pk
+            )
+
+        invalidate_searches(index_name)
+        self.evict_object(obj)
+
+        if settings.DEBUG:
+            logging.debug("Updated object '{0}' with PK '{1}' in '{2}'".format(
+                obj.__class__.__name__, obj.pk, index_name))
+
     def remove_object(self, obj):
         """
         Removes an object from the ES backend index.
         """
         self.is_connected()
 
-        index_name = obj._meta.index_name or self._client.index_name
+        index_name = self.get_index_name(obj)
 
-        self._connection.delete(
-            index=index_name,
-            doc_type=obj.__class__.__name__,
-            id=obj.pk
-        )
+        with measure(obj.__class__, 'delete', index_name) as request:
+            request.response = self._connection.delete(
+                index=index_name,
+                doc_type=obj.__class__.__name__,
+                id=obj.pk
+            )
+
+        invalidate_searches(index_name)
+        self.evict_object(obj)
 
         if settings.DEBUG:
             logging.debug("Deleted object '{0}' with PK '{1}' in '{2}'".format(
@@ -72,34 +298,247 @@ class ElasticManager(object):
         """
         Retrieves a specific object via its ``Model.pk`` from the ES backend.
         """
+        cache = get_document_cache()
+        if cache is not None:
+            key = self.document_key(obj)
+            doc = cache.get(key)
+            if doc is not None:
+                return doc
+
         self.is_connected()
 
-        return self._connection.get(
-            index=obj._meta.index_name or self._client.index_name,
-            doc_type=obj.__class__.__name__,
-            id=obj.pk
-        )
+        index_name = self.get_index_name(obj)
+        with measure(obj.__class__, 'get', index_name) as request:
+            doc = request.response = self._connection.get(
+                index=index_name,
+                doc_type=obj.__class__.__name__,
+                id=obj.pk
+            )
 
-    def search_match(self, index=None, **fields):
+        if cache is not None:
+            cache.set(key, doc)
+
+        return doc
+
+    def document_key(self, obj):
         """
-        Performs a 'term' query in Elasticsearch backend for the given string.
+        Key of the document of an object in the document cache.
+        """
+        return DocumentCache.key(
+            self.get_index_name(obj), obj.__class__.__name__, obj.pk)
+
+    def cache_document(self, index_name, doc_type, pk, source, response):
+        """
+        Stores a document just indexed in the document cache, if enabled, as
+        it would be retrieved by ``get_object``.
+
+        :param response: ES backend response to the indexing request.
+        """
+        cache = get_document_cache()
+        if cache is None:
+            return
+
+        cache.set(DocumentCache.key(index_name, doc_type, pk), {
+            '_index': response.get('_index', index_name),
+            '_type': doc_type,
+            '_id': response.get('_id', six.text_type(pk)),
+            '_version': response.get('_version'),
+            'found': True,
+            '_source': source,
+        })
+
+    def evict_object(self, obj):
+        """
+        Discards the document of an object from the document cache, if any.
+        """
+        cache = get_document_cache()
+        if cache is not None:
+            cache.delete(self.document_key(obj))
+
+    def index_objects(self, objs, chunk_size=500):
+        """
+        Indexes several Django ``models.Model`` objects in the ES backend,
+        using as many ``_bulk`` requests as needed.
+
+        :return: A list with a ``(success, item)`` tuple per object, in the
+        same order as the objects.
+        """
+        return self.bulk(
+            (self.index_action(obj) for obj in objs), chunk_size=chunk_size)
+
+    def remove_objects(self, objs, chunk_size=500):
         """
-        self._connection.search(
-            index=index or self._client.index_name,
-            body={
-                'query': {
-                    'bool': {
-                        'should': [
-                            {
-                                'match': {
-                                    key: fields[key]
-                                }
-                            } for key in fields.keys()
-                        ]
-                    }
-                }
+        Removes several objects from the ES backend index, using as many
+        ``_bulk`` requests as needed.
+
+        :return: A list with a ``(success, item)`` tuple per object, in the
+        same order as the objects.
+        """
+        return self.bulk(
+            (self.delete_action(obj) for obj in objs), chunk_size=chunk_size)
+
+    def get_objects(self, objs, chunk_size=100):
+        """
+        Retrieves several objects via their ``Model.pk`` from the ES backend,
+        using as many ``_mget`` requests as needed.
+
+        :return: A list with the ES response document for every object, in the
+        same order as the objects. Documents not found or failed are included
+        too, with ``found`` set to ``False`` or with an ``error``.
+        """
+        self.is_connected()
+
+        docs = []
+        for chunk in chunked(objs, chunk_size):
+            body = {
+                'docs': [
+                    {
+                        '_index': self.get_index_name(obj),
+                        '_type': obj.__class__.__name__,
+                        '_id': obj.pk,
+                    } for obj in chunk
+                ]
             }
-        )
+            with measure(self.model, 'mget', docs=len(chunk)) as request:
+                response = request.response = self._connection.mget(
+                    body=body)
+            docs.extend(response['docs'])
+
+        return docs
+
+    def match_query(self, **fields):
+        """
+        Builds a 'bool' query matching any of the given field values.
+        """
+        return {
+            'bool': {
+                'should': [
+                    {
+                        'match': {
+                            key: fields[key]
+                        }
+                    } for key in fields.keys()
+                ]
+            }
+        }
+
+    def search_match(self, index=None, **fields):
+        """
+        Performs a 'match' query in Elasticsearch backend for the given field
+        values.
+
+        :return: The raw ES backend response.
+        """
+        return self.execute_search(
+            body={'query': self.match_query(**fields)}, index=index)
+
+    def execute_search(self, body, index=None, doc_type=None, **params):
+        """
+        Sends a search request to the ES backend.
+
+        :param body: Search request body, in ES DSL.
+        :param index: Index to search in. Defaults to the default index.
+        :param doc_type: Document type(s) to search for, if any.
+        :param params: Additional parameters for the ES ``search`` API.
+        :return: The raw ES backend response.
+        """
+        self.is_connected()
+
+        index = index or self._client.index_name
+
+        def search():
+            with measure(self.model, 'search', index) as request:
+                request.response = self._connection.search(
+                    index=index, doc_type=doc_type, body=body, **params)
+            return request.response
+
+        return cached_search(search, index, doc_type, body, params)
+
+    def search(self, query=None, index=None, page_size=20, **fields):
+        """
+        Searches objects of the model this manager is bound to, e.g.
+        ``Book.elastic.search(title='python')``.
+
+        :param query: Query in ES DSL. If not given, a 'match' query for the
+        given field values is performed, like in ``search_match``.
+        :param index: Index to search in. Defaults to the model index.
+        :param page_size: Number of hits retrieved per request when iterating
+        over the results.
+        :return: A lazy ``SearchResults`` object, yielding model instances.
+        """
+        if self.model is None:
+            raise InvalidElasticsearchOperationError(
+                'Searches must be performed through the manager of a model, '
+                'e.g. `Book.elastic.search()`.')
+
+        if query is None:
+            query = self.match_query(**fields)
+
+        return SearchResults(
+            self, query, index=index or self.get_index_name(self.model),
+            page_size=page_size)
+
+    def scan_pages(self, query=None, index=None, doc_type=None,
+                   page_size=1000, source=None, sort=None, scroll='5m'):
+        """
+        Streams all the hits of a query using the scroll API, a page at a time,
+        so memory usage is bounded by ``page_size`` whatever the number of
+        hits. Unlike ``from``/``size`` pagination, it has no depth limit.
+
+        :param query: Query in ES DSL. Defaults to all the documents.
+        :param index: Index to search in. Defaults to the model index, if the
+        manager is bound to a model, or the default index.
+        :param doc_type: Document type(s) to search for. Defaults to the model
+        documents, if the manager is bound to a model.
+        :param page_size: Number of hits per page.
+        :param source: ``_source`` filtering, e.g. ``False`` or a list of
+        fields to be retrieved.
+        :param sort: Sort order of the hits. Defaults to index order, which is
+        the most efficient one.
+        :param scroll: Time the scroll context is kept alive between pages.
+        :return: A generator of lists of hits.
+        """
+        if self.model is not None:
+            index = index or self.get_index_name(self.model)
+            doc_type = doc_type or self.model.__name__
+
+        body = {
+            'query': query or {'match_all': {}},
+            'sort': sort or ['_doc'],
+            'size': page_size,
+        }
+        if source is not None:
+            body['_source'] = source
+
+        response = self.execute_search(
+            body, index=index, doc_type=doc_type, scroll=scroll)
+        scroll_id = response.get('_scroll_id')
+
+        try:
+            hits = response['hits']['hits']
+            while hits:
+                yield hits
+
+                with measure(self.model, 'scroll', index) as request:
+                    response = request.response = self._connection.scroll(
+                        scroll_id=scroll_id, scroll=scroll)
+                scroll_id = response.get('_scroll_id', scroll_id)
+                hits = response['hits']['hits']
+        finally:
+            if scroll_id:
+                self._connection.clear_scroll(
+                    scroll_id=scroll_id, ignore=(404,))
+
+    def scan(self, query=None, **kwargs):
+        """
+        Streams all the hits of a query, one at a time. Takes the same
+        arguments as ``scan_pages``.
+
+        :return: A generator of hits.
+        """
+        for hits in self.scan_pages(query, **kwargs):
+            for hit in hits:
+                yield hit
 
     def search_prefix(self):
         """
@@ -0,0 +1,132 @@
+from collections import OrderedDict
+
+from .serializers import FINGERPRINT_FIELD
+
+# ES field datatypes of the Django field types, as serialized in documents.
+FIELD_TYPES = {
+    'AutoField': 'integer',
+    'BigAutoField': 'long',
+    'BigIntegerField': 'long',
+    'BooleanField': 'boolean',
+    'CharField': 'text',
+    'DateField': 'date',
+    'DateTimeField': 'date',
+    'DurationField': 'keyword',
+    'EmailField': 'keyword',
+    'FilePathField': 'keyword',
+    'FloatField': 'double',
+    'GenericIPAddressField': 'ip',
+    'IPAddressField': 'ip',
+    'IntegerField': 'integer',
+    'NullBooleanField': 'boolean',
+    'PositiveIntegerField': 'integer',
+    'PositiveSmallIntegerField': 'short',
+    'SlugField': 'keyword',
+    'SmallIntegerField': 'short',
+    'TextField': 'text',
+    'TimeField': 'keyword',
+    'URLField': 'keyword',
+    'UUIDField': 'keyword',
+}
+
+# Field types stored in documents, but not worth searching by.
+UNSEARCHED_FIELD_TYPES = frozenset((
+    'BinaryField', 'FileField', 'FilePathField', 'ImageField'))
+
+
+def field_mapping(field):
+    """
+    Builds the ES mapping of the document value of a model ``field``.
+
+    Relations are mapped like the primary key of the related model. Fields
+    with choices are mapped as ``keyword``, being matched as a whole.
+
+    :return: A ``dict`` with the field mapping, or ``None`` if the type of
+    the field is unknown, to be left to ES dynamic mapping.
+    """
+    if field.remote_field:
+        return field_mapping(field.target_field)
+
+    internal_type = field.get_internal_type()
+    if internal_type in UNSEARCHED_FIELD_TYPES:
+        return {'type': 'keyword', 'index': False}
+
+    es_type = FIELD_TYPES.get(internal_type)
+    if es_type is None:
+        if internal_type == 'DecimalField':
+            return {
+                'type': 'scaled_float',
+                'scaling_factor': 10 ** field.decimal_places,
+            }
+        return None
+
+    if es_type == 'text' and field.choices:
+        es_type = 'keyword'
+    return {'type': es_type}
+
+
+def related_mapping(related_serializer):
+    """
+    Builds the ES mapping of the related objects embedded into documents, as
+    an ``object`` with the selected fields of the related model.
+    """
+    properties = OrderedDict()
+    for field in related_serializer.fields:
+        mapping = field_mapping(field)
+        if mapping is not None:
+            properties[field.name] = mapping
+
+    pk_mapping = field_mapping(related_serializer.field.related_model._meta.pk)
+    if pk_mapping is not None:
+        properties['pk'] = pk_mapping
+
+    return {'type': 'object', 'properties': properties}
+
+
+def get_mapping(model):
+    """
+    Builds the ES mapping of the documents of an ``ElasticModel``, covering
+    the fields selected to be indexed.
+
+    Mappings given in the ``elastic_mapping`` ``Meta`` option replace the ones
+    derived from the model fields. Embedded relations are mapped as objects.
+    """
+    meta = model._meta
+    serializer = meta.document_serializer
+    overrides = meta.elastic_mapping or {}
+
+    properties = OrderedDict()
+    fields = serializer.document_fields + serializer.document_m2m_fields
+    for field in fields:
+        mapping = overrides.get(field.name)
+        if mapping is None and field.name in serializer.related:
+            mapping = related_mapping(serializer.related[field.name])
+        if mapping is None:
+            mapping = field_mapping(field)
+        if mapping is not None:
+            properties[field.name] = mapping
+
+    pk_mapping = field_mapping(meta.pk)
+    if pk_mapping is not None:
+        properties['pk'] = pk_mapping
+    # Only ever read back, by ``check_index``.
+    properties[FINGERPRINT_FIELD] = {
+        'type': 'keyword', 'index': False, 'doc_values': False}
+
+    return {'properties': properties}
+
+
+def get_index_body(models, settings=None):
+    """
+    Builds the body of a request creating an index for the documents of the
+    given models, with their mappings.
+
+    :param settings: Optional ``dict`` of index settings.
+    """
+    body = {
+        'mappings': OrderedDict(
+            (model.__name__, get_mapping(model)) for model in models),
+    }
+    if settings:
+        body['settings'] = {'index': settings}
+    return body
@@ -0,0 +1,35 @@
+import logging
+
+from .profiler import profile
+
+
+class ElasticProfilerMiddleware(object):
+    """
+    Records the ES requests made while serving every HTTP request, available
+    to views as ``request.elastic_profile``.
+
+    Responses get ``X-Elasticsearch-Requests`` and ``X-Elasticsearch-Time``
+    headers, and a warning is logged for every N+1 pattern found (single
+    document operations repeated in a loop). Meant for development: ES
+    requests are only recorded when made by the thread serving the request.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with profile() as request_profile:
+            request.elastic_profile = request_profile
+            response = self.get_response(request)
+
+        response['X-Elasticsearch-Requests'] = str(len(request_profile.calls))
+        response['X-Elasticsearch-Time'] = '{0:.1f}ms'.format(
+            request_profile.duration * 1000)
+
+        for model, operation, index, count in request_profile.repeated():
+            logging.warning(
+                "'{0}' ES requests repeated {1} times for '{2}' in '{3}' "
+                "serving '{4}'. Consider the bulk operations of the "
+                "manager.".format(operation, count, model, index,
+                                  request.path))
+
+        return response
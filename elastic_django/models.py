@@ -1,14 +1,15 @@
-import json
-
 from django.conf import settings
-from django.core import serializers
 from django.core.exceptions import ImproperlyConfigured
 from django.db import models
 from django.utils import six
 from django.utils.encoding import force_str
 
+from elasticsearch.exceptions import NotFoundError
+
+from . import indexing, outbox, related
 from .exceptions import InvalidElasticsearchOperationError
-from .manager import ElasticManager
+from .async_manager import AsyncElasticManager
+from .serializers import ElasticSerializer
 
 
 class ElasticModelBase(models.base.ModelBase):
@@ -56,8 +57,40 @@ class ElasticModelBase(models.base.ModelBase):
                 elastic_meta['elastic_exclude'] = elastic_exclude
                 delattr(attrs['Meta'], 'elastic_exclude')
 
-            fields = elastic_meta.get('elastic_fields') or elastic_meta.get(
-                'elastic_exclude') or []
+            if hasattr(attrs['Meta'], 'elastic_mapping'):
+                elastic_mapping = attrs['Meta'].elastic_mapping
+                if not isinstance(elastic_mapping, dict):
+                    raise ImproperlyConfigured(
+                        '`elastic_mapping` must be a dict.')
+
+                elastic_meta['elastic_mapping'] = elastic_mapping
+                delattr(attrs['Meta'], 'elastic_mapping')
+
+            if hasattr(attrs['Meta'], 'elastic_related'):
+                elastic_related = attrs['Meta'].elastic_related
+                if not isinstance(elastic_related, dict) or not all(
+                        isinstance(names, (tuple, list))
+                        for names in elastic_related.values()):
+                    raise ImproperlyConfigured(
+                        '`elastic_related` must be a dict of tuples or '
+                        'lists.')
+
+                for field in elastic_related:
+                    if field in attrs and not getattr(
+                            attrs[field], 'is_relation', False):
+                        raise ImproperlyConfigured(
+                            "The field '{0}' specified in `elastic_related` "
+                            "is not a relation of model '{1}'".format(
+                                field, name))
+
+                elastic_meta['elastic_related'] = elastic_related
+                delattr(attrs['Meta'], 'elastic_related')
+
+            fields = list(
+                elastic_meta.get('elastic_fields') or
+                elastic_meta.get('elastic_exclude') or [])
+            fields.extend(elastic_meta.get('elastic_mapping', ()))
+            fields.extend(elastic_meta.get('elastic_related', ()))
             for field in fields:
                 if field not in attrs or not isinstance(
                         attrs[field], models.fields.Field):
@@ -75,6 +108,18 @@ class ElasticModelBase(models.base.ModelBase):
                 'elastic_fields', None)
             new_class._meta.elastic_exclude = elastic_meta.get(
                 'elastic_exclude', None)
+            new_class._meta.elastic_mapping = elastic_meta.get(
+                'elastic_mapping', None)
+            new_class._meta.elastic_related = elastic_meta.get(
+                'elastic_related', None)
+
+            if not new_class._meta.abstract:
+                # Resolve the fields to be indexed once and for all.
+                new_class._meta.document_serializer = ElasticSerializer(
+                    new_class)
+                # Saving related objects reindexes the documents embedding
+                # them.
+                related.register_dependencies(new_class)
 
         return new_class
 
@@ -85,7 +130,7 @@ class ElasticModel(six.with_metaclass(ElasticModelBase, models.Model)):
     capabilities.
     """
     # Custom ES model manager.
-    elastic = ElasticManager()
+    elastic = AsyncElasticManager()
 
     class Meta:
         abstract = True
@@ -97,6 +142,17 @@ class ElasticModel(six.with_metaclass(ElasticModelBase, models.Model)):
             u = '[Bad Unicode data]'
         return force_str('<{0}: {1} - w/ES>'.format(self.__class__.__name__, u))
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Overrides base Django ``models.Model.from_db`` method to keep track of
+        the indexed values loaded from DB, which are assumed to be indexed
+        already.
+        """
+        instance = super(ElasticModel, cls).from_db(db, field_names, values)
+        instance.elastic_snapshot()
+        return instance
+
     def save(self, *args, **kwargs):
         """
         Overrides base Django ``models.Model.save`` method to implement
@@ -105,11 +161,34 @@ class ElasticModel(six.with_metaclass(ElasticModelBase, models.Model)):
         By default, this implementation will automatically index/update the
         current model instance in any ``save`` call. This behaviour can be
         changed by setting ``ELASTICSEARCH_AUTO_INDEX`` to ``False``.
+
+        Objects loaded from DB or indexed before are only indexed again if
+        any of their indexed fields changed, unless
+        ``ELASTICSEARCH_SKIP_UNCHANGED`` is set to ``False``. With
+        ``ELASTICSEARCH_PARTIAL_UPDATES`` set to ``True``, only the changed
+        fields are sent.
+
+        With ``ELASTICSEARCH_INDEXING_MODE`` set to ``'on_commit'``, saves
+        within a transaction are indexed in bulk once it's committed. With
+        ``'async'``, they are indexed in bulk by background threads.
+        Inserted objects are always indexed.
         """
+        inserting = self._state.adding or kwargs.get(
+            'force_insert', args[0] if args else False)
+
         super(ElasticModel, self).save(*args, **kwargs)
 
         if getattr(settings, 'ELASTICSEARCH_AUTO_INDEX', True):
-            self.index()
+            update_fields = kwargs.get(
+                'update_fields', args[3] if len(args) > 3 else None)
+            changed = None if inserting else self.elastic_changed_fields(
+                update_fields)
+            if changed is None:
+                self.index()
+            elif changed:
+                partial = getattr(
+                    settings, 'ELASTICSEARCH_PARTIAL_UPDATES', False)
+                self.index(fields=changed if partial else None)
 
     def delete(self, using=None):
         """
@@ -121,11 +200,37 @@ class ElasticModel(six.with_metaclass(ElasticModelBase, models.Model)):
 
         super(ElasticModel, self).delete(using)
 
-    def index(self):
+    def index(self, fields=None):
         """
         Index the object in Elasticsearch backend.
+
+        :param fields: Names of the only fields to be updated in the existing
+        ES document. Only applies when indexing right away; deferred indexing
+        always sends the whole document.
         """
-        self.elastic.index_object(self)
+        if indexing.is_deferred(self):
+            # The operation may be discarded on rollback: no snapshot taken.
+            indexing.defer(self, self.elastic.index_action(self))
+            self.elastic.evict_object(self)
+            return
+
+        try:
+            if fields:
+                try:
+                    self.elastic.update_object(
+                        self, self._meta.document_serializer.serialize_fields(
+                            self, fields))
+                except NotFoundError:
+                    self.elastic.index_object(self)
+            else:
+                self.elastic.index_object(self)
+        except indexing.UNAVAILABLE_ERRORS:
+            # Keep the operation to be replayed later on, if possible.
+            if not outbox.write([self.elastic.index_action(self)]):
+                raise
+            self.elastic.evict_object(self)
+
+        self.elastic_snapshot()
 
     def index_delete(self):
         """
@@ -137,7 +242,94 @@ class ElasticModel(six.with_metaclass(ElasticModelBase, models.Model)):
                 'The model must be stored in DB backend prior to be deleted in'
                 ' Elasticsearch.')
 
-        self.elastic.remove_object(self)
+        if indexing.is_deferred(self):
+            indexing.defer(self, self.elastic.delete_action(self))
+            self.elastic.evict_object(self)
+        else:
+            try:
+                self.elastic.remove_object(self)
+            except indexing.UNAVAILABLE_ERRORS:
+                if not outbox.write([self.elastic.delete_action(self)]):
+                    raise
+                self.elastic.evict_object(self)
+
+    async def asave(self, *args, **kwargs):
+        """
+        Coroutine counterpart of ``save``. The object is saved in a thread,
+        and indexed with the async ES client, without blocking the event loop.
+        """
+        from asgiref.sync import sync_to_async
+
+        await sync_to_async(super(ElasticModel, self).save)(*args, **kwargs)
+
+        if getattr(settings, 'ELASTICSEARCH_AUTO_INDEX', True):
+            update_fields = kwargs.get(
+                'update_fields', args[3] if len(args) > 3 else None)
+            changed = self.elastic_changed_fields(update_fields)
+            if changed is None:
+                await self.aindex()
+            elif changed:
+                partial = getattr(
+                    settings, 'ELASTICSEARCH_PARTIAL_UPDATES', False)
+                await self.aindex(fields=changed if partial else None)
+
+    async def adelete(self, using=None):
+        """
+        Coroutine counterpart of ``delete``.
+        """
+        from asgiref.sync import sync_to_async
+
+        if getattr(settings, 'ELASTICSEARCH_AUTO_INDEX', True):
+            await self.aindex_delete()
+
+        await sync_to_async(super(ElasticModel, self).delete)(using)
+
+    async def aindex(self, fields=None):
+        """
+        Coroutine counterpart of ``index``.
+        """
+        if indexing.is_deferred(self):
+            indexing.defer(self, self.elastic.index_action(self))
+            self.elastic.evict_object(self)
+            return
+
+        try:
+            if fields:
+                try:
+                    await self.elastic.aupdate_object(
+                        self, self._meta.document_serializer.serialize_fields(
+                            self, fields))
+                except NotFoundError:
+                    await self.elastic.aindex_object(self)
+            else:
+                await self.elastic.aindex_object(self)
+        except indexing.UNAVAILABLE_ERRORS:
+            if not outbox.write([self.elastic.index_action(self)]):
+                raise
+            self.elastic.evict_object(self)
+
+        self.elastic_snapshot()
+
+    async def aindex_delete(self):
+        """
+        Coroutine counterpart of ``index_delete``.
+        """
+        if not self.pk:
+            raise InvalidElasticsearchOperationError(
+                'The model must be stored in DB backend prior to be deleted in'
+                ' Elasticsearch.')
+
+        if indexing.is_deferred(self):
+            indexing.defer(self, self.elastic.delete_action(self))
+            self.elastic.evict_object(self)
+            return
+
+        try:
+            await self.elastic.aremove_object(self)
+        except indexing.UNAVAILABLE_ERRORS:
+            if not outbox.write([self.elastic.delete_action(self)]):
+                raise
+            self.elastic.evict_object(self)
 
     def elastic_serializer(self):
         """
@@ -151,24 +343,43 @@ class ElasticModel(six.with_metaclass(ElasticModelBase, models.Model)):
         :return: A JSON-serializable data set representing this model instance
         serialized.
         """
-        if self._meta.elastic_fields:
-            # Serialize only custom fields here (plus the mandatory object PK).
-            data = serializers.serialize(
-                'json', [self], fields=self._meta.elastic_fields)
-        elif self._meta.elastic_exclude:
-            # Serialize all the fields of the model here, except those marked
-            # as to be excluded.
-            fields = []
-            for field in self._meta.fields:
-                if field.name not in self._meta.elastic_exclude:
-                    fields.append(field.name)
-            data = serializers.serialize('json', [self], fields=fields)
-        else:
-            # Serialize all fields.
-            data = serializers.serialize('json', [self])
+        return self._meta.document_serializer.serialize(self)
+
+    def elastic_snapshot(self):
+        """
+        Takes note of the current values of the indexed fields, as the ones
+        stored in the ES document, if changes are tracked (see
+        ``elastic_changed_fields``).
+        """
+        serializer = self._meta.document_serializer
+        if serializer.tracks_changes and getattr(
+                settings, 'ELASTICSEARCH_SKIP_UNCHANGED', True):
+            self._elastic_snapshot = serializer.snapshot(self)
+
+    def elastic_changed_fields(self, update_fields=None):
+        """
+        Finds out the indexed fields changed since the object was loaded from
+        DB or indexed.
+
+        :param update_fields: Names of the only fields saved, if any.
+        :return: A list of field names, or ``None`` if changes are unknown.
+        """
+        if not getattr(settings, 'ELASTICSEARCH_SKIP_UNCHANGED', True):
+            return None
+
+        serializer = self._meta.document_serializer
+        if not serializer.tracks_changes:
+            return None
 
-        data = json.loads(data)
-        doc = data[0]['fields']
-        doc.update({'pk': data[0]['pk']})
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if not any(
+                    field.name in update_fields or
+                    field.attname in update_fields
+                    for field in serializer.document_fields):
+                return []
 
-        return doc
+        snapshot = self.__dict__.get('_elastic_snapshot')
+        if snapshot is None:
+            return None
+        return serializer.changed_fields(self, snapshot)
@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import six
+
+
+def get_outbox_path():
+    """
+    Path of the outbox file configured in ``ELASTICSEARCH_OUTBOX_PATH``
+    setting, if any.
+    """
+    return getattr(settings, 'ELASTICSEARCH_OUTBOX_PATH', None)
+
+
+def is_enabled():
+    return bool(get_outbox_path())
+
+
+def write(actions, path=None):
+    """
+    Appends ``_bulk`` API actions to the outbox file, one JSON document per
+    line.
+
+    All the actions are written with a single system call on a file opened in
+    append mode, so several processes can write to the same outbox.
+
+    :return: ``True`` if the actions were stored, ``False`` if there is no
+    outbox configured.
+    """
+    path = path or get_outbox_path()
+    if not path:
+        return False
+
+    # Primary keys may not be JSON native (e.g. UUIDs).
+    data = ''.join(
+        json.dumps(action, separators=(',', ':'), default=str) + '\n'
+        for action in actions)
+    if not data:
+        return True
+
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data.encode('utf-8'))
+    finally:
+        os.close(fd)
+
+    return True
+
+
+def is_retriable(item):
+    """
+    Checks if a failed ``_bulk`` API item may succeed if sent again later, i.e.
+    it didn't fail because of the document itself.
+    """
+    result = list(item.values())[0] if item else {}
+    status = result.get('status')
+    if not isinstance(status, six.integer_types):
+        # Connection errors and the like.
+        return True
+    return status == 429 or status >= 500
+
+
+def write_failed(actions, results, path=None):
+    """
+    Stores in the outbox the actions whose ``_bulk`` API results show a
+    temporary failure.
+
+    :param actions: List of sent actions.
+    :param results: List of ``(success, item)`` results, in the same order
+    as the actions.
+    :return: Number of actions stored in the outbox.
+    """
+    failed = [
+        action for action, (ok, item) in zip(actions, results)
+        if not ok and is_retriable(item)]
+    if failed and write(failed, path=path):
+        return len(failed)
+    return 0
+
+
+def rewrite_failed(actions, results, path):
+    """
+    Replaces an outbox file with the actions whose ``_bulk`` API results show
+    a temporary failure, or removes it if there are none.
+
+    :return: Number of actions kept.
+    """
+    partial_path = path + '.partial'
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+
+    kept = write_failed(actions, results, path=partial_path)
+    if kept:
+        os.rename(partial_path, path)
+    elif os.path.exists(path):
+        os.remove(path)
+    return kept
+
+
+def move(source, path):
+    """
+    Appends the actions of an outbox file to another one, after the ones
+    already there, and removes it.
+    """
+    with open(source, 'rb') as source_file:
+        with open(path, 'ab') as outbox:
+            shutil.copyfileobj(source_file, outbox)
+    os.remove(source)
+
+
+def read(path):
+    """
+    Reads the actions of an outbox file, keeping only the last action for
+    every document.
+
+    :return: A list of ``_bulk`` API actions, and the number of actions
+    actually read from the file.
+    """
+    actions = OrderedDict()
+    count = 0
+    with open(path) as outbox:
+        for line in outbox:
+            line = line.strip()
+            if not line:
+                continue
+            action = json.loads(line)
+            key = (action['_index'], action['_type'], action['_id'])
+            actions.pop(key, None)
+            actions[key] = action
+            count += 1
+
+    return list(actions.values()), count
@@ -0,0 +1,61 @@
+"""
+Django Debug Toolbar panel listing the ES requests made while serving a
+request. Enable it by adding ``'elastic_django.panels.ElasticPanel'`` to
+``DEBUG_TOOLBAR_PANELS``.
+"""
+from django.utils.html import format_html, format_html_join
+
+from debug_toolbar.panels import Panel
+
+from .profiler import profile
+
+
+class ElasticPanel(Panel):
+    title = 'Elasticsearch'
+
+    @property
+    def nav_subtitle(self):
+        stats = self.get_stats()
+        return '{0} requests in {1:.1f}ms'.format(
+            len(stats.get('calls', [])), stats.get('duration', 0) * 1000)
+
+    def process_request(self, request):
+        with profile() as request_profile:
+            response = super(ElasticPanel, self).process_request(request)
+
+        self.record_stats({
+            'calls': request_profile.calls,
+            'duration': request_profile.duration,
+            'repeated': request_profile.repeated(),
+        })
+        return response
+
+    @property
+    def content(self):
+        stats = self.get_stats()
+
+        warnings = format_html_join(
+            '', '<p><strong>{0}</strong> repeated {1} times for {2} in {3}; '
+            'consider the bulk operations of the manager.</p>',
+            ((operation, count, model, index)
+             for model, operation, index, count in stats['repeated']))
+
+        rows = format_html_join(
+            '', '<tr><td>{0}</td><td>{1}</td><td>{2}</td><td>{3}</td>'
+            '<td>{4}</td><td>{5}</td><td>{6}</td><td>{7}</td><td>{8}</td>'
+            '<td>{9}</td></tr>',
+            ((call['operation'], call['model'] or '', call['index'] or '',
+              '{0:.1f}'.format(call['duration'] * 1000),
+              '' if call['took'] is None else call['took'],
+              call['request_bytes'], call['response_bytes'],
+              call['retries'], call['docs'],
+              call['error'] or call['failed'] or '')
+             for call in stats['calls']))
+
+        return format_html(
+            '{0}<table><thead><tr><th>Operation</th><th>Model</th>'
+            '<th>Index</th><th>Time (ms)</th><th>Took (ms)</th>'
+            '<th>Request bytes</th><th>Response bytes</th><th>Retries</th>'
+            '<th>Documents</th><th>Errors</th></tr></thead><tbody>{1}</tbody>'
+            '</table>',
+            warnings, rows)
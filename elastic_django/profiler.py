@@ -0,0 +1,142 @@
+"""
+Recording of the ES requests made by the current thread, e.g. while serving
+an HTTP request, to find slow or repetitive ES usage.
+
+Usage::
+
+    with profile() as requests_profile:
+        ...
+    print(requests_profile.duration, requests_profile.repeated())
+"""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .signals import es_request
+
+# Operations on a single document: many of them in a row usually mean
+# a loop which should use the bulk counterparts (``get_objects``,
+# ``index_objects``...) instead.
+SINGLE_DOCUMENT_OPERATIONS = frozenset(('index', 'update', 'delete', 'get'))
+
+_local = threading.local()
+
+# Number of active profiles in every thread: the signal receiver is only
+# connected meanwhile, not to compute requests sizes for nothing.
+_active_count = 0
+_lock = threading.Lock()
+
+
+def _active_profiles():
+    if not hasattr(_local, 'profiles'):
+        _local.profiles = []
+    return _local.profiles
+
+
+def _record(sender, **kwargs):
+    for active in _active_profiles():
+        active.record(sender, **kwargs)
+
+
+class Profile(object):
+    """
+    ES requests recorded while a profile is active.
+    """
+    def __init__(self):
+        self.calls = []
+
+    def record(self, sender, operation, index, duration, took, request_bytes,
+               response_bytes, retries, docs, failed, error, **kwargs):
+        self.calls.append({
+            'model': sender._meta.label if sender is not None else None,
+            'operation': operation,
+            'index': index,
+            'duration': duration,
+            'took': took,
+            'request_bytes': request_bytes,
+            'response_bytes': response_bytes,
+            'retries': retries,
+            'docs': docs,
+            'failed': failed,
+            'error': error,
+        })
+
+    @property
+    def duration(self):
+        """
+        Wall time of all the requests, in seconds.
+        """
+        return sum(call['duration'] for call in self.calls)
+
+    def repeated(self, threshold=None):
+        """
+        Finds N+1 patterns, i.e. single document operations repeated for the
+        same model and index at least ``threshold`` times, as per
+        ``ELASTICSEARCH_PROFILER_REPEATED_THRESHOLD`` setting if not given.
+
+        :return: A list of ``(model, operation, index, count)`` tuples.
+        """
+        if threshold is None:
+            threshold = getattr(
+                settings, 'ELASTICSEARCH_PROFILER_REPEATED_THRESHOLD', 3)
+
+        counts = OrderedDict()
+        for call in self.calls:
+            if call['operation'] in SINGLE_DOCUMENT_OPERATIONS:
+                key = (call['model'], call['operation'], call['index'])
+                counts[key] = counts.get(key, 0) + 1
+
+        return [
+            key + (count,) for key, count in counts.items()
+            if count >= threshold
+        ]
+
+
+def start_profile():
+    """
+    Starts recording the ES requests of the current thread.
+
+    :return: The new ``Profile``.
+    """
+    global _active_count
+
+    with _lock:
+        if not _active_count:
+            es_request.connect(
+                _record, dispatch_uid='elastic_django.profiler')
+        _active_count += 1
+
+    new_profile = Profile()
+    _active_profiles().append(new_profile)
+    return new_profile
+
+
+def stop_profile(active):
+    """
+    Stops recording ES requests into the given ``Profile``.
+    """
+    global _active_count
+
+    profiles = _active_profiles()
+    if active not in profiles:
+        return
+    profiles.remove(active)
+
+    with _lock:
+        _active_count -= 1
+        if not _active_count:
+            es_request.disconnect(dispatch_uid='elastic_django.profiler')
+
+
+@contextmanager
+def profile():
+    """
+    Records the ES requests of the current thread within the block.
+    """
+    active = start_profile()
+    try:
+        yield active
+    finally:
+        stop_profile(active)
@@ -0,0 +1,182 @@
+"""
+Indexing of the documents embedding related objects (see the
+``elastic_related`` ``Meta`` option) when those objects change.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.db.models.fields.related import lazy_related_operation
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete)
+
+from . import indexing
+from .manager import chunked
+
+# Relations embedding the objects of every related model, as
+# ``(model, field)`` tuples, per related model.
+_dependents = {}
+
+# Many to many relation embedding objects, as a ``(model, field)`` tuple, per
+# intermediary model.
+_m2m_dependents = {}
+
+
+def iter_objects(queryset, chunk_size=2000):
+    """
+    Iterates over the objects of a ``QuerySet`` to be serialized, with their
+    embedded relations retrieved in bulk, reading the DB in chunks.
+
+    Foreign keys are joined. Many to many relations need whole chunks to be
+    prefetched, which are read by primary key ranges (keyset pagination),
+    ordered by primary key; otherwise objects are read with a server-side
+    cursor, in the order of the ``QuerySet``.
+    """
+    serializer = queryset.model._meta.document_serializer
+    if serializer.select_related:
+        queryset = queryset.select_related(*serializer.select_related)
+
+    if not serializer.prefetch_related:
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            yield obj
+        return
+
+    queryset = queryset.order_by('pk')
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        serializer.prefetch(chunk)
+        for obj in chunk:
+            yield obj
+        chunk = list(queryset.filter(pk__gt=chunk[-1].pk)[:chunk_size])
+
+
+def index_dependents(queryset, chunk_size=500):
+    """
+    Indexes the objects of a ``QuerySet`` in bulk, as per the configured
+    indexing mode, unless automatic indexing is disabled.
+    """
+    if not getattr(settings, 'ELASTICSEARCH_AUTO_INDEX', True):
+        return
+
+    elastic = queryset.model.elastic
+    for chunk in chunked(iter_objects(queryset, chunk_size), chunk_size):
+        actions = [elastic.index_action(obj) for obj in chunk]
+        if indexing.is_deferred(chunk[0]):
+            for obj, action in zip(chunk, actions):
+                indexing.defer(obj, action)
+        else:
+            indexing.send(actions)
+
+
+def remove_dependents(model, pks):
+    """
+    Removes the documents of the given objects, no longer in the DB.
+    """
+    if not pks or not getattr(settings, 'ELASTICSEARCH_AUTO_INDEX', True):
+        return
+
+    objs = [model(pk=pk) for pk in pks]
+    actions = [model.elastic.delete_action(obj) for obj in objs]
+    if indexing.is_deferred(objs[0]):
+        for obj, action in zip(objs, actions):
+            indexing.defer(obj, action)
+    else:
+        indexing.send(actions)
+
+
+def related_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Indexes the documents embedding a saved object, unless none of the
+    embedded fields were saved.
+    """
+    if raw:
+        return
+
+    for model, field in _dependents.get(sender, ()):
+        related = model._meta.document_serializer.related[field.name]
+        if update_fields is not None and not (
+                set(update_fields) & set(related.names)):
+            continue
+        index_dependents(
+            model._default_manager.filter(**{field.name: instance}))
+
+
+def related_deleting(sender, instance, **kwargs):
+    """
+    Takes note of the objects embedding an object about to be deleted.
+    """
+    instance._elastic_dependents = [
+        (model, list(model._default_manager.filter(
+            **{field.name: instance}).values_list('pk', flat=True)))
+        for model, field in _dependents.get(sender, ())
+    ]
+
+
+def related_deleted(sender, instance, **kwargs):
+    """
+    Indexes the documents which embedded a deleted object, or removes them if
+    their objects were deleted too (cascade).
+    """
+    for model, pks in instance.__dict__.pop('_elastic_dependents', ()):
+        queryset = model._default_manager.filter(pk__in=pks)
+        found = set(queryset.values_list('pk', flat=True))
+        index_dependents(queryset)
+        remove_dependents(model, [pk for pk in pks if pk not in found])
+
+
+def related_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Indexes the documents whose embedded many to many relation changed.
+    """
+    model, field = _m2m_dependents[sender]
+
+    if not reverse:
+        # The object embedding the relation changed.
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            index_dependents(model._default_manager.filter(pk=instance.pk))
+    elif action == 'pre_clear':
+        instance._elastic_cleared = list(model._default_manager.filter(
+            **{field.name: instance}).values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if action == 'post_clear':
+            pk_set = instance.__dict__.pop('_elastic_cleared', ())
+        if pk_set:
+            index_dependents(model._default_manager.filter(pk__in=pk_set))
+
+
+def _add_dependent(field, model, related_model):
+    dependents = _dependents.setdefault(related_model, [])
+    if not dependents:
+        uid = 'elastic_django.related.{0}'.format(related_model._meta.label)
+        post_save.connect(
+            related_saved, sender=related_model, dispatch_uid=uid)
+        pre_delete.connect(
+            related_deleting, sender=related_model, dispatch_uid=uid)
+        post_delete.connect(
+            related_deleted, sender=related_model, dispatch_uid=uid)
+    dependents.append((model, field))
+
+
+def _add_m2m_dependent(field, model, through):
+    _m2m_dependents[through] = (model, field)
+    m2m_changed.connect(
+        related_changed, sender=through,
+        dispatch_uid='elastic_django.related.{0}'.format(through._meta.label))
+
+
+def register_dependencies(model):
+    """
+    Connects the signals indexing the documents of an ``ElasticModel`` when
+    the objects they embed change, once the related models are loaded.
+
+    Only the related models involved get signal receivers, so that other
+    models can still be deleted without fetching their objects.
+    """
+    serializer = model._meta.document_serializer
+    for related in serializer.related.values():
+        field = related.field
+        lazy_related_operation(
+            partial(_add_dependent, field), model, field.remote_field.model)
+        if field.many_to_many:
+            lazy_related_operation(
+                partial(_add_m2m_dependent, field), model,
+                field.remote_field.through)
@@ -0,0 +1,128 @@
+from django.utils import six
+
+
+class SearchResults(object):
+    """
+    Lazy results of a search over the documents of a model.
+
+    No request is sent to the ES backend until results are iterated, sliced,
+    indexed or counted. Hits are retrieved in pages, kept for later use, and
+    the model instances of every page are loaded with a single ``in_bulk`` DB
+    query, keeping the ES scoring order. Slices and indices refer to the
+    positions of the hits: hits whose objects are not in the DB anymore are
+    left out.
+    The score of every hit is available in the ``elastic_score`` attribute of
+    its instance.
+    """
+    def __init__(self, manager, query, index, page_size=20):
+        self.manager = manager
+        self.model = manager.model
+        self.query = query
+        self.index = index
+        self.page_size = page_size
+        self._total = None
+        self._pages = {}
+
+    def __repr__(self):
+        return '<SearchResults: {0} in {1!r}>'.format(
+            self.model.__name__, self.query)
+
+    def _search(self, start, size):
+        response = self.manager.execute_search(
+            body={'query': self.query, 'from': start, 'size': size},
+            index=self.index, doc_type=self.model.__name__)
+
+        total = response['hits']['total']
+        self._total = total['value'] if isinstance(total, dict) else total
+
+        return response['hits']['hits']
+
+    def hydrate(self, hits):
+        """
+        Loads the model instances of the given hits with a single DB query.
+        """
+        objs = self.model._default_manager.in_bulk(
+            [hit['_id'] for hit in hits])
+        objs = dict((six.text_type(pk), obj) for pk, obj in objs.items())
+
+        results = []
+        for hit in hits:
+            obj = objs.get(hit['_id'])
+            if obj is not None:
+                obj.elastic_score = hit.get('_score')
+                results.append(obj)
+
+        return results
+
+    def _page(self, number):
+        """
+        :return: The model instances of a page of hits, by hit position
+        (``None`` for hits whose objects are not in the DB anymore).
+        """
+        if number not in self._pages:
+            hits = self._search(number * self.page_size, self.page_size)
+            objs = dict(
+                (six.text_type(obj.pk), obj) for obj in self.hydrate(hits))
+            self._pages[number] = [objs.get(hit['_id']) for hit in hits]
+        return self._pages[number]
+
+    def _slice(self, start, stop=None):
+        """
+        :return: The model instances of the hits from ``start`` to ``stop``
+        (all the remaining ones if ``None``), by hit position.
+        """
+        objs = []
+        number = start // self.page_size
+        while stop is None or number * self.page_size < stop:
+            first = number * self.page_size
+            objs.extend(self._page(number)[
+                max(start - first, 0):
+                stop - first if stop is not None else None])
+            number += 1
+            if number * self.page_size >= self._total:
+                break
+        return objs
+
+    def count(self):
+        """
+        Total number of hits of the search.
+        """
+        if self._total is None:
+            # The first page is likely to be needed as well.
+            self._page(0)
+        return self._total
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        number = 0
+        while True:
+            for obj in self._page(number):
+                if obj is not None:
+                    yield obj
+            number += 1
+            if number * self.page_size >= self._total:
+                return
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop = key.start or 0, key.stop
+            if start < 0 or (stop is not None and stop < 0):
+                raise ValueError('Negative indexing is not supported.')
+
+            if stop is not None and stop <= start:
+                return []
+
+            objs = [obj for obj in self._slice(start, stop) if obj is not None]
+            return objs[::key.step] if key.step else objs
+
+        if not isinstance(key, six.integer_types):
+            raise TypeError('Search results indices must be integers.')
+        if key < 0:
+            raise ValueError('Negative indexing is not supported.')
+
+        objs = self._slice(key, key + 1)
+        if not objs or objs[0] is None:
+            raise IndexError('Search results index out of range.')
+        return objs[0]
@@ -0,0 +1,284 @@
+import datetime
+import decimal
+import hashlib
+import json
+import operator
+import uuid
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import prefetch_related_objects
+from django.utils.encoding import is_protected_type
+from django.utils.functional import cached_property
+
+
+# Field types whose values are already JSON-native (or strings), so they can
+# be copied to the document as they are.
+DIRECT_FIELD_TYPES = frozenset((
+    'AutoField', 'BigAutoField', 'BigIntegerField', 'BooleanField',
+    'CharField', 'EmailField', 'FloatField', 'IntegerField',
+    'NullBooleanField', 'PositiveIntegerField', 'PositiveSmallIntegerField',
+    'SlugField', 'SmallIntegerField', 'TextField', 'URLField',
+))
+
+_ENCODED_TYPES = (
+    datetime.datetime, datetime.date, datetime.time, decimal.Decimal,
+    uuid.UUID)
+
+_encoder = DjangoJSONEncoder()
+
+# Placeholder of the values not loaded in an object (deferred fields).
+_NOT_LOADED = object()
+
+# Document field storing the fingerprint of the rest of the document, so
+# documents can be checked without fetching their whole source.
+FINGERPRINT_FIELD = 'elastic_fingerprint'
+
+
+def to_json_value(value):
+    """
+    Converts a Python value into the very same value that a JSON encoding and
+    decoding round trip through ``DjangoJSONEncoder`` would produce.
+    """
+    if isinstance(value, _ENCODED_TYPES):
+        return _encoder.default(value)
+    return value
+
+
+def fingerprint(doc):
+    """
+    Hash of an ES document, independent of its keys order.
+    """
+    data = json.dumps(doc, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def field_converter(field):
+    """
+    Builds the function extracting the document value of a model ``field``
+    from an object, mimicking Django's JSON serializer output.
+    """
+    if field.get_internal_type() in DIRECT_FIELD_TYPES:
+        return operator.attrgetter(field.attname)
+
+    def convert(obj):
+        value = field.value_from_object(obj)
+        if is_protected_type(value):
+            return to_json_value(value)
+        return field.value_to_string(obj)
+
+    return convert
+
+
+def related_converter(field, related_serializer):
+    """
+    Builds the function extracting the embedded document of the object related
+    to another one through a foreign key ``field``.
+    """
+    def convert(obj):
+        related = getattr(obj, field.name)
+        if related is None:
+            return None
+        return related_serializer.serialize(related)
+
+    return convert
+
+
+class RelatedSerializer(object):
+    """
+    Serializer of the related objects embedded into documents, as per the
+    ``elastic_related`` ``Meta`` option: a selection of their fields, plus
+    their ``pk``.
+
+    The related model may not be loaded yet when the serializer is created,
+    so its fields are resolved on first use.
+    """
+    def __init__(self, field, names):
+        self.field = field
+        self.names = tuple(names)
+
+    @cached_property
+    def fields(self):
+        meta = self.field.related_model._meta
+        fields = []
+        for name in self.names:
+            try:
+                field = meta.get_field(name)
+            except FieldDoesNotExist:
+                field = None
+            if field is None or not field.concrete or field.many_to_many:
+                raise ImproperlyConfigured(
+                    "The field '{0}' specified in `elastic_related` for "
+                    "'{1}' is not a concrete field of model '{2}'".format(
+                        name, self.field.name, meta.object_name))
+            fields.append(field)
+        return fields
+
+    @cached_property
+    def converters(self):
+        meta = self.field.related_model._meta
+        return [
+            (field.name, field_converter(field)) for field in self.fields
+        ] + [('pk', field_converter(meta.pk))]
+
+    def serialize(self, obj):
+        return dict((name, convert(obj)) for name, convert in self.converters)
+
+
+class ElasticSerializer(object):
+    """
+    Serializer of ``ElasticModel`` objects into Elasticsearch documents.
+
+    The set of fields to serialize (as per ``elastic_fields`` and
+    ``elastic_exclude`` ``Meta`` options) and the converter of every field are
+    resolved once, when the model class is created, so serializing an object
+    only involves reading its attributes. The output is the same one produced
+    by Django's JSON serializer, plus the object ``pk`` and the fingerprint of
+    the document, except for the relations in the ``elastic_related`` ``Meta``
+    option, whose objects are embedded.
+    """
+    def __init__(self, model):
+        meta = model._meta
+        embedded = meta.elastic_related or {}
+
+        if meta.elastic_fields:
+            selected = set(meta.elastic_fields)
+        elif meta.elastic_exclude:
+            # Only concrete fields were serialized for exclusions; many to many
+            # relations are left out.
+            selected = set(
+                field.name for field in meta.fields
+                if field.name not in meta.elastic_exclude)
+        else:
+            selected = None
+        if selected is not None:
+            # Embedded relations are always indexed.
+            selected.update(embedded)
+
+        concrete_meta = meta.concrete_model._meta
+
+        # Model fields making up the documents, besides the ``pk``.
+        self.document_fields = []
+        for field in concrete_meta.local_fields:
+            if not field.serialize:
+                continue
+            name = field.attname[:-3] if field.remote_field else field.attname
+            if selected is None or name in selected:
+                self.document_fields.append(field)
+
+        self.document_m2m_fields = [
+            field for field in concrete_meta.many_to_many
+            if field.serialize and (
+                selected is None or field.attname in selected)
+        ]
+
+        # Serializers of the embedded related objects, per relation name.
+        self.related = dict(
+            (field.name, RelatedSerializer(field, embedded[field.name]))
+            for field in self.document_fields + self.document_m2m_fields
+            if field.name in embedded)
+
+        self.fields = [
+            (field.name, related_converter(field, self.related[field.name])
+             if field.name in self.related else field_converter(field))
+            for field in self.document_fields]
+        self.m2m_fields = [field.name for field in self.document_m2m_fields]
+
+        # Relations to be joined or prefetched when serializing many objects.
+        self.select_related = [
+            field.name for field in self.document_fields
+            if field.name in self.related]
+        self.prefetch_related = list(self.m2m_fields)
+
+        self.pk_converter = field_converter(meta.pk)
+
+        self.attnames = [field.attname for field in self.document_fields]
+
+    @property
+    def queries_db(self):
+        """
+        Whether serializing an object may query the DB, for its relations.
+        """
+        return bool(self.m2m_fields or self.related)
+
+    def prefetch(self, objs):
+        """
+        Retrieves the many to many relations of several objects to be
+        serialized, with a query per relation instead of per object.
+        """
+        if self.prefetch_related:
+            prefetch_related_objects(objs, *self.prefetch_related)
+
+    @property
+    def tracks_changes(self):
+        """
+        Whether changes of the documents can be detected from the values of
+        the objects (see ``snapshot``). Many to many relations are changed
+        without saving the objects, so their documents can't.
+        """
+        return not self.m2m_fields
+
+    def snapshot(self, obj):
+        """
+        Takes the primary key and the current values of the indexed fields of
+        an object, with no conversion at all, to detect changes later on with
+        ``changed_fields``.
+
+        Values are not copied: mutable values changed in place are not
+        detected.
+        """
+        values = obj.__dict__
+        return (obj.pk,) + tuple(
+            values.get(attname, _NOT_LOADED) for attname in self.attnames)
+
+    def changed_fields(self, obj, snapshot):
+        """
+        :return: List of the names of the indexed fields whose values changed
+        since the given ``snapshot`` of the object was taken, or ``None`` if
+        its primary key changed (e.g. an object copied by setting its ``pk``
+        to ``None``), as its document is a different one.
+        """
+        current = self.snapshot(obj)
+        if current[0] != snapshot[0]:
+            return None
+        return [
+            name for (name, _), old_value, value in zip(
+                self.fields, snapshot[1:], current[1:])
+            if value != old_value or value is _NOT_LOADED]
+
+    def serialize_fields(self, obj, names):
+        """
+        :return: A partial document with the values of the given fields, and
+        the fingerprint of the whole document, which changes with them.
+        """
+        names = set(names)
+        doc = dict(
+            (name, convert(obj)) for name, convert in self.fields
+            if name in names)
+        doc[FINGERPRINT_FIELD] = self.serialize(obj)[FINGERPRINT_FIELD]
+        return doc
+
+    def serialize(self, obj):
+        """
+        :return: A JSON-serializable ``dict`` representing the given object.
+        """
+        doc = dict((name, convert(obj)) for name, convert in self.fields)
+
+        prefetched = getattr(obj, '_prefetched_objects_cache', {})
+        for name in self.m2m_fields:
+            manager = getattr(obj, name)
+            if name in self.related:
+                doc[name] = [
+                    self.related[name].serialize(related)
+                    for related in manager.all()]
+            elif manager.through._meta.auto_created:
+                if name in prefetched:
+                    pks = [related.pk for related in manager.all()]
+                else:
+                    pks = manager.values_list('pk', flat=True)
+                doc[name] = [to_json_value(pk) for pk in pks]
+
+        doc['pk'] = self.pk_converter(obj)
+        doc[FINGERPRINT_FIELD] = fingerprint(doc)
+
+        return doc
@@ -0,0 +1,157 @@
+import asyncio
+import contextvars
+import time
+
+from django.dispatch import Signal
+
+# Sent after every request to the ES backend made through the managers, with
+# the model the manager is bound to (if any) as sender, and arguments:
+#
+# - ``operation``: ``'index'``, ``'update'``, ``'delete'``, ``'get'``,
+#   ``'mget'``, ``'bulk'``, ``'search'`` or ``'scroll'``.
+# - ``index``: index name(s) involved, if known.
+# - ``duration``: wall time of the request, in seconds.
+# - ``took``: time reported by ES for searches, in milliseconds, if any.
+# - ``request_bytes`` / ``response_bytes``: size of the HTTP request bodies
+#   sent (retries included) and of the response bodies received, as counted
+#   by the connections of the clients.
+# - ``retries``: number of times the HTTP request was sent again after a
+#   failed attempt (e.g. on connection errors or timeouts).
+# - ``docs``: number of documents involved (operations of a bulk request).
+# - ``failed``: number of documents which failed (bulk items, or all of
+#   them if the request raised).
+# - ``serialization_time``: seconds spent serializing objects into
+#   documents, if any.
+# - ``error``: exception raised by the request, if any.
+es_request = Signal()
+
+
+# Request measured in the current thread or task, if any.
+_current_request = contextvars.ContextVar(
+    'elastic_django_request', default=None)
+
+_instrumented_classes = {}
+
+
+def _size(data):
+    if data is None:
+        return 0
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    return len(data)
+
+
+class measure(object):
+    """
+    Context manager measuring a request to the ES backend, and sending the
+    ``es_request`` signal afterwards.
+
+    Sizes and retries are only counted if there are receivers of the signal
+    connected, by the connections of the clients (see
+    ``instrumented_connection_class``) while the request is being measured::
+
+        with measure(Book, 'index', index_name) as request:
+            request.response = connection.index(...)
+    """
+    def __init__(self, sender, operation, index=None, docs=1,
+                 serialization_time=None):
+        self.enabled = es_request.has_listeners()
+        self.sender = sender
+        self.operation = operation
+        self.index = index
+        self.docs = docs
+        self.failed = 0
+        self.serialization_time = serialization_time
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+        self.attempt_failed = False
+        self.response = None
+        self.start = None
+        self.token = None
+
+    def __enter__(self):
+        if self.enabled:
+            self.token = _current_request.set(self)
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.enabled:
+            return
+
+        _current_request.reset(self.token)
+        response = self.response if isinstance(self.response, dict) else {}
+        es_request.send(
+            sender=self.sender,
+            operation=self.operation,
+            index=self.index,
+            duration=time.time() - self.start,
+            took=response.get('took'),
+            request_bytes=self.request_bytes,
+            response_bytes=self.response_bytes,
+            retries=self.retries,
+            docs=self.docs,
+            failed=self.docs if exc_value is not None else self.failed,
+            serialization_time=self.serialization_time,
+            error=exc_value)
+
+    def request_sent(self, body):
+        """
+        Accounts for an HTTP request sent by a connection, with its encoded
+        body. Following a failed one, it is a retry.
+        """
+        if self.attempt_failed:
+            self.retries += 1
+        self.attempt_failed = True
+        self.request_bytes += _size(body)
+
+    def response_received(self, data):
+        """
+        Accounts for the raw body of a successful HTTP response.
+        """
+        self.attempt_failed = False
+        self.response_bytes += _size(data)
+
+
+def instrumented_connection_class(connection_class):
+    """
+    Subclass of an ``elasticsearch`` connection class (sync or async) whose
+    HTTP requests are accounted for in the request being measured, if any.
+    Bodies are measured as they are sent and received, so they are not
+    encoded again.
+    """
+    if connection_class in _instrumented_classes:
+        return _instrumented_classes[connection_class]
+
+    perform = connection_class.perform_request
+    if asyncio.iscoroutinefunction(perform):
+        async def perform_request(self, method, url, params=None, body=None,
+                                  *args, **kwargs):
+            request = _current_request.get()
+            if request is None:
+                return await perform(
+                    self, method, url, params, body, *args, **kwargs)
+            request.request_sent(body)
+            response = await perform(
+                self, method, url, params, body, *args, **kwargs)
+            request.response_received(response[2])
+            return response
+    else:
+        def perform_request(self, method, url, params=None, body=None,
+                            *args, **kwargs):
+            request = _current_request.get()
+            if request is None:
+                return perform(
+                    self, method, url, params, body, *args, **kwargs)
+            request.request_sent(body)
+            response = perform(
+                self, method, url, params, body, *args, **kwargs)
+            request.response_received(response[2])
+            return response
+
+    instrumented = type(
+        'Instrumented{0}'.format(connection_class.__name__),
+        (connection_class,), {'perform_request': perform_request})
+    _instrumented_classes[connection_class] = instrumented
+    return instrumented
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+# ES document type of the synchronization state documents.
+SYNC_STATE_DOC_TYPE = 'SyncState'
+
+
+def get_state_index_name():
+    """
+    Name of the ES index where synchronization state is kept, from
+    ``ELASTICSEARCH_STATE_INDEX_NAME`` setting.
+    """
+    return getattr(
+        settings, 'ELASTICSEARCH_STATE_INDEX_NAME', 'elastic-django-state')
+
+
+def _state_id(index_name, model):
+    return '{0}:{1}'.format(index_name, model._meta.label)
+
+
+def get_high_water_mark(connection, index_name, model):
+    """
+    Retrieves the point in time up to which the changes of a model have been
+    indexed in the given index.
+
+    :return: A ``datetime``, or ``None`` if the model was never indexed
+    incrementally.
+    """
+    response = connection.get(
+        index=get_state_index_name(), doc_type=SYNC_STATE_DOC_TYPE,
+        id=_state_id(index_name, model), ignore=404)
+    if not response.get('found'):
+        return None
+    return parse_datetime(response['_source']['high_water_mark'])
+
+
+def set_high_water_mark(connection, index_name, model, updated_field, mark):
+    """
+    Stores the point in time up to which the changes of a model have been
+    indexed in the given index.
+    """
+    connection.index(
+        index=get_state_index_name(), doc_type=SYNC_STATE_DOC_TYPE,
+        id=_state_id(index_name, model),
+        body={
+            'index': index_name,
+            'model': model._meta.label,
+            'updated_field': updated_field,
+            'high_water_mark': mark.isoformat(),
+        })
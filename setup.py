@@ -32,10 +32,22 @@ setup(
     author_email='jose.lpa@gmail.com',
     url='http://patino.me',
     packages=find_packages(exclude=['tests*']),
-    install_requires=['elasticsearch', 'Django>=1.8'],
+    install_requires=['elasticsearch', 'Django>=2.0'],
+    extras_require={
+        'async': [
+            'asgiref>=3.0',
+            # Async client of elasticsearch-py 6.x, not running on 3.11+.
+            'elasticsearch-async; python_version < "3.11"',
+            # Async client of elasticsearch-py itself, from 7.8 on.
+            'elasticsearch>=7.8; python_version >= "3.11"',
+            'aiohttp; python_version >= "3.11"',
+        ],
+    },
     test_suite='tests',
     tests_require=[
+        'asgiref>=3.0',
         'mock',
+        'prometheus_client',
         'pytest-django',
         'pytest-cov',
         'pytest-pep8',
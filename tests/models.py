@@ -40,3 +40,51 @@ class BookExclusion(ElasticModel):
 
     class Meta:
         elastic_exclude = ('title', 'author')
+
+
+class Edition(ElasticModel):
+    """
+    Model with non JSON-native and relational fields to be indexed.
+    """
+    book = models.ForeignKey(Book, on_delete=models.CASCADE)
+    code = models.UUIDField()
+    price = models.DecimalField(max_digits=6, decimal_places=2)
+    published = models.DateField()
+    printed = models.DateTimeField()
+    length = models.DurationField(null=True)
+
+    class Meta:
+        elastic_mapping = {'length': {'type': 'keyword', 'index': False}}
+
+
+class Publisher(models.Model):
+    """
+    Plain Django model embedded into 'Review' documents.
+    """
+    name = models.CharField(max_length=100)
+    country = models.CharField(max_length=2)
+
+
+class Tag(models.Model):
+    """
+    Plain Django model embedded into 'Review' documents, as a list.
+    """
+    name = models.CharField(max_length=50)
+
+
+class Review(ElasticModel):
+    """
+    Model embedding its related objects into its documents.
+    """
+    book = models.ForeignKey(Book, on_delete=models.CASCADE)
+    publisher = models.ForeignKey(
+        Publisher, null=True, on_delete=models.SET_NULL)
+    tags = models.ManyToManyField(Tag)
+    text = models.TextField()
+
+    class Meta:
+        elastic_related = {
+            'book': ('title', 'author'),
+            'publisher': ('name',),
+            'tags': ('name',),
+        }
@@ -7,7 +7,7 @@ DATABASES = {
     }
 }
 
-INSTALLED_APPS = ['tests']
+INSTALLED_APPS = ['elastic_django', 'tests']
 
 # Elastic-Django custom settings.
 ELASTICSEARCH_HOSTS = [{'host': 'localhost', 'port': '9200'}]
@@ -0,0 +1,150 @@
+import threading
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+import pytest
+from asgiref.sync import async_to_sync
+from elasticsearch.exceptions import ConnectionError
+from mock import AsyncMock, MagicMock, patch
+
+from elastic_django.async_manager import AsyncElasticManager
+from .models import Book
+
+
+@pytest.mark.django_db
+class AsyncElasticManagerTestCase(TestCase):
+    """
+    Tests for the coroutines of ``AsyncElasticManager``, and the async hooks of
+    ``ElasticModel``.
+    """
+    pytestmark = pytest.mark.django_db
+
+    def setUp(self):
+        with patch('elastic_django.manager.ElasticManager.index_object'):
+            self.book = Book.objects.create(
+                title='Effective Python', author='Brett Slatkin',
+                isbn='9780134034287', publication_year=2015,
+                description='59 Specific Ways to Write Better Python.')
+
+        self.client = MagicMock()
+        for method in ('index', 'update', 'delete', 'get', 'bulk', 'search'):
+            setattr(self.client, method, AsyncMock())
+        patcher = patch(
+            'elastic_django.async_manager.get_async_client',
+            return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_manager(self):
+        self.assertIsInstance(Book.elastic, AsyncElasticManager)
+
+    def test_asave_and_adelete(self):
+        """
+        Tests that objects are indexed and removed through the async client.
+        """
+        book = Book(
+            title='Fluent Python', author='Luciano Ramalho',
+            publication_year=2015)
+
+        async_to_sync(book.asave)()
+
+        self.assertTrue(Book.objects.filter(pk=book.pk).exists())
+        self.client.index.assert_awaited_once_with(
+            index='testing-elasticdjango', doc_type='Book',
+            body=book.elastic_serializer(), id=book.pk)
+
+        # Unchanged objects are not indexed again.
+        async_to_sync(book.asave)()
+        self.assertEqual(self.client.index.await_count, 1)
+
+        pk = book.pk
+        async_to_sync(book.adelete)()
+
+        self.assertFalse(Book.objects.filter(pk=pk).exists())
+        self.client.delete.assert_awaited_once_with(
+            index='testing-elasticdjango', doc_type='Book', id=pk)
+
+    @override_settings(ELASTICSEARCH_AUTO_INDEX=False)
+    def test_asave_auto_index_disabled(self):
+        async_to_sync(self.book.asave)()
+        self.assertFalse(self.client.index.called)
+
+    @patch('elastic_django.models.outbox.write')
+    def test_aindex_unavailable(self, write_mock):
+        """
+        Tests that operations that couldn't be sent are stored in the outbox.
+        """
+        self.client.index.side_effect = ConnectionError('N/A', 'Down.', None)
+
+        async_to_sync(self.book.aindex)()
+
+        write_mock.assert_called_once_with(
+            [Book.elastic.index_action(self.book)])
+
+    def test_abulk(self):
+        """
+        Tests that bulk results are reported per action, in order.
+        """
+        self.client.bulk.return_value = {'items': [
+            {'index': {'_id': self.book.pk, 'status': 201}},
+            {'delete': {'_id': 999, 'status': 404}},
+        ]}
+        missing = Book(pk=999)
+
+        results = async_to_sync(Book.elastic.abulk)([
+            Book.elastic.index_action(self.book),
+            Book.elastic.delete_action(missing),
+        ])
+
+        self.assertEqual([ok for ok, _ in results], [True, False])
+        body = self.client.bulk.call_args[1]['body']
+        self.assertEqual(len(body), 3)
+        self.assertEqual(body[1], self.book.elastic_serializer())
+
+    @override_settings(
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        ELASTICSEARCH_SEARCH_CACHE='default')
+    def test_caches_off_event_loop(self):
+        """
+        Tests that calls to Django caches, which block, are not run in the
+        event loop thread.
+        """
+        self.client.index.return_value = {'_version': 1}
+        self.client.search.return_value = {'hits': {'total': 0, 'hits': []}}
+        loop_threads, cache_threads = [], []
+
+        def record(*args, **kwargs):
+            cache_threads.append(threading.get_ident())
+
+        async def run():
+            loop_threads.append(threading.get_ident())
+            await Book.elastic.aindex_object(self.book)
+            await Book.elastic.asearch(title='python')
+
+        with patch('elastic_django.async_manager.invalidate_searches',
+                   side_effect=record), \
+                patch('elastic_django.async_manager.search_key',
+                      side_effect=record):
+            async_to_sync(run)()
+
+        self.assertEqual(len(cache_threads), 2)
+        self.assertNotIn(loop_threads[0], cache_threads)
+
+    def test_asearch(self):
+        """
+        Tests that search hits are turned into model instances.
+        """
+        self.client.search.return_value = {'hits': {'total': 2, 'hits': [
+            {'_id': '999', '_score': 2.0},
+            {'_id': str(self.book.pk), '_score': 1.0},
+        ]}}
+
+        results = async_to_sync(Book.elastic.asearch)(title='python')
+
+        self.assertEqual(results, [self.book])
+        self.assertEqual(results[0].elastic_score, 1.0)
+        self.assertEqual(self.client.search.call_args[1]['body'], {
+            'query': Book.elastic.match_query(title='python'),
+            'from': 0, 'size': 20})
@@ -0,0 +1,234 @@
+from django.core.cache import caches
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from mock import MagicMock, patch
+
+from elastic_django.cache import DocumentCache, get_document_cache
+from elastic_django.manager import ElasticManager
+from .models import Book
+
+
+@override_settings(
+    CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 100},
+    }},
+    ELASTICSEARCH_SEARCH_CACHE='default')
+class SearchCacheTestCase(SimpleTestCase):
+    """
+    Tests for the cache of search responses.
+    """
+    def setUp(self):
+        caches['default'].clear()
+
+        self.client = MagicMock(index_name='testing-elasticdjango')
+        self.client.connection.search.side_effect = lambda **kwargs: {
+            'hits': {'total': 0, 'hits': []},
+            'request': self.client.connection.search.call_count}
+        patcher = patch(
+            'elastic_django.manager.get_client', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.manager = ElasticManager()
+        self.book = Book(pk=1, title='Effective Python', publication_year=2015)
+
+    def search(self, index=None, **params):
+        return self.manager.execute_search(
+            body={'query': {'match': {'title': 'python'}}}, index=index,
+            **params)['request']
+
+    def test_cached(self):
+        """
+        Tests that identical searches are only sent once, whatever the order
+        of the keys of their body.
+        """
+        self.assertEqual(self.search(), 1)
+        self.assertEqual(self.search(), 1)
+        self.assertEqual(self.manager.execute_search(
+            body={'query': {'match': {'title': 'python'}}})['request'], 1)
+
+        self.assertEqual(self.search(size=5), 2)
+        self.assertEqual(self.search(scroll='1m'), 3)
+        self.assertEqual(self.search(scroll='1m'), 4)
+
+    def test_invalidated_on_write(self):
+        """
+        Tests that cached responses of an index are discarded when any of its
+        documents change.
+        """
+        self.assertEqual(self.search(), 1)
+        self.assertEqual(self.search(index='other'), 2)
+        self.assertEqual(self.search(index='_all'), 3)
+
+        self.manager.index_object(self.book)
+
+        self.assertEqual(self.search(), 4)
+        self.assertEqual(self.search(index='other'), 2)
+        self.assertEqual(self.search(index='_all'), 5)
+
+        self.manager.remove_object(self.book)
+        self.assertEqual(self.search(), 6)
+
+        with patch('elastic_django.manager.streaming_bulk') as bulk_mock:
+            bulk_mock.side_effect = lambda connection, actions, **kwargs: (
+                (True, {}) for _ in actions)
+            self.manager.bulk([self.manager.index_action(self.book)])
+        self.assertEqual(self.search(), 7)
+        self.assertEqual(self.search(index='other,testing-elasticdjango'), 8)
+        self.assertEqual(self.search(index='testing-elasticdjango,other'), 8)
+
+    @override_settings(ELASTICSEARCH_SEARCH_CACHE=None)
+    def test_disabled(self):
+        self.assertEqual(self.search(), 1)
+        self.assertEqual(self.search(), 2)
+
+
+class DocumentCacheTestCase(SimpleTestCase):
+    """
+    Tests for the LRU cache of documents.
+    """
+    def test_lru(self):
+        cache = DocumentCache(max_size=2)
+        cache.set('a', {'_id': 'a'})
+        cache.set('b', {'_id': 'b'})
+
+        self.assertEqual(cache.get('a'), {'_id': 'a'})
+        # 'b' is the least recently used one now.
+        cache.set('c', {'_id': 'c'})
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), {'_id': 'c'})
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 1, 'size': 2})
+
+        cache.delete('a', 'c')
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_timeout(self):
+        """
+        Tests that documents expire locally after the timeout.
+        """
+        cache = DocumentCache(max_size=2, timeout=60)
+        with patch('elastic_django.cache.time.time', return_value=1000):
+            cache.set('a', {'_id': 'a'})
+        with patch('elastic_django.cache.time.time', return_value=1059):
+            self.assertEqual(cache.get('a'), {'_id': 'a'})
+        with patch('elastic_django.cache.time.time', return_value=1060):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'size': 0})
+
+        cache = DocumentCache(max_size=2, timeout=None)
+        with patch('elastic_django.cache.time.time', return_value=1000):
+            cache.set('a', {'_id': 'a'})
+        with patch('elastic_django.cache.time.time', return_value=10 ** 9):
+            self.assertEqual(cache.get('a'), {'_id': 'a'})
+
+    def test_copies(self):
+        """
+        Tests that changing the documents set or got leaves the cache intact.
+        """
+        cache = DocumentCache(max_size=2)
+        doc = {'_id': 'a', '_source': {'tags': ['x']}}
+        cache.set('a', doc)
+        doc['_source']['tags'].append('y')
+
+        cached = cache.get('a')
+        cached['_source']['tags'].append('z')
+
+        self.assertEqual(cache.get('a')['_source'], {'tags': ['x']})
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_shared(self):
+        """
+        Tests that documents are shared through the Django cache.
+        """
+        caches['default'].clear()
+        first = DocumentCache(max_size=10, shared=caches['default'])
+        second = DocumentCache(max_size=10, shared=caches['default'])
+
+        first.set('a', {'_id': 'a'})
+        self.assertEqual(second.get('a'), {'_id': 'a'})
+        self.assertEqual(second.stats(), {'hits': 1, 'misses': 0, 'size': 1})
+
+        first.delete('a')
+        second.clear()
+        self.assertIsNone(second.get('a'))
+
+
+@override_settings(ELASTICSEARCH_DOCUMENT_CACHE_SIZE=10)
+class GetObjectCacheTestCase(SimpleTestCase):
+    """
+    Tests for the read-through cache of ``get_object``.
+    """
+    def setUp(self):
+        self.client = MagicMock(index_name='testing-elasticdjango')
+        self.client.connection.get.return_value = {
+            '_id': '1', 'found': True, '_source': {'pk': 1}}
+        self.client.connection.index.return_value = {
+            '_index': 'testing-elasticdjango', '_id': '1', '_version': 2}
+        patcher = patch(
+            'elastic_django.manager.get_client', return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.manager = ElasticManager()
+        self.book = Book(pk=1, title='Effective Python', publication_year=2015)
+        get_document_cache().clear()
+
+    def test_read_through(self):
+        first = self.manager.get_object(self.book)
+        second = self.manager.get_object(self.book)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.client.connection.get.call_count, 1)
+        self.assertEqual(
+            get_document_cache().stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+    def test_populated_on_index(self):
+        self.manager.index_object(self.book)
+
+        doc = self.manager.get_object(self.book)
+
+        self.assertFalse(self.client.connection.get.called)
+        self.assertEqual(doc['_version'], 2)
+        self.assertEqual(doc['_source'], self.book.elastic_serializer())
+
+    def test_evicted(self):
+        """
+        Tests that documents are evicted on removal, and on bulk operations.
+        """
+        self.manager.get_object(self.book)
+        self.manager.remove_object(self.book)
+        self.manager.get_object(self.book)
+        self.assertEqual(self.client.connection.get.call_count, 2)
+
+        with patch('elastic_django.manager.streaming_bulk') as bulk_mock:
+            bulk_mock.side_effect = lambda connection, actions, **kwargs: (
+                (True, {}) for _ in actions)
+            self.manager.index_objects([self.book])
+        self.manager.get_object(self.book)
+        self.assertEqual(self.client.connection.get.call_count, 3)
+
+    def test_evicted_on_deferred_save(self):
+        """
+        Tests that the document of an object saved is evicted, even if it's
+        indexed later on.
+        """
+        self.manager.get_object(self.book)
+
+        with patch('elastic_django.models.indexing.is_deferred',
+                   return_value=True), \
+                patch('elastic_django.models.indexing.defer'):
+            self.book.index()
+
+        self.manager.get_object(self.book)
+        self.assertEqual(self.client.connection.get.call_count, 2)
+
+    @override_settings(ELASTICSEARCH_DOCUMENT_CACHE_SIZE=0)
+    def test_disabled(self):
+        self.assertIsNone(get_document_cache())
+        self.manager.get_object(self.book)
+        self.manager.get_object(self.book)
+        self.assertEqual(self.client.connection.get.call_count, 2)
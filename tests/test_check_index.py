@@ -0,0 +1,103 @@
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import six
+
+import pytest
+from mock import patch
+
+from elastic_django.serializers import FINGERPRINT_FIELD, fingerprint
+
+from .models import Book
+
+
+def hit(obj, **changes):
+    # Documents are only fetched with their pk and stored fingerprint.
+    doc = obj.elastic_serializer()
+    del doc[FINGERPRINT_FIELD]
+    doc.update(changes)
+    return {
+        '_index': 'testing-elasticdjango', '_type': 'Book',
+        '_id': str(doc['pk']),
+        '_source': {'pk': doc['pk'], FINGERPRINT_FIELD: fingerprint(doc)},
+    }
+
+
+@pytest.mark.django_db
+@patch('elastic_django.manager.ElasticManager.bulk')
+@patch('elastic_django.manager.ElasticManager.index_objects')
+@patch('elastic_django.manager.ElasticManager.scan')
+class CheckIndexTestCase(TestCase):
+    """
+    Tests for ``check_index`` custom management command.
+    """
+    pytestmark = pytest.mark.django_db
+
+    def setUp(self):
+        with patch('elastic_django.manager.ElasticManager.index_object'):
+            self.books = [
+                Book.objects.create(
+                    title='Book {0}'.format(i), author='Anonymous',
+                    publication_year=2000 + i)
+                for i in range(5)
+            ]
+
+        # Book 1 is missing, book 3 is stale and there's an orphaned document
+        # of a removed book.
+        self.removed = Book(
+            pk=self.books[-1].pk + 1, title='Removed', author='Anonymous',
+            publication_year=1999)
+        self.hits = [
+            hit(self.books[0]),
+            hit(self.books[2]),
+            hit(self.books[3], title='Old title'),
+            hit(self.books[4]),
+            hit(self.removed),
+        ]
+
+    def test_report(self, scan_mock, index_mock, bulk_mock):
+        """
+        Tests that differences are reported without changing anything.
+        """
+        scan_mock.side_effect = [iter(self.hits)] + [
+            iter([]) for _ in range(4)]
+        out = six.StringIO()
+        call_command('check_index', 'tests', verbosity=2, stdout=out)
+        out = out.getvalue()
+
+        self.assertIn(
+            'Checked 5 objects of model Book: 1 missing, 1 stale, 1 orphaned '
+            'documents.', out)
+        self.assertIn('Missing document: Book {0}'.format(
+            self.books[1].pk), out)
+        self.assertIn('Stale document: Book {0}'.format(
+            self.books[3].pk), out)
+        self.assertIn('Orphaned document: Book {0}'.format(
+            self.removed.pk), out)
+        self.assertEqual(
+            scan_mock.call_args_list[0][1]['sort'], [{'pk': 'asc'}])
+        self.assertEqual(
+            scan_mock.call_args_list[0][1]['source'],
+            ['pk', FINGERPRINT_FIELD])
+        self.assertFalse(index_mock.called)
+        self.assertFalse(bulk_mock.called)
+
+    def test_repair(self, scan_mock, index_mock, bulk_mock):
+        """
+        Tests that missing and stale documents are indexed, and orphaned ones
+        removed, in bulk.
+        """
+        scan_mock.side_effect = [iter(self.hits)] + [
+            iter([]) for _ in range(4)]
+        call_command(
+            'check_index', 'tests', repair=True, chunk_size=2,
+            stdout=six.StringIO())
+
+        indexed = [
+            obj for call in index_mock.call_args_list for obj in call[0][0]]
+        self.assertEqual(indexed, [self.books[1], self.books[3]])
+        self.assertEqual(
+            bulk_mock.call_args[0][0],
+            [{
+                '_op_type': 'delete', '_index': 'testing-elasticdjango',
+                '_type': 'Book', '_id': str(self.removed.pk),
+            }])
@@ -3,10 +3,14 @@ from unittest import TestCase
 from django.conf import settings
 from django.test.utils import override_settings
 
+from elasticsearch import Urllib3HttpConnection
+from elasticsearch.exceptions import TransportError
+from elasticsearch.transport import Transport
 from mock import patch
 
 from elastic_django.client import ElasticsearchClient
 from elastic_django.exceptions import ElasticsearchClientConfigurationError
+from elastic_django.signals import instrumented_connection_class
 
 
 class ElasticsearchClientTestCase(TestCase):
@@ -61,3 +65,49 @@ class ElasticsearchClientTestCase(TestCase):
         """
         self.assertRaises(
             ElasticsearchClientConfigurationError, ElasticsearchClient)
+
+    @override_settings(
+        ELASTICSEARCH_TRANSPORT_CLASS='tests.test_client.CustomTransport',
+        ELASTICSEARCH_CONNECTION_OPTIONS={
+            'maxsize': 25, 'http_compress': True, 'retry_on_timeout': True})
+    @patch('elastic_django.client.Elasticsearch')
+    def test_transport_configuration(self, mock):
+        """
+        Tests that the transport class and the connection options in settings
+        are used, and that constructor arguments take precedence.
+        """
+        ElasticsearchClient(maxsize=50)
+
+        self.assertEqual(mock.call_args[1], {
+            'hosts': settings.ELASTICSEARCH_HOSTS,
+            'transport_class': CustomTransport,
+            'maxsize': 50,
+            'http_compress': True,
+            'retry_on_timeout': True,
+            'connection_class': instrumented_connection_class(
+                Urllib3HttpConnection),
+        })
+
+        client = ElasticsearchClient(transport_class=Transport)
+        self.assertIs(client.transport, Transport)
+        self.assertIs(mock.call_args[1]['transport_class'], Transport)
+
+    @override_settings(ELASTICSEARCH_TRANSPORT_CLASS='tests.NoTransport')
+    def test_bad_transport_class(self):
+        self.assertRaises(
+            ElasticsearchClientConfigurationError, ElasticsearchClient)
+
+    @patch('elastic_django.client.Elasticsearch')
+    def test_sniffing_failure(self, mock):
+        """
+        Tests that failures sniffing the nodes on start are configuration
+        errors.
+        """
+        mock.side_effect = TransportError('N/A', 'Unable to sniff hosts.')
+
+        self.assertRaises(
+            ElasticsearchClientConfigurationError, ElasticsearchClient)
+
+
+class CustomTransport(Transport):
+    pass
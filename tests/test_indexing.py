@@ -0,0 +1,300 @@
+import threading
+from unittest import TestCase
+
+from django.db import transaction
+from django.test import TransactionTestCase
+from django.test.utils import override_settings
+
+import pytest
+from mock import MagicMock, patch
+
+from elastic_django.exceptions import ElasticsearchClientNotConnectedError
+from elastic_django.indexing import AsyncIndexer
+from .models import Book
+
+
+def book(title='Effective Python'):
+    return Book(
+        title=title, author='Brett Slatkin', isbn='9780134034287',
+        publication_year=2015,
+        description='59 Specific Ways to Write Better Python.')
+
+
+@pytest.mark.django_db(transaction=True)
+@override_settings(ELASTICSEARCH_INDEXING_MODE='on_commit')
+@patch('elastic_django.manager.ElasticManager.remove_object')
+@patch('elastic_django.manager.ElasticManager.index_object')
+@patch('elastic_django.manager.ElasticManager.bulk')
+class OnCommitIndexingTestCase(TransactionTestCase):
+    """
+    Tests for indexing operations deferred to DB transactions commit.
+    """
+    pytestmark = pytest.mark.django_db(transaction=True)
+
+    def test_bulk_on_commit(self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that all the operations of a transaction are sent in a single
+        bulk request once committed, keeping the last one per object.
+        """
+        with transaction.atomic():
+            first, second = book(), book()
+            first.save()
+            second.save()
+            first.title = 'Effective Python, 2nd Edition'
+            first.save()
+            second.delete()
+
+            self.assertFalse(bulk_mock.called)
+
+        self.assertFalse(index_mock.called)
+        self.assertFalse(remove_mock.called)
+        self.assertEqual(bulk_mock.call_count, 1)
+
+        actions = bulk_mock.call_args[0][0]
+        self.assertEqual(len(actions), 2)
+        self.assertEqual(actions[0]['_op_type'], 'index')
+        self.assertEqual(actions[0]['_id'], first.pk)
+        self.assertEqual(
+            actions[0]['_source']['title'], 'Effective Python, 2nd Edition')
+        self.assertEqual(actions[1]['_op_type'], 'delete')
+
+    def test_rollback_discards_operations(
+            self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that operations of rolled back transactions are never sent.
+        """
+        try:
+            with transaction.atomic():
+                book('Rolled back').save()
+                raise ValueError()
+        except ValueError:
+            pass
+
+        with transaction.atomic():
+            book('Committed').save()
+
+        self.assertEqual(bulk_mock.call_count, 1)
+        actions = bulk_mock.call_args[0][0]
+        self.assertEqual(
+            [action['_source']['title'] for action in actions], ['Committed'])
+
+    def test_savepoint_rollback_discards_operations(
+            self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that operations of rolled back savepoints are discarded, keeping
+        the ones of the enclosing transaction.
+        """
+        with transaction.atomic():
+            obj = book('Outer')
+            obj.save()
+            try:
+                with transaction.atomic():
+                    obj.title = 'Inner'
+                    obj.save()
+                    raise ValueError()
+            except ValueError:
+                pass
+
+        self.assertEqual(bulk_mock.call_count, 1)
+        actions = bulk_mock.call_args[0][0]
+        self.assertEqual(
+            [action['_source']['title'] for action in actions], ['Outer'])
+
+    def test_released_savepoints(self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that operations of released savepoints are sent with the ones
+        of the enclosing transaction queued afterwards.
+        """
+        with transaction.atomic():
+            first, second = book('Outer'), book('Outer')
+            with transaction.atomic():
+                first.save()
+            with transaction.atomic():
+                with transaction.atomic():
+                    second.save()
+            first.title = 'Outer again'
+            first.save()
+
+        self.assertEqual(bulk_mock.call_count, 1)
+        actions = bulk_mock.call_args[0][0]
+        self.assertEqual(
+            [(action['_id'], action['_source']['title'])
+             for action in actions],
+            [(second.pk, 'Outer'), (first.pk, 'Outer again')])
+
+    def test_trailing_savepoints(self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that operations of savepoints ending a transaction are sent
+        after the ones of the enclosing transaction, unless rolled back.
+        """
+        with transaction.atomic():
+            obj = book('Outer')
+            obj.save()
+            with transaction.atomic():
+                obj.title = 'Released'
+                obj.save()
+            try:
+                with transaction.atomic():
+                    obj.title = 'Rolled back'
+                    obj.save()
+                    raise ValueError()
+            except ValueError:
+                pass
+
+        actions = [
+            action for call in bulk_mock.call_args_list
+            for action in call[0][0]]
+        self.assertEqual(
+            [action['_source']['title'] for action in actions],
+            ['Outer', 'Released'])
+
+        bulk_mock.reset_mock()
+        with transaction.atomic():
+            book('Committed').save()
+
+        self.assertEqual(bulk_mock.call_count, 1)
+        self.assertEqual(len(bulk_mock.call_args[0][0]), 1)
+
+    @patch('elastic_django.indexing.logging')
+    def test_failure_on_commit(
+            self, logging_mock, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that failures sending the operations of a committed transaction
+        are logged, letting the rest of its commit hooks run.
+        """
+        bulk_mock.side_effect = ElasticsearchClientNotConnectedError()
+        hook = MagicMock()
+
+        with transaction.atomic():
+            book().save()
+            transaction.on_commit(hook)
+
+        self.assertTrue(bulk_mock.called)
+        self.assertTrue(hook.called)
+        self.assertTrue(logging_mock.exception.called)
+
+    def test_autocommit_not_deferred(
+            self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that operations outside transactions are sent right away.
+        """
+        obj = book()
+        obj.save()
+        obj.delete()
+
+        self.assertTrue(index_mock.called)
+        self.assertTrue(remove_mock.called)
+        self.assertFalse(bulk_mock.called)
+
+
+def action(pk, title='Effective Python'):
+    return {
+        '_op_type': 'index', '_index': 'testing-elasticdjango',
+        '_type': 'Book', '_id': pk, '_source': {'title': title},
+    }
+
+
+@patch('elastic_django.manager.ElasticManager.bulk')
+class AsyncIndexerTestCase(TestCase):
+    """
+    Tests for indexing operations sent by background threads.
+    """
+    def test_operations_sent_in_batches(self, bulk_mock):
+        """
+        Tests that queued operations are sent in batches of ``batch_size``
+        actions at most, keeping the last action per document.
+        """
+        indexer = AsyncIndexer(workers=1, batch_size=3, max_delay=60)
+        for pk in (1, 2, 1, 3, 4):
+            indexer.put(action(pk, 'Title {0}'.format(pk)))
+        indexer.put(action(1, 'Last title'))
+        indexer.start()
+        indexer.flush()
+
+        batches = [call[0][0] for call in bulk_mock.call_args_list]
+        self.assertEqual(
+            [[item['_id'] for item in batch] for batch in batches],
+            [[2, 1], [3, 4, 1]])
+        self.assertEqual(batches[1][2]['_source']['title'], 'Last title')
+
+        indexer.shutdown()
+
+    def test_max_delay(self, bulk_mock):
+        """
+        Tests that incomplete batches are sent after ``max_delay`` seconds.
+        """
+        sent = threading.Event()
+        bulk_mock.side_effect = lambda actions: sent.set() or []
+
+        indexer = AsyncIndexer(workers=1, batch_size=100, max_delay=0.05)
+        indexer.start()
+        indexer.put(action(1))
+
+        self.assertTrue(sent.wait(5))
+        indexer.shutdown()
+
+    def test_shutdown_sends_pending_operations(self, bulk_mock):
+        """
+        Tests that pending operations are sent when shutting down, and worker
+        threads stopped.
+        """
+        indexer = AsyncIndexer(workers=3, batch_size=100, max_delay=60)
+        indexer.start()
+        for pk in range(1, 31):
+            indexer.put(action(pk))
+        indexer.shutdown()
+
+        sent = [
+            item['_id'] for call in bulk_mock.call_args_list
+            for item in call[0][0]]
+        self.assertEqual(sorted(sent), list(range(1, 31)))
+        self.assertEqual(indexer.threads, [])
+
+    def test_failures_do_not_stop_workers(self, bulk_mock):
+        """
+        Tests that errors sending a batch don't kill the worker threads.
+        """
+        bulk_mock.side_effect = [Exception('Boom'), []]
+
+        indexer = AsyncIndexer(workers=1, batch_size=1, max_delay=0)
+        indexer.start()
+        indexer.put(action(1))
+        indexer.put(action(2))
+        indexer.flush()
+
+        self.assertEqual(bulk_mock.call_count, 2)
+        indexer.shutdown()
+
+
+@pytest.mark.django_db(transaction=True)
+@override_settings(ELASTICSEARCH_INDEXING_MODE='async')
+@patch('elastic_django.manager.ElasticManager.index_object')
+@patch('elastic_django.indexing.get_async_indexer')
+class AsyncIndexingTestCase(TransactionTestCase):
+    """
+    Tests for objects indexing with the ``async`` indexing mode.
+    """
+    pytestmark = pytest.mark.django_db(transaction=True)
+
+    def test_save_queued(self, indexer_mock, index_mock):
+        """
+        Tests that saved objects are queued in the background indexer.
+        """
+        obj = book()
+        obj.save()
+
+        self.assertFalse(index_mock.called)
+        put_action = indexer_mock.return_value.put.call_args[0][0]
+        self.assertEqual(put_action['_id'], obj.pk)
+        self.assertEqual(put_action['_type'], 'Book')
+
+    def test_transactions_queued_on_commit(self, indexer_mock, index_mock):
+        """
+        Tests that objects saved within a transaction are not queued until
+        it's committed.
+        """
+        with transaction.atomic():
+            book().save()
+            self.assertFalse(indexer_mock.return_value.put.called)
+
+        self.assertTrue(indexer_mock.return_value.put.called)
@@ -0,0 +1,106 @@
+from django.test import SimpleTestCase
+
+from elasticsearch.exceptions import ConnectionTimeout
+from mock import MagicMock, call, patch
+
+from elastic_django.indices import (
+    BULK_LOAD_SETTINGS, bulk_load_settings, get_index_setting,
+    get_index_settings, swap_alias)
+
+
+class IndicesTestCase(SimpleTestCase):
+    """
+    Tests for index management helpers.
+    """
+    def setUp(self):
+        self.connection = MagicMock()
+        self.connection.indices.get_settings.return_value = {
+            'books-1': {'settings': {'index': {
+                'number_of_replicas': '1',
+                'translog': {'flush_threshold_size': '512mb'}}}}}
+
+    def test_get_index_setting(self):
+        self.assertEqual(
+            get_index_setting(
+                self.connection, 'books', 'translog.flush_threshold_size'),
+            '512mb')
+        self.assertIsNone(
+            get_index_setting(self.connection, 'books', 'refresh_interval'))
+
+        self.connection.indices.get_settings.return_value = {
+            'error': 'index_not_found_exception', 'status': 404}
+        self.assertIsNone(
+            get_index_setting(self.connection, 'books', 'number_of_replicas'))
+
+    def test_get_index_settings(self):
+        """
+        Tests that only the settings needed to recreate an index are kept.
+        """
+        self.connection.indices.get_settings.return_value = {
+            'books-1': {'settings': {'index': {
+                'number_of_replicas': '1', 'number_of_shards': '3',
+                'analysis': {'analyzer': {}}, 'uuid': 'x'}}}}
+        self.assertEqual(
+            get_index_settings(self.connection, 'books'),
+            {'number_of_shards': '3', 'analysis': {'analyzer': {}}})
+
+        self.connection.indices.get_settings.return_value = {
+            'error': 'index_not_found_exception', 'status': 404}
+        self.assertEqual(get_index_settings(self.connection, 'books'), {})
+
+    def test_swap_alias_replaces_index(self):
+        """
+        Tests that a concrete index named like the alias is replaced by it.
+        """
+        self.connection.indices.exists_alias.return_value = False
+        self.connection.indices.exists.return_value = True
+
+        self.assertEqual(swap_alias(self.connection, 'books', 'books-2'), [])
+        self.connection.indices.update_aliases.assert_called_once_with(body={
+            'actions': [
+                {'remove_index': {'index': 'books'}},
+                {'add': {'index': 'books-2', 'alias': 'books'}},
+            ]})
+
+    def test_bulk_load_settings(self):
+        """
+        Tests that the original settings are restored, and the index refreshed
+        and merged, even if loading fails.
+        """
+        with self.assertRaises(RuntimeError):
+            with bulk_load_settings(self.connection, 'books'):
+                self.assertEqual(
+                    self.connection.indices.put_settings.call_args,
+                    call(index='books', body={'index': BULK_LOAD_SETTINGS}))
+                raise RuntimeError
+
+        self.connection.indices.put_settings.assert_called_with(
+            index='books', body={'index': {
+                'refresh_interval': None, 'number_of_replicas': '1',
+                'translog.flush_threshold_size': '512mb'}})
+        self.connection.indices.refresh.assert_called_once_with(index='books')
+        self.connection.indices.forcemerge.assert_called_once_with(
+            index='books', request_timeout=3600)
+
+    @patch('elastic_django.indices.logging')
+    def test_bulk_load_settings_merge_failure(self, logging_mock):
+        """
+        Tests that the settings of every index are restored before merging,
+        and that failed merges are logged, keeping the original exception.
+        """
+        self.connection.indices.forcemerge.side_effect = ConnectionTimeout(
+            'TIMEOUT', 'Read timed out.', None)
+
+        with self.assertRaises(RuntimeError):
+            with bulk_load_settings(self.connection, 'books', 'authors'):
+                raise RuntimeError
+
+        restored = {'index': {
+            'refresh_interval': None, 'number_of_replicas': '1',
+            'translog.flush_threshold_size': '512mb'}}
+        self.assertEqual(
+            self.connection.indices.put_settings.call_args_list[2:],
+            [call(index='books', body=restored),
+             call(index='authors', body=restored)])
+        self.assertEqual(self.connection.indices.forcemerge.call_count, 2)
+        self.assertEqual(logging_mock.exception.call_count, 2)
@@ -1,11 +1,27 @@
+import datetime
+import decimal
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import uuid
+
 from django.core.management import call_command
 from django.core.management.base import CommandError
 from django.test import TestCase
+from django.utils import six, timezone
 
 import pytest
-from mock import patch
+from elasticsearch.exceptions import TransportError
+from mock import call, patch
 
-from .models import Book, BookExclusion, BookSelection
+from elastic_django import dumps
+from elastic_django.indices import BULK_LOAD_SETTINGS
+from elastic_django.mappings import get_index_body, get_mapping
+from elastic_django.management.commands.index_models import (
+    _index_pk_range, pk_ranges)
+from .models import Book, BookExclusion, BookSelection, Edition, Review
 
 
 @pytest.mark.django_db
@@ -44,3 +60,619 @@ class IndexModelsTestCase(TestCase):
         """
         self.assertRaises(
             CommandError, call_command, 'index_models', 'non-existent-app')
+
+    @patch('elastic_django.management.commands.index_models.streaming_bulk')
+    @patch('elastic_django.management.commands.index_models.'
+           'ElasticsearchClient')
+    def test_bulk_indexing(self, client_mock, bulk_mock):
+        """
+        Tests that every ``ElasticModel`` object is streamed to the ES backend
+        through the ``_bulk`` API, using the configured batch sizes.
+        """
+        client_mock.return_value.index_name = 'testing-elasticdjango'
+        sent = []
+
+        def consume(connection, actions, **kwargs):
+            for action in actions:
+                sent.append(action)
+                yield True, {'index': {'_id': action['_id']}}
+
+        bulk_mock.side_effect = consume
+
+        call_command(
+            'index_models', 'tests', batch_size=10, batch_bytes=1024,
+            stdout=six.StringIO())
+
+        self.assertEqual(bulk_mock.call_count, 5)
+        for call in bulk_mock.call_args_list:
+            self.assertEqual(call[1]['chunk_size'], 10)
+            self.assertEqual(call[1]['max_chunk_bytes'], 1024)
+
+        self.assertIn(
+            {
+                '_index': 'testing-elasticdjango',
+                '_type': 'BookSelection',
+                '_id': self.book_selection.pk,
+                '_source': self.book_selection.elastic_serializer(),
+            },
+            sent
+        )
+        self.assertEqual(len(sent), 3)
+
+    @patch('elastic_django.management.commands.index_models.streaming_bulk')
+    @patch('elastic_django.management.commands.index_models.'
+           'ElasticsearchClient')
+    def test_bulk_indexing_errors_reported(self, client_mock, bulk_mock):
+        """
+        Tests that documents rejected by the ES backend are counted and
+        reported instead of aborting the whole process.
+        """
+        client_mock.return_value.index_name = 'testing-elasticdjango'
+        bulk_mock.side_effect = lambda connection, actions, **kwargs: iter(
+            [(False, {'index': {'error': 'mapper_parsing_exception'}})
+             for _ in actions])
+
+        out = six.StringIO()
+        call_command('index_models', 'tests', stdout=out)
+
+        self.assertIn('Indexed 0 items for model Book', out.getvalue())
+        self.assertIn('1 errors', out.getvalue())
+
+    def test_pk_ranges(self):
+        """
+        Tests the split of a model primary key space in contiguous ranges to
+        be indexed by parallel workers.
+        """
+        with patch('elastic_django.manager.ElasticManager.index_object'):
+            for i in range(9):
+                Book.objects.create(
+                    title='Book {0}'.format(i), author='Anonymous',
+                    publication_year=2000 + i)
+
+        first = Book.objects.order_by('pk')[0].pk
+        ranges = pk_ranges(Book.objects.all(), 4)
+
+        self.assertEqual(
+            ranges,
+            [(first, first + 2), (first + 3, first + 5),
+             (first + 6, first + 8), (first + 9, first + 9)])
+        self.assertEqual(pk_ranges(Book.objects.none(), 4), [])
+        self.assertEqual(
+            pk_ranges(Book.objects.all(), 1), [(first, first + 9)])
+
+    @patch('elastic_django.management.commands.index_models.streaming_bulk')
+    @patch('elastic_django.management.commands.index_models.'
+           'ElasticsearchClient')
+    def test_index_pk_range_worker(self, client_mock, bulk_mock):
+        """
+        Tests that a worker only indexes the objects in its primary key range.
+        """
+        sent = []
+
+        def consume(connection, actions, **kwargs):
+            for action in actions:
+                sent.append(action['_id'])
+                yield True, {}
+
+        bulk_mock.side_effect = consume
+
+        options = {'chunk_size': 10, 'batch_size': 10, 'batch_bytes': 1024}
+        label, counts = _index_pk_range((
+            'tests.Book', 'testing-elasticdjango', {}, self.book.pk,
+            self.book.pk, options))
+
+        self.assertEqual(label, 'tests.Book')
+        self.assertEqual(counts, (1, 0))
+        self.assertEqual(sent, [self.book.pk])
+
+
+@pytest.mark.django_db
+@patch('elastic_django.management.commands.index_models.set_high_water_mark')
+@patch('elastic_django.management.commands.index_models.get_high_water_mark')
+@patch('elastic_django.management.commands.index_models.streaming_bulk')
+@patch('elastic_django.management.commands.index_models.ElasticsearchClient')
+class IncrementalIndexModelsTestCase(TestCase):
+    """
+    Tests for incremental indexing with ``index_models`` custom management
+    command.
+    """
+    pytestmark = pytest.mark.django_db
+
+    def setUp(self):
+        with patch('elastic_django.manager.ElasticManager.index_object'):
+            book = Book.objects.create(
+                title='Effective Python', author='Brett Slatkin',
+                isbn='9780134034287', publication_year=2015,
+                description='59 Specific Ways to Write Better Python.')
+            self.old = Edition.objects.create(
+                book=book, code=uuid.uuid4(), price=decimal.Decimal('39.99'),
+                published=datetime.date(2015, 3, 8),
+                printed=datetime.datetime(2015, 3, 1))
+            self.new = Edition.objects.create(
+                book=book, code=uuid.uuid4(), price=decimal.Decimal('44.99'),
+                published=datetime.date(2019, 11, 4),
+                printed=datetime.datetime(2019, 10, 1))
+
+    def index(self, bulk_mock, *args, **options):
+        sent = []
+
+        def consume(connection, actions, **kwargs):
+            for action in actions:
+                sent.append(action['_id'])
+                yield True, {}
+
+        bulk_mock.side_effect = consume
+        out, err = six.StringIO(), six.StringIO()
+        call_command(
+            'index_models', 'tests', *args, stdout=out, stderr=err, **options)
+
+        return sent, err.getvalue()
+
+    def test_since_last_run(self, client_mock, bulk_mock, get_mock, set_mock):
+        """
+        Tests that only objects changed since the stored high-water mark are
+        indexed, and the mark moved forward afterwards.
+        """
+        client_mock.return_value.index_name = 'testing-elasticdjango'
+        get_mock.return_value = datetime.datetime(2018, 1, 1)
+
+        sent, err = self.index(bulk_mock, updated_field='printed')
+
+        self.assertEqual(sent, [self.new.pk])
+        self.assertIn("Model Book has no field 'printed'. Skipped.", err)
+
+        self.assertEqual(set_mock.call_count, 1)
+        _, index_name, model, field, mark = set_mock.call_args[0]
+        self.assertEqual(
+            (index_name, model, field),
+            ('testing-elasticdjango', Edition, 'printed'))
+        self.assertGreater(mark, datetime.datetime(2019, 10, 1))
+
+    def test_first_run(self, client_mock, bulk_mock, get_mock, set_mock):
+        """
+        Tests that all objects are indexed when there is no high-water mark.
+        """
+        get_mock.return_value = None
+
+        sent, _ = self.index(bulk_mock, updated_field='printed')
+
+        self.assertEqual(sorted(sent), [self.old.pk, self.new.pk])
+        self.assertTrue(set_mock.called)
+
+    def test_since_given(self, client_mock, bulk_mock, get_mock, set_mock):
+        """
+        Tests indexing of objects changed since a given timestamp.
+        """
+        sent, _ = self.index(
+            bulk_mock, updated_field='printed', since='2015-02-01')
+
+        self.assertEqual(sorted(sent), [self.old.pk, self.new.pk])
+        self.assertFalse(get_mock.called)
+
+        self.assertRaises(
+            CommandError, self.index, bulk_mock, since='2015-02-01')
+        self.assertRaises(
+            CommandError, self.index, bulk_mock, updated_field='printed',
+            since='last tuesday')
+
+    def test_errors_keep_mark(self, client_mock, bulk_mock, get_mock,
+                              set_mock):
+        """
+        Tests that the high-water mark isn't moved forward if any document
+        failed to be indexed.
+        """
+        get_mock.return_value = None
+        bulk_mock.side_effect = lambda connection, actions, **kwargs: iter(
+            [(False, {}) for _ in actions])
+
+        call_command(
+            'index_models', 'tests', updated_field='printed',
+            stdout=six.StringIO(), stderr=six.StringIO())
+
+        self.assertFalse(set_mock.called)
+
+
+@pytest.mark.django_db
+@patch('elastic_django.management.commands.index_models.streaming_bulk')
+@patch('elastic_django.management.commands.index_models.ElasticsearchClient')
+class RebuildIndexModelsTestCase(TestCase):
+    """
+    Tests for zero-downtime rebuilds with ``index_models`` custom management
+    command.
+    """
+    pytestmark = pytest.mark.django_db
+
+    def setUp(self):
+        with patch('elastic_django.manager.ElasticManager.index_object'):
+            Book.objects.create(
+                title='Effective Python', author='Brett Slatkin',
+                isbn='9780134034287', publication_year=2015,
+                description='59 Specific Ways to Write Better Python.')
+        self.analysis = {'analyzer': {'folding': {
+            'tokenizer': 'standard', 'filter': ['asciifolding']}}}
+
+    def configure(self, client_mock, bulk_mock, ok=True):
+        client_mock.return_value.index_name = 'testing-elasticdjango'
+        connection = client_mock.return_value.connection
+        connection.indices.get_settings.return_value = {
+            'testing-elasticdjango-1': {'settings': {'index': {
+                'number_of_replicas': '2', 'number_of_shards': '3',
+                'analysis': self.analysis}}}}
+        connection.indices.exists_alias.return_value = True
+        connection.indices.get_alias.return_value = {
+            'testing-elasticdjango-1': {}}
+
+        bulk_mock.side_effect = lambda connection, actions, **kwargs: iter(
+            [(ok, {}) for _ in actions])
+
+        return connection
+
+    def test_rebuild(self, client_mock, bulk_mock):
+        """
+        Tests that documents are indexed into a new index, with the analysis,
+        shards and replicas of the former one, which it replaces behind the
+        alias once complete.
+        """
+        connection = self.configure(client_mock, bulk_mock)
+
+        call_command(
+            'index_models', rebuild=True,
+            stdout=six.StringIO(), stderr=six.StringIO())
+
+        create_kwargs = connection.indices.create.call_args[1]
+        index = create_kwargs['index']
+        self.assertTrue(index.startswith('testing-elasticdjango-'))
+        self.assertEqual(
+            create_kwargs['body']['settings']['index'],
+            {'number_of_replicas': '2', 'number_of_shards': '3',
+             'analysis': self.analysis})
+
+        # Every document went to the new index.
+        for call in bulk_mock.call_args_list:
+            self.assertTrue(all(
+                action['_index'] == index for action in call[0][1]))
+
+        # Loaded with bulk load settings, restored afterwards.
+        self.assertEqual(connection.indices.put_settings.call_args_list, [
+            call(index=index, body={'index': BULK_LOAD_SETTINGS}),
+            call(index=index, body={'index': {
+                'refresh_interval': None, 'number_of_replicas': '2',
+                'translog.flush_threshold_size': None}}),
+        ])
+        connection.indices.forcemerge.assert_called_once_with(
+            index=index, request_timeout=3600)
+        connection.indices.update_aliases.assert_called_once_with(body={
+            'actions': [
+                {'remove': {
+                    'index': 'testing-elasticdjango-1',
+                    'alias': 'testing-elasticdjango'}},
+                {'add': {'index': index, 'alias': 'testing-elasticdjango'}},
+            ]})
+        connection.indices.delete.assert_called_once_with(
+            index='testing-elasticdjango-1')
+
+    def test_rebuild_errors(self, client_mock, bulk_mock):
+        """
+        Tests that the alias is left untouched, and the new index removed, if
+        any document failed to be indexed.
+        """
+        connection = self.configure(client_mock, bulk_mock, ok=False)
+
+        self.assertRaises(
+            CommandError, call_command, 'index_models', rebuild=True,
+            stdout=six.StringIO(), stderr=six.StringIO())
+
+        index = connection.indices.create.call_args[1]['index']
+        self.assertEqual(connection.indices.put_settings.call_count, 2)
+        self.assertFalse(connection.indices.update_aliases.called)
+        connection.indices.delete.assert_called_once_with(
+            index=index, ignore=404)
+
+    @patch('elastic_django.management.commands.index_models.'
+           'set_high_water_mark')
+    def test_rebuild_catch_up(self, set_mock, client_mock, bulk_mock):
+        """
+        Tests that objects changed while rebuilding are indexed into the new
+        index before the swap, and the ones changed until the swap right after
+        it.
+        """
+        connection = self.configure(client_mock, bulk_mock)
+        with patch('elastic_django.manager.ElasticManager.index_object'):
+            editions = [
+                Edition.objects.create(
+                    book=Book.objects.get(), code=uuid.uuid4(),
+                    price=decimal.Decimal('39.99'),
+                    published=datetime.date(2015, 3, 8),
+                    printed=datetime.datetime(2015, 3, 1))
+                for _ in range(2)
+            ]
+
+        def save(edition):
+            Edition.objects.filter(pk=edition.pk).update(
+                printed=timezone.now())
+
+        sent = []
+
+        def consume(connection, actions, **kwargs):
+            actions = list(actions)
+            if not sent:
+                # Saved while building.
+                save(editions[0])
+            sent.append(actions)
+            return iter([(True, {}) for _ in actions])
+
+        bulk_mock.side_effect = consume
+        # Saved right before the swap.
+        connection.indices.update_aliases.side_effect = \
+            lambda **kwargs: save(editions[1])
+
+        err = six.StringIO()
+        call_command(
+            'index_models', 'tests', rebuild=True, updated_field='printed',
+            stdout=six.StringIO(), stderr=err)
+
+        index = connection.indices.create.call_args[1]['index']
+        self.assertEqual(
+            [(action['_index'], action['_id']) for action in sent[-2]],
+            [(index, editions[0].pk)])
+        self.assertEqual(
+            [(action['_index'], action['_id']) for action in sent[-1]],
+            [('testing-elasticdjango', editions[1].pk)])
+        self.assertIn("Model Book has no field 'printed'.", err.getvalue())
+
+        _, index_name, model, field, _ = set_mock.call_args[0]
+        self.assertEqual(
+            (index_name, model, field),
+            ('testing-elasticdjango', Edition, 'printed'))
+
+    def test_bulk_load(self, client_mock, bulk_mock):
+        """
+        Tests that existing indices are tuned for bulk loading, and restored
+        afterwards.
+        """
+        connection = self.configure(client_mock, bulk_mock)
+
+        call_command(
+            'index_models', bulk_load=True,
+            stdout=six.StringIO(), stderr=six.StringIO())
+
+        self.assertEqual(connection.indices.put_settings.call_args_list, [
+            call(index='testing-elasticdjango',
+                 body={'index': BULK_LOAD_SETTINGS}),
+            call(index='testing-elasticdjango', body={'index': {
+                'refresh_interval': None, 'number_of_replicas': '2',
+                'translog.flush_threshold_size': None}}),
+        ])
+        self.assertFalse(connection.indices.create.called)
+
+    def test_rebuild_options(self, client_mock, bulk_mock):
+        """
+        Tests that rebuilds can't be incremental, nor leave out models sharing
+        the index.
+        """
+        self.configure(client_mock, bulk_mock)
+
+        self.assertRaises(
+            CommandError, call_command, 'index_models', rebuild=True,
+            updated_field='printed', since='2015-02-01')
+
+        # A model of another app indexed in the same index.
+        with patch.object(BookSelection._meta, 'app_label', 'library'):
+            self.assertRaises(
+                CommandError, call_command, 'index_models', 'tests',
+                rebuild=True, stdout=six.StringIO(), stderr=six.StringIO())
+
+
+@patch('elastic_django.management.commands.create_index.ElasticsearchClient')
+class CreateIndexTestCase(TestCase):
+    """
+    Tests for ``create_index`` custom management command.
+    """
+    def test_create_index(self, client_mock):
+        """
+        Tests that missing indices are created with the mappings of their
+        models, and existing ones get their mappings updated.
+        """
+        client_mock.return_value.index_name = 'testing-elasticdjango'
+        connection = client_mock.return_value.connection
+        connection.indices.exists.return_value = False
+
+        call_command('create_index', 'tests', stdout=six.StringIO())
+
+        connection.indices.create.assert_called_once_with(
+            index='testing-elasticdjango',
+            body=get_index_body(
+                [Book, BookSelection, BookExclusion, Edition, Review]))
+
+        connection.indices.exists.return_value = True
+
+        call_command('create_index', 'tests', stdout=six.StringIO())
+
+        self.assertEqual(connection.indices.put_mapping.call_count, 5)
+        connection.indices.put_mapping.assert_called_with(
+            index='testing-elasticdjango', doc_type='Review',
+            body=get_mapping(Review))
+
+
+@patch('elastic_django.manager.get_client')
+@patch('elastic_django.manager.ElasticManager.scan_pages')
+class DumpIndexTestCase(TestCase):
+    """
+    Tests for ``dump_index`` custom management command.
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.pages = [
+            [
+                {'_index': 'books-1', '_type': 'Book', '_id': str(i),
+                 '_source': {'title': 'Book {0}'.format(i), 'pk': i}}
+                for i in range(start, start + 2)
+            ]
+            for start in (1, 3)
+        ]
+        self.mappings = {'Book': {'properties': {'title': {'type': 'text'}}}}
+        self.settings = {
+            'number_of_shards': '3',
+            'analysis': {'analyzer': {'folding': {
+                'tokenizer': 'standard', 'filter': ['asciifolding']}}},
+        }
+
+    def configure(self, scan_mock, client_mock):
+        scan_mock.return_value = iter(self.pages)
+        indices = client_mock.return_value.connection.indices
+        indices.get_mapping.return_value = {
+            'books-1': {'mappings': self.mappings}}
+        indices.get_settings.return_value = {'books-1': {'settings': {
+            'index': dict(self.settings, number_of_replicas='1', uuid='x')}}}
+
+    def test_dump_index(self, scan_mock, client_mock):
+        """
+        Tests that the documents are streamed page by page into a compressed
+        NDJSON file, after a header with the index mappings and settings.
+        """
+        self.configure(scan_mock, client_mock)
+        path = os.path.join(self.directory, 'books.ndjson.gz')
+        out = six.StringIO()
+
+        call_command('dump_index', path, 'books', page_size=2, stdout=out)
+
+        self.assertIn("Dumped 4 documents of index 'books'", out.getvalue())
+        self.assertEqual(
+            scan_mock.call_args[1], {'index': 'books', 'page_size': 2})
+        with gzip.open(path, 'rb') as dump_file:
+            lines = [json.loads(line.decode('utf-8')) for line in dump_file]
+        self.assertEqual(
+            lines[0],
+            {'index': 'books', 'mappings': self.mappings,
+             'settings': self.settings})
+        self.assertEqual(
+            lines[1],
+            {'_type': 'Book', '_id': '1',
+             '_source': {'title': 'Book 1', 'pk': 1}})
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(os.listdir(self.directory), ['books.ndjson.gz'])
+
+    def test_read_dump(self, scan_mock, client_mock):
+        """
+        Tests that dumped documents are read back as ``_bulk`` API actions
+        into any index.
+        """
+        self.configure(scan_mock, client_mock)
+        path = os.path.join(self.directory, 'books.ndjson.gz')
+        call_command('dump_index', path, 'books', stdout=six.StringIO())
+
+        self.assertEqual(dumps.read_header(path)['index'], 'books')
+        actions = list(dumps.read_actions(path, 'books-copy'))
+        self.assertEqual(
+            actions,
+            [dict(hit, _index='books-copy')
+             for page in self.pages for hit in page])
+
+    def test_dump_index_failure(self, scan_mock, client_mock):
+        """
+        Tests that interrupted dumps leave no file behind.
+        """
+        self.configure(scan_mock, client_mock)
+
+        def fail(**kwargs):
+            yield self.pages[0]
+            raise TransportError(500, 'search_phase_execution_exception')
+
+        scan_mock.return_value = None
+        scan_mock.side_effect = fail
+        path = os.path.join(self.directory, 'books.ndjson.gz')
+
+        self.assertRaises(
+            CommandError, call_command, 'dump_index', path, 'books',
+            stdout=six.StringIO())
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+@patch('elastic_django.management.commands.load_index.streaming_bulk')
+@patch('elastic_django.management.commands.load_index.ElasticsearchClient')
+class LoadIndexTestCase(TestCase):
+    """
+    Tests for ``load_index`` custom management command.
+    """
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'books.ndjson')
+        self.mappings = {'Book': {'properties': {'title': {'type': 'text'}}}}
+        self.settings = {'number_of_shards': '3', 'analysis': {}}
+        with open(self.path, 'w') as dump_file:
+            dump_file.write(json.dumps(
+                {'index': 'books', 'mappings': self.mappings,
+                 'settings': self.settings}) + '\n')
+            for i in range(1, 4):
+                dump_file.write(json.dumps({
+                    '_type': 'Book', '_id': str(i),
+                    '_source': {'title': 'Book {0}'.format(i), 'pk': i},
+                }) + '\n')
+
+    def consume(self, sent):
+        def consume(connection, actions, **kwargs):
+            for action in actions:
+                sent.append(action)
+                yield action['_id'] != '2', {'index': {'_id': action['_id']}}
+        return consume
+
+    def test_load_index(self, client_mock, bulk_mock):
+        """
+        Tests that the documents of the dump are streamed into a new index
+        with the dumped mappings and settings, through the ``_bulk`` API.
+        """
+        connection = client_mock.return_value.connection
+        connection.indices.exists.return_value = False
+        sent = []
+        bulk_mock.side_effect = self.consume(sent)
+        out = six.StringIO()
+
+        call_command(
+            'load_index', self.path, 'books-copy', batch_size=2,
+            stdout=out)
+
+        connection.indices.create.assert_called_once_with(
+            index='books-copy',
+            body={'mappings': self.mappings,
+                  'settings': {'index': self.settings}})
+        self.assertEqual(bulk_mock.call_args[1]['chunk_size'], 2)
+        self.assertEqual(
+            sent[0],
+            {'_index': 'books-copy', '_type': 'Book', '_id': '1',
+             '_source': {'title': 'Book 1', 'pk': 1}})
+        self.assertEqual(len(sent), 3)
+        self.assertIn(
+            "Loaded 2 documents into index 'books-copy'", out.getvalue())
+        self.assertIn('1 errors', out.getvalue())
+
+    def test_load_index_bulk_load(self, client_mock, bulk_mock):
+        """
+        Tests that existing indices are loaded into as they are, with bulk
+        load settings if requested.
+        """
+        connection = client_mock.return_value.connection
+        connection.indices.exists.return_value = True
+        connection.indices.get_settings.return_value = {}
+        bulk_mock.side_effect = self.consume([])
+
+        call_command(
+            'load_index', self.path, bulk_load=True, stdout=six.StringIO())
+
+        self.assertFalse(connection.indices.create.called)
+        connection.indices.put_settings.assert_any_call(
+            index='books', body={'index': BULK_LOAD_SETTINGS})
+        connection.indices.refresh.assert_called_once_with(index='books')
+
+    def test_invalid_dump(self, client_mock, bulk_mock):
+        """
+        Tests that files which are not dumps are rejected.
+        """
+        with open(self.path, 'w') as dump_file:
+            dump_file.write('Not a dump\n')
+
+        self.assertRaises(
+            CommandError, call_command, 'load_index', self.path,
+            stdout=six.StringIO())
+        self.assertFalse(bulk_mock.called)
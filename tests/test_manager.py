@@ -0,0 +1,257 @@
+from unittest import TestCase
+
+from django.test.utils import override_settings
+
+from mock import patch
+
+from elastic_django import manager
+from elastic_django.exceptions import (
+    ElasticsearchClientConfigurationError,
+    ElasticsearchClientNotConnectedError)
+from elastic_django.manager import ElasticManager, get_client
+from .models import Book
+
+
+class ElasticManagerConnectionTestCase(TestCase):
+    def setUp(self):
+        # Start every test without any process-wide client.
+        for name in ('_client', '_client_failed_at', '_client_failed_pid'):
+            patcher = patch.object(manager, name, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @patch('elastic_django.manager.ElasticsearchClient')
+    def test_no_connection_on_creation(self, mock):
+        """
+        Tests that creating a manager doesn't connect to the ES backend.
+        """
+        ElasticManager()
+        self.assertFalse(mock.called)
+
+    @patch('elastic_django.manager.ElasticsearchClient')
+    def test_client_shared_on_first_use(self, mock):
+        """
+        Tests that a single client is created on the first ES operation and
+        shared by all the managers afterwards.
+        """
+        first, second = ElasticManager(), ElasticManager()
+        first.is_connected()
+        second.is_connected()
+
+        self.assertEqual(mock.call_count, 1)
+        self.assertIs(first._connection, second._connection)
+        self.assertIs(get_client(), mock.return_value)
+
+    @patch('elastic_django.manager.os.getpid')
+    @patch('elastic_django.manager.ElasticsearchClient')
+    def test_new_client_after_fork(self, mock, getpid_mock):
+        """
+        Tests that forked processes don't reuse the client of their parent.
+        """
+        getpid_mock.return_value = 1
+        get_client()
+        getpid_mock.return_value = 2
+        get_client()
+
+        self.assertEqual(mock.call_count, 2)
+
+    @patch('elastic_django.manager.ElasticsearchClient')
+    def test_backend_unavailable(self, mock):
+        """
+        Tests that operations fail with a not connected error when the ES
+        backend can't be reached, and connection is retried afterwards.
+        """
+        mock.side_effect = ElasticsearchClientConfigurationError('Down')
+        elastic = ElasticManager()
+
+        with patch('elastic_django.manager.time.time', return_value=1000):
+            self.assertRaises(
+                ElasticsearchClientNotConnectedError, elastic.is_connected)
+
+        mock.side_effect = None
+        with patch('elastic_django.manager.time.time', return_value=1010):
+            elastic.is_connected()
+        self.assertEqual(mock.call_count, 2)
+
+    @override_settings(ELASTICSEARCH_RECONNECT_BACKOFF=30)
+    @patch('elastic_django.manager.ElasticsearchClient')
+    def test_reconnect_backoff(self, mock):
+        """
+        Tests that no connection is attempted for a while after a failed one,
+        operations failing right away meanwhile.
+        """
+        mock.side_effect = ElasticsearchClientConfigurationError('Down')
+        elastic = ElasticManager()
+
+        with patch('elastic_django.manager.time.time', return_value=1000):
+            self.assertRaises(
+                ElasticsearchClientNotConnectedError, elastic.is_connected)
+        mock.side_effect = None
+        with patch('elastic_django.manager.time.time', return_value=1029):
+            self.assertRaises(
+                ElasticsearchClientNotConnectedError, elastic.is_connected)
+            self.assertRaises(ElasticsearchClientNotConnectedError, get_client)
+        self.assertEqual(mock.call_count, 1)
+
+        with patch('elastic_django.manager.time.time', return_value=1030):
+            elastic.is_connected()
+        self.assertEqual(mock.call_count, 2)
+
+    @override_settings(ELASTICSEARCH_RECONNECT_BACKOFF=0)
+    @patch('elastic_django.manager.ElasticsearchClient')
+    def test_no_reconnect_backoff(self, mock):
+        """
+        Tests that every operation attempts to connect with no backoff.
+        """
+        mock.side_effect = ElasticsearchClientConfigurationError('Down')
+        elastic = ElasticManager()
+
+        self.assertRaises(
+            ElasticsearchClientNotConnectedError, elastic.is_connected)
+        self.assertRaises(
+            ElasticsearchClientNotConnectedError, elastic.is_connected)
+        self.assertEqual(mock.call_count, 2)
+
+
+@patch('elastic_django.manager.get_client')
+class ElasticManagerBulkTestCase(TestCase):
+    def setUp(self):
+        self.books = [
+            Book(pk=i, title='Book {0}'.format(i), author='Anonymous',
+                 publication_year=2000 + i)
+            for i in range(1, 6)
+        ]
+
+    @patch('elastic_django.manager.streaming_bulk')
+    def test_index_objects(self, bulk_mock, client_mock):
+        """
+        Tests that objects are indexed through the ``_bulk`` API, reporting
+        the result of every object instead of raising on errors.
+        """
+        def consume(connection, actions, **kwargs):
+            for action in actions:
+                yield action['_id'] != 3, {'index': {'_id': action['_id']}}
+
+        bulk_mock.side_effect = consume
+
+        results = ElasticManager().index_objects(
+            iter(self.books), chunk_size=2)
+
+        self.assertEqual(
+            [ok for ok, _ in results], [True, True, False, True, True])
+        kwargs = bulk_mock.call_args[1]
+        self.assertEqual(kwargs['chunk_size'], 2)
+        self.assertFalse(kwargs['raise_on_error'])
+        self.assertFalse(kwargs['raise_on_exception'])
+
+    @patch('elastic_django.manager.streaming_bulk')
+    def test_remove_objects(self, bulk_mock, client_mock):
+        """
+        Tests that objects are removed through the ``_bulk`` API.
+        """
+        sent = []
+
+        def consume(connection, actions, **kwargs):
+            for action in actions:
+                sent.append(action)
+                yield True, {'delete': {'_id': action['_id']}}
+
+        bulk_mock.side_effect = consume
+
+        results = ElasticManager().remove_objects(self.books[:2])
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(
+            sent[0],
+            {
+                '_op_type': 'delete',
+                '_index': 'testing-elasticdjango',
+                '_type': 'Book',
+                '_id': 1,
+            })
+
+    def test_get_objects(self, client_mock):
+        """
+        Tests that objects are retrieved with ``_mget`` requests of
+        ``chunk_size`` documents at most, keeping their order.
+        """
+        connection = client_mock.return_value.connection
+        connection.mget.side_effect = lambda body: {
+            'docs': [
+                {'_id': doc['_id'], 'found': doc['_id'] != 4}
+                for doc in body['docs']
+            ]
+        }
+
+        docs = ElasticManager().get_objects(self.books, chunk_size=2)
+
+        self.assertEqual(connection.mget.call_count, 3)
+        self.assertEqual([doc['_id'] for doc in docs], [1, 2, 3, 4, 5])
+        self.assertEqual(
+            [doc['found'] for doc in docs], [True, True, True, False, True])
+
+
+@patch('elastic_django.manager.get_client')
+class ElasticManagerScanTestCase(TestCase):
+    def setUp(self):
+        self.pages = [
+            [{'_id': str(i)} for i in range(start, start + 2)]
+            for start in (1, 3, 5)
+        ] + [[]]
+
+    def configure(self, client_mock):
+        connection = client_mock.return_value.connection
+        connection.search.return_value = {
+            '_scroll_id': 'scroll-0', 'hits': {'hits': self.pages[0]}}
+        connection.scroll.side_effect = [
+            {'_scroll_id': 'scroll-{0}'.format(i), 'hits': {'hits': page}}
+            for i, page in enumerate(self.pages[1:], 1)
+        ]
+        return connection
+
+    def test_scan_pages(self, client_mock):
+        """
+        Tests that all the hits are streamed in pages with the scroll API, and
+        the scroll context cleared at the end.
+        """
+        connection = self.configure(client_mock)
+
+        pages = list(Book.elastic.scan_pages(
+            {'term': {'author': 'anonymous'}}, page_size=2,
+            source=['title']))
+
+        self.assertEqual(pages, self.pages[:3])
+        kwargs = connection.search.call_args[1]
+        self.assertEqual(kwargs['index'], 'testing-elasticdjango')
+        self.assertEqual(kwargs['doc_type'], 'Book')
+        self.assertEqual(kwargs['scroll'], '5m')
+        self.assertEqual(
+            kwargs['body'],
+            {
+                'query': {'term': {'author': 'anonymous'}},
+                'sort': ['_doc'],
+                'size': 2,
+                '_source': ['title'],
+            })
+        self.assertEqual(
+            connection.scroll.call_args_list[1][1]['scroll_id'], 'scroll-1')
+        self.assertEqual(
+            connection.clear_scroll.call_args[1]['scroll_id'], 'scroll-3')
+
+    def test_scan(self, client_mock):
+        """
+        Tests that hits are streamed one at a time, and the scroll context
+        cleared even if the stream is not consumed entirely.
+        """
+        connection = self.configure(client_mock)
+
+        hits = ElasticManager().scan(index='books')
+        self.assertEqual(next(hits), {'_id': '1'})
+        self.assertEqual(next(hits), {'_id': '2'})
+        hits.close()
+
+        self.assertFalse(connection.scroll.called)
+        self.assertTrue(connection.clear_scroll.called)
+        self.assertEqual(
+            connection.search.call_args[1]['body']['query'],
+            {'match_all': {}})
@@ -0,0 +1,51 @@
+from django.test import SimpleTestCase
+
+from elastic_django.mappings import get_index_body, get_mapping
+from .models import Book, BookSelection, Edition
+
+
+class MappingsTestCase(SimpleTestCase):
+    """
+    Tests for ES mappings derived from model fields.
+    """
+    def test_field_types(self):
+        self.assertEqual(get_mapping(Book), {'properties': {
+            'title': {'type': 'text'},
+            'author': {'type': 'text'},
+            'isbn': {'type': 'text'},
+            'publication_year': {'type': 'short'},
+            'description': {'type': 'text'},
+            'pk': {'type': 'integer'},
+            'elastic_fingerprint': {
+                'type': 'keyword', 'index': False, 'doc_values': False},
+        }})
+
+    def test_relations_and_overrides(self):
+        """
+        Tests that relations are mapped like the related primary key, and
+        ``elastic_mapping`` overrides are applied.
+        """
+        properties = get_mapping(Edition)['properties']
+
+        self.assertEqual(properties['book'], {'type': 'integer'})
+        self.assertEqual(properties['code'], {'type': 'keyword'})
+        self.assertEqual(
+            properties['price'],
+            {'type': 'scaled_float', 'scaling_factor': 100})
+        self.assertEqual(properties['published'], {'type': 'date'})
+        self.assertEqual(properties['printed'], {'type': 'date'})
+        self.assertEqual(
+            properties['length'], {'type': 'keyword', 'index': False})
+
+    def test_selected_fields(self):
+        self.assertEqual(
+            list(get_mapping(BookSelection)['properties']),
+            ['title', 'author', 'pk', 'elastic_fingerprint'])
+
+    def test_index_body(self):
+        body = get_index_body(
+            [Book, Edition], settings={'number_of_replicas': 0})
+
+        self.assertEqual(list(body['mappings']), ['Book', 'Edition'])
+        self.assertEqual(
+            body['settings'], {'index': {'number_of_replicas': 0}})
@@ -4,10 +4,12 @@ from django.test import TestCase
 from django.test.utils import override_settings
 
 import pytest
+from elasticsearch.exceptions import NotFoundError
 from mock import patch
 
 from elastic_django.models import ElasticModel, ElasticModelBase
 from elastic_django.exceptions import InvalidElasticsearchOperationError
+from elastic_django.serializers import FINGERPRINT_FIELD, fingerprint
 from .models import Book, BookExclusion, BookSelection
 
 
@@ -45,6 +47,7 @@ class ElasticModelTestCase(TestCase):
         defined to index only a subset of its fields.
         """
         data = self.book_selection.elastic_serializer()
+        data.pop(FINGERPRINT_FIELD)
 
         self.assertDictEqual(
             data,
@@ -61,6 +64,7 @@ class ElasticModelTestCase(TestCase):
         defined to exclude a subset of its fields.
         """
         data = self.book_exclusion.elastic_serializer()
+        data.pop(FINGERPRINT_FIELD)
 
         self.assertDictEqual(
             data,
@@ -79,6 +83,7 @@ class ElasticModelTestCase(TestCase):
         """
         data = self.book.elastic_serializer()
 
+        self.assertEqual(data.pop(FINGERPRINT_FIELD), fingerprint(data))
         self.assertDictEqual(
             data,
             {
@@ -118,6 +123,83 @@ class ElasticModelTestCase(TestCase):
 
         self.assertFalse(mock.called)
 
+    @patch('elastic_django.manager.ElasticManager.index_object')
+    def test_unchanged_not_indexed(self, mock):
+        """
+        Tests that objects are only indexed again when any of their indexed
+        fields changed since they were loaded or indexed.
+        """
+        book = BookSelection.objects.get(pk=self.book_selection.pk)
+        book.description = 'Not indexed.'
+        book.save()
+        self.assertFalse(mock.called)
+
+        book.title = 'Effective Java, 3rd Edition'
+        book.save()
+        self.assertEqual(mock.call_count, 1)
+
+        # Indexed values are known now.
+        book.save()
+        self.assertEqual(mock.call_count, 1)
+
+        book.author = 'J. Bloch'
+        book.save(update_fields=['description'])
+        self.assertEqual(mock.call_count, 1)
+
+    @patch('elastic_django.manager.ElasticManager.index_object')
+    def test_inserts_indexed(self, mock):
+        """
+        Tests that inserted objects are indexed even if none of their indexed
+        fields changed, e.g. copies of objects loaded from DB.
+        """
+        book = BookSelection.objects.get(pk=self.book_selection.pk)
+        book.pk = None
+        book.save()
+        self.assertEqual(BookSelection.objects.count(), 2)
+        self.assertEqual(mock.call_count, 1)
+        self.assertEqual(mock.call_args[0][0].pk, book.pk)
+
+        book = BookSelection.objects.get(pk=self.book_selection.pk)
+        BookSelection.objects.filter(pk=book.pk).delete()
+        book.save(force_insert=True)
+        self.assertEqual(mock.call_count, 2)
+
+    @override_settings(ELASTICSEARCH_SKIP_UNCHANGED=False)
+    @patch('elastic_django.manager.ElasticManager.index_object')
+    def test_unchanged_indexed(self, mock):
+        """
+        Tests that every save is indexed if skipping unchanged objects is
+        disabled.
+        """
+        book = BookSelection.objects.get(pk=self.book_selection.pk)
+        book.save()
+        self.assertTrue(mock.called)
+
+    @override_settings(ELASTICSEARCH_PARTIAL_UPDATES=True)
+    @patch('elastic_django.manager.ElasticManager.index_object')
+    @patch('elastic_django.manager.ElasticManager.update_object')
+    def test_partial_update(self, update_mock, index_mock):
+        """
+        Tests that only the changed fields are sent, if partial updates are
+        enabled, and that missing documents are indexed as a whole.
+        """
+        book = Book.objects.get(pk=self.book.pk)
+        book.publication_year = 2019
+        book.save()
+
+        # The fingerprint of the whole document changes along.
+        update_mock.assert_called_once_with(book, {
+            'publication_year': 2019,
+            FINGERPRINT_FIELD: book.elastic_serializer()[FINGERPRINT_FIELD],
+        })
+        self.assertFalse(index_mock.called)
+
+        update_mock.side_effect = NotFoundError(404, 'document_missing')
+        book.title = 'Effective Python, 2nd Edition'
+        book.save()
+
+        index_mock.assert_called_once_with(book)
+
     def test_index_delete_no_pk_error(self):
         """
         Tests error raised on trying to execute ``index_delete`` method when
@@ -233,6 +315,59 @@ class ElasticModelBaseTestCase(TestCase):
             }
         )
 
+    def test_meta_elastic_mapping_must_be_dict(self):
+        """
+        Tests that ``elastic_mapping`` attribute must be a dict.
+        """
+        self.assertRaisesMessage(
+            ImproperlyConfigured,
+            '`elastic_mapping` must be a dict.',
+            type,
+            'ElasticModel', (ElasticModel,), {
+                'Meta': type('ElasticModelBase', (ElasticModelBase,), {
+                    '__module__': 'tests.test_models',
+                    'elastic_mapping': ['foo']
+                })
+            }
+        )
+
+    def test_meta_elastic_related_must_be_dict(self):
+        """
+        Tests that ``elastic_related`` attribute must be a dict of tuples or
+        lists.
+        """
+        self.assertRaisesMessage(
+            ImproperlyConfigured,
+            '`elastic_related` must be a dict of tuples or lists.',
+            type,
+            'ElasticModel', (ElasticModel,), {
+                'Meta': type('ElasticModelBase', (ElasticModelBase,), {
+                    '__module__': 'tests.test_models',
+                    'elastic_related': {'foo': 'bar'}
+                })
+            }
+        )
+
+    def test_meta_elastic_related_must_be_relations(self):
+        """
+        Tests that the fields specified in ``elastic_related`` ``Meta`` class
+        attribute are relations.
+        """
+        self.assertRaisesMessage(
+            ImproperlyConfigured,
+            "The field 'field_1' specified in `elastic_related` is not a "
+            "relation of model 'ElasticModel'",
+            type,
+            'ElasticModel', (ElasticModel,), {
+                '__module__': 'tests.test_models',
+                'field_1': models.IntegerField(),
+                'Meta': type('ElasticModelBase', (ElasticModelBase,), {
+                    '__module__': 'tests.test_models',
+                    'elastic_related': {'field_1': ('foo',)}
+                })
+            }
+        )
+
     def test_meta_wrong_field_name_elastic_exclude(self):
         """
         Tests that the fields specified in ``elastic_exclude`` ``Meta`` class
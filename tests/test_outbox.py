@@ -0,0 +1,213 @@
+import os
+import shutil
+import tempfile
+import uuid
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import six
+
+import pytest
+from mock import patch
+
+from elastic_django import indexing, outbox
+from elastic_django.exceptions import ElasticsearchClientNotConnectedError
+from .models import Book
+
+
+def action(pk, op_type='index', title='Effective Python'):
+    action = {
+        '_op_type': op_type, '_index': 'testing-elasticdjango',
+        '_type': 'Book', '_id': pk,
+    }
+    if op_type == 'index':
+        action['_source'] = {'title': title, 'pk': pk}
+    return action
+
+
+class OutboxTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'outbox.jsonl')
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_write_disabled(self):
+        """
+        Tests that nothing is stored when no outbox is configured.
+        """
+        self.assertFalse(outbox.write([action(1)]))
+
+    def test_write_and_read(self):
+        """
+        Tests that actions are appended to the outbox and read back keeping
+        only the last one per document.
+        """
+        outbox.write([action(1), action(2)], path=self.path)
+        outbox.write([action(1, title='Updated'), action(2, 'delete')],
+                     path=self.path)
+
+        actions, count = outbox.read(self.path)
+
+        self.assertEqual(count, 4)
+        self.assertEqual(
+            actions, [action(1, title='Updated'), action(2, 'delete')])
+
+    def test_write_uuid_ids(self):
+        """
+        Tests that actions with non JSON native ids are stored as text.
+        """
+        pk = uuid.uuid4()
+        outbox.write([action(pk, 'delete')], path=self.path)
+
+        self.assertEqual(
+            outbox.read(self.path)[0], [action(str(pk), 'delete')])
+
+    def test_write_failed(self):
+        """
+        Tests that only actions failing temporarily are stored.
+        """
+        actions = [action(1), action(2), action(3), action(4)]
+        results = [
+            (True, {'index': {'status': 201}}),
+            (False, {'index': {'status': 400, 'error': 'mapper_parsing'}}),
+            (False, {'index': {'status': 'N/A', 'error': 'ConnectionError'}}),
+            (False, {'index': {'status': 503, 'error': 'unavailable'}}),
+        ]
+
+        self.assertEqual(
+            outbox.write_failed(actions, results, path=self.path), 2)
+        self.assertEqual(
+            outbox.read(self.path)[0], [action(3), action(4)])
+
+    @patch('elastic_django.manager.ElasticManager.index_object')
+    def test_backend_unavailable_on_save(self, index_mock):
+        """
+        Tests that objects are stored in the outbox when saved while the ES
+        backend is unreachable.
+        """
+        index_mock.side_effect = ElasticsearchClientNotConnectedError()
+        book = Book(pk=1, title='Effective Python', author='Brett Slatkin',
+                    publication_year=2015)
+
+        self.assertRaises(ElasticsearchClientNotConnectedError, book.index)
+
+        with override_settings(ELASTICSEARCH_OUTBOX_PATH=self.path):
+            book.index()
+
+        actions, _ = outbox.read(self.path)
+        self.assertEqual(actions[0]['_id'], 1)
+        self.assertEqual(actions[0]['_source'], book.elastic_serializer())
+
+    @patch('elastic_django.manager.ElasticManager.bulk')
+    def test_send_stores_failures(self, bulk_mock):
+        """
+        Tests that bulk operations failing temporarily, or not sent because the
+        ES backend is unreachable, are stored in the outbox.
+        """
+        bulk_mock.return_value = [
+            (True, {'index': {'status': 200}}),
+            (False, {'index': {'status': 429, 'error': 'rejected'}}),
+        ]
+        with override_settings(ELASTICSEARCH_OUTBOX_PATH=self.path):
+            indexing.send([action(1), action(2)])
+            bulk_mock.side_effect = ElasticsearchClientNotConnectedError()
+            indexing.send([action(3)])
+
+        self.assertEqual(
+            outbox.read(self.path)[0], [action(2), action(3)])
+
+
+@pytest.mark.django_db
+class ReplayIndexOutboxTestCase(TestCase):
+    """
+    Tests for ``replay_index_outbox`` custom management command.
+    """
+    pytestmark = pytest.mark.django_db
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'outbox.jsonl')
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_no_outbox_configured(self):
+        self.assertRaises(CommandError, call_command, 'replay_index_outbox')
+
+    @patch('elastic_django.manager.ElasticManager.bulk')
+    def test_replay(self, bulk_mock):
+        """
+        Tests that coalesced operations are sent in bulk, and the ones failing
+        temporarily are kept in the outbox.
+        """
+        outbox.write(
+            [action(1), action(2), action(1, title='Updated')],
+            path=self.path)
+        bulk_mock.return_value = [
+            (True, {'index': {'status': 200}}),
+            (False, {'index': {'status': 'N/A', 'error': 'ConnectionError'}}),
+        ]
+
+        out = six.StringIO()
+        call_command(
+            'replay_index_outbox', path=self.path, batch_size=10, stdout=out)
+
+        self.assertEqual(
+            bulk_mock.call_args[0][0],
+            [action(2), action(1, title='Updated')])
+        self.assertEqual(bulk_mock.call_args[1]['chunk_size'], 10)
+        self.assertIn(
+            'Replayed 2 operations (3 stored): 1 succeeded, 1 failed, 1 kept',
+            out.getvalue())
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(
+            outbox.read(self.path + '.replaying')[0],
+            [action(1, title='Updated')])
+
+    @patch('elastic_django.manager.ElasticManager.bulk')
+    def test_replay_keeps_newer_operations(self, bulk_mock):
+        """
+        Tests that operations stored while replaying win over the older ones
+        failing temporarily, on the next run.
+        """
+        outbox.write([action(5)], path=self.path)
+
+        def replay(actions, **kwargs):
+            # The object is deleted meanwhile.
+            outbox.write([action(5, 'delete')], path=self.path)
+            return [(False, {'index': {'status': 503}})]
+
+        bulk_mock.side_effect = replay
+        call_command(
+            'replay_index_outbox', path=self.path, stdout=six.StringIO())
+
+        bulk_mock.side_effect = None
+        bulk_mock.return_value = [(True, {'delete': {'status': 200}})]
+        call_command(
+            'replay_index_outbox', path=self.path, stdout=six.StringIO())
+
+        self.assertEqual(bulk_mock.call_args[0][0], [action(5, 'delete')])
+        self.assertFalse(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.path + '.replaying'))
+
+    @patch('elastic_django.manager.ElasticManager.bulk')
+    def test_replay_backend_unavailable(self, bulk_mock):
+        """
+        Tests that operations are kept when the ES backend is unreachable, to
+        be replayed on the next run.
+        """
+        outbox.write([action(1)], path=self.path)
+        bulk_mock.side_effect = ElasticsearchClientNotConnectedError()
+
+        self.assertRaises(
+            CommandError, call_command, 'replay_index_outbox', path=self.path)
+        self.assertEqual(
+            outbox.read(self.path + '.replaying')[0], [action(1)])
+
+        bulk_mock.side_effect = None
+        bulk_mock.return_value = [(True, {'index': {'status': 200}})]
+        call_command(
+            'replay_index_outbox', path=self.path, stdout=six.StringIO())
+
+        self.assertEqual(bulk_mock.call_args[0][0], [action(1)])
+        self.assertFalse(os.path.exists(self.path + '.replaying'))
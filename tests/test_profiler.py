@@ -0,0 +1,157 @@
+import threading
+from unittest import TestCase
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+import pytest
+from mock import MagicMock, patch
+
+from elastic_django.middleware import ElasticProfilerMiddleware
+from elastic_django.profiler import profile
+from elastic_django.signals import es_request
+from .models import Book
+
+
+@patch('elastic_django.manager.get_client')
+class ProfilerTestCase(TestCase):
+    def setUp(self):
+        self.books = [
+            Book(pk=i, title='Book {0}'.format(i), author='Anonymous',
+                 publication_year=2000)
+            for i in range(1, 5)
+        ]
+
+    def test_record(self, client_mock):
+        """
+        Tests that the ES requests made within the block are recorded.
+        """
+        connection = client_mock.return_value.connection
+        connection.get.return_value = {'found': True, '_source': {}}
+
+        with profile() as requests_profile:
+            Book.elastic.get_object(self.books[0])
+        Book.elastic.get_object(self.books[1])
+
+        self.assertEqual(len(requests_profile.calls), 1)
+        call = requests_profile.calls[0]
+        self.assertEqual(call['model'], 'tests.Book')
+        self.assertEqual(call['operation'], 'get')
+        self.assertEqual(call['index'], 'testing-elasticdjango')
+        self.assertEqual(call['retries'], 0)
+        self.assertEqual(requests_profile.duration, call['duration'])
+
+    def test_repeated(self, client_mock):
+        """
+        Tests that single document operations repeated in a loop are flagged,
+        unlike bulk operations.
+        """
+        with profile() as requests_profile:
+            for book in self.books:
+                Book.elastic.index_object(book)
+            Book.elastic.get_object(self.books[0])
+            Book.elastic.get_objects(self.books)
+
+        self.assertEqual(
+            requests_profile.repeated(),
+            [('tests.Book', 'index', 'testing-elasticdjango', 4)])
+        self.assertEqual(requests_profile.repeated(threshold=5), [])
+
+        with override_settings(ELASTICSEARCH_PROFILER_REPEATED_THRESHOLD=1):
+            self.assertEqual(len(requests_profile.repeated()), 2)
+
+    def test_nested(self, client_mock):
+        """
+        Tests that requests are recorded by every active profile.
+        """
+        with profile() as outer:
+            Book.elastic.index_object(self.books[0])
+            with profile() as inner:
+                Book.elastic.index_object(self.books[1])
+
+        self.assertEqual(len(outer.calls), 2)
+        self.assertEqual(len(inner.calls), 1)
+
+    def test_other_threads(self, client_mock):
+        """
+        Tests that requests made by other threads are not recorded.
+        """
+        with profile() as requests_profile:
+            thread = threading.Thread(
+                target=Book.elastic.index_object, args=(self.books[0],))
+            thread.start()
+            thread.join()
+
+        self.assertEqual(requests_profile.calls, [])
+
+    def test_receiver_disconnected(self, client_mock):
+        """
+        Tests that nothing is listening to ES requests once profiles end.
+        """
+        with profile():
+            with profile():
+                self.assertTrue(es_request.has_listeners())
+            self.assertTrue(es_request.has_listeners())
+        self.assertFalse(es_request.has_listeners())
+
+
+@patch('elastic_django.manager.get_client')
+class ElasticProfilerMiddlewareTestCase(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/books/')
+
+    @patch('elastic_django.middleware.logging')
+    def test_middleware(self, logging_mock, client_mock):
+        """
+        Tests that the ES requests of the view are reported in the response
+        headers, warning about N+1 patterns.
+        """
+        def view(request):
+            for pk in range(1, 4):
+                Book.elastic.remove_object(Book(pk=pk))
+            return HttpResponse()
+
+        response = ElasticProfilerMiddleware(view)(self.request)
+
+        self.assertEqual(response['X-Elasticsearch-Requests'], '3')
+        self.assertTrue(response['X-Elasticsearch-Time'].endswith('ms'))
+        self.assertEqual(len(self.request.elastic_profile.calls), 3)
+        self.assertEqual(logging_mock.warning.call_count, 1)
+        self.assertIn("'delete'", logging_mock.warning.call_args[0][0])
+        self.assertIn('/books/', logging_mock.warning.call_args[0][0])
+
+    @patch('elastic_django.middleware.logging')
+    def test_no_requests(self, logging_mock, client_mock):
+        """
+        Tests views not using ES.
+        """
+        response = ElasticProfilerMiddleware(
+            lambda request: HttpResponse())(self.request)
+
+        self.assertEqual(response['X-Elasticsearch-Requests'], '0')
+        self.assertEqual(response['X-Elasticsearch-Time'], '0.0ms')
+        self.assertFalse(logging_mock.warning.called)
+
+
+@patch('elastic_django.manager.get_client')
+class ElasticPanelTestCase(TestCase):
+    def test_panel(self, client_mock):
+        """
+        Tests that the debug toolbar panel lists the ES requests of the view.
+        """
+        pytest.importorskip('debug_toolbar')
+        from elastic_django.panels import ElasticPanel
+
+        def view(request):
+            for pk in range(1, 4):
+                Book.elastic.index_object(Book(pk=pk, title='<b>'))
+            return HttpResponse()
+
+        toolbar = MagicMock(stats={})
+        panel = ElasticPanel(toolbar, view)
+        panel.process_request(RequestFactory().get('/'))
+
+        self.assertTrue(panel.nav_subtitle.startswith('3 requests in'))
+        self.assertEqual(panel.content.count('<tr><td>index</td>'), 3)
+        self.assertIn('repeated 3 times', panel.content)
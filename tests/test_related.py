@@ -0,0 +1,195 @@
+from django.db import transaction
+from django.test import TestCase
+from django.test.utils import override_settings
+
+import pytest
+from mock import patch
+
+from elastic_django.mappings import get_mapping
+from elastic_django.related import iter_objects
+from elastic_django.serializers import FINGERPRINT_FIELD
+from .models import Book, Publisher, Review, Tag
+
+
+def sent_actions(bulk_mock):
+    return [
+        action for call in bulk_mock.call_args_list for action in call[0][0]]
+
+
+@pytest.mark.django_db
+@patch('elastic_django.manager.ElasticManager.remove_object')
+@patch('elastic_django.manager.ElasticManager.index_object')
+@patch('elastic_django.manager.ElasticManager.bulk')
+class RelatedObjectsTestCase(TestCase):
+    """
+    Tests for the related objects embedded into documents, as per the
+    ``elastic_related`` ``Meta`` option.
+    """
+    pytestmark = pytest.mark.django_db
+
+    def setUp(self):
+        with patch('elastic_django.manager.ElasticManager.index_object'), \
+                patch('elastic_django.manager.ElasticManager.bulk'):
+            self.book = Book.objects.create(
+                title='Dune', author='Frank Herbert', publication_year=1965)
+            self.publisher = Publisher.objects.create(
+                name='Chilton Books', country='US')
+            self.tags = [
+                Tag.objects.create(name=name) for name in ('sci-fi', 'epic')]
+            self.reviews = [
+                Review.objects.create(
+                    book=self.book, publisher=self.publisher,
+                    text='Review {0}'.format(i))
+                for i in range(3)
+            ]
+            for review in self.reviews:
+                review.tags.set(self.tags)
+
+    def test_serialize(self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that related objects are embedded with the selected fields.
+        """
+        review = Review.objects.create(book=self.book, text='No publisher')
+        review.tags.add(self.tags[0])
+
+        doc = review.elastic_serializer()
+        doc.pop(FINGERPRINT_FIELD)
+        self.assertEqual(
+            doc,
+            {
+                'book': {
+                    'title': 'Dune', 'author': 'Frank Herbert',
+                    'pk': self.book.pk,
+                },
+                'publisher': None,
+                'tags': [{'name': 'sci-fi', 'pk': self.tags[0].pk}],
+                'text': 'No publisher',
+                'pk': review.pk,
+            })
+
+    def test_mapping(self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that embedded objects are mapped with their selected fields.
+        """
+        mapping = get_mapping(Review)['properties']
+
+        self.assertEqual(
+            mapping['book'],
+            {
+                'type': 'object',
+                'properties': {
+                    'title': {'type': 'text'},
+                    'author': {'type': 'text'},
+                    'pk': {'type': 'integer'},
+                },
+            })
+        self.assertEqual(
+            list(mapping['tags']['properties']), ['name', 'pk'])
+
+    def test_iter_objects(self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that objects are read in chunks with their relations retrieved
+        in bulk, with no query per object.
+        """
+        queryset = Review.objects.all()
+
+        # 2 chunks and an empty one, plus the tags of every chunk.
+        with self.assertNumQueries(5):
+            docs = [
+                obj.elastic_serializer()
+                for obj in iter_objects(queryset, chunk_size=2)]
+
+        self.assertEqual(
+            [doc['pk'] for doc in docs],
+            [review.pk for review in self.reviews])
+        self.assertEqual(
+            [doc['tags'] for doc in docs],
+            [Review.objects.get(pk=doc['pk']).elastic_serializer()['tags']
+             for doc in docs])
+
+    def test_related_saved(self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that saving a related object indexes its dependents in bulk.
+        """
+        self.book.title = 'Dune Messiah'
+        self.book.save()
+
+        actions = sent_actions(bulk_mock)
+        self.assertEqual(
+            [action['_id'] for action in actions],
+            [review.pk for review in self.reviews])
+        self.assertEqual(
+            actions[0]['_source']['book']['title'], 'Dune Messiah')
+
+    def test_related_saved_unchanged(
+            self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that dependents are not indexed if none of their embedded
+        fields were saved.
+        """
+        self.book.publication_year = 1966
+        self.book.save(update_fields=['publication_year'])
+
+        self.assertFalse(bulk_mock.called)
+
+    @override_settings(ELASTICSEARCH_AUTO_INDEX=False)
+    def test_no_auto_index(self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that dependents are not indexed with automatic indexing off.
+        """
+        self.book.save()
+
+        self.assertFalse(bulk_mock.called)
+
+    def test_related_deleted(self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that dependents are indexed once the object they embed is
+        deleted, or removed if they were deleted with it.
+        """
+        self.publisher.delete()
+
+        actions = sent_actions(bulk_mock)
+        self.assertEqual(len(actions), 3)
+        self.assertIsNone(actions[0]['_source']['publisher'])
+
+        bulk_mock.reset_mock()
+        self.book.delete()
+
+        actions = sent_actions(bulk_mock)
+        self.assertEqual(
+            [action['_op_type'] for action in actions], ['delete'] * 3)
+        self.assertEqual(
+            [action['_id'] for action in actions],
+            [review.pk for review in self.reviews])
+
+    def test_m2m_changed(self, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that changes of an embedded many to many relation, from either
+        side, index the dependents.
+        """
+        self.reviews[0].tags.remove(self.tags[1])
+
+        actions = sent_actions(bulk_mock)
+        self.assertEqual(len(actions), 1)
+        self.assertEqual(
+            actions[0]['_source']['tags'],
+            [{'name': 'sci-fi', 'pk': self.tags[0].pk}])
+
+        bulk_mock.reset_mock()
+        self.tags[0].review_set.clear()
+
+        actions = sent_actions(bulk_mock)
+        self.assertEqual(len(actions), 3)
+        self.assertEqual(actions[0]['_source']['tags'], [])
+
+    @override_settings(ELASTICSEARCH_INDEXING_MODE='on_commit')
+    @patch('elastic_django.indexing.defer')
+    def test_deferred(self, defer_mock, bulk_mock, index_mock, remove_mock):
+        """
+        Tests that dependents are indexed as per the indexing mode.
+        """
+        with transaction.atomic():
+            self.tags[1].save()
+
+        self.assertFalse(bulk_mock.called)
+        self.assertEqual(defer_mock.call_count, 3)
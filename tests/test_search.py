@@ -0,0 +1,115 @@
+from django.test import TestCase
+
+import pytest
+from mock import patch
+
+from elastic_django.exceptions import InvalidElasticsearchOperationError
+from elastic_django.manager import ElasticManager
+from elastic_django.search import SearchResults
+from .models import Book, BookSelection
+
+
+@pytest.mark.django_db
+class SearchTestCase(TestCase):
+    pytestmark = pytest.mark.django_db
+
+    def setUp(self):
+        with patch('elastic_django.manager.ElasticManager.index_object'):
+            self.books = [
+                Book.objects.create(
+                    title='Book {0}'.format(i), author='Anonymous',
+                    publication_year=2000 + i)
+                for i in range(7)
+            ]
+
+        # ES hits, by descending score: last created books first, plus a hit
+        # whose object was removed from the DB.
+        self.hits = [
+            {'_id': str(book.pk), '_score': float(book.pk)}
+            for book in reversed(self.books)
+        ]
+        self.hits.insert(2, {'_id': '9999', '_score': 0.5})
+
+        patcher = patch('elastic_django.manager.get_client')
+        self.connection = patcher.start().return_value.connection
+        self.connection.search.side_effect = self.search
+        self.addCleanup(patcher.stop)
+
+    def search(self, index, doc_type, body):
+        start, size = body['from'], body['size']
+        return {
+            'hits': {
+                'total': len(self.hits),
+                'hits': self.hits[start:start + size],
+            }
+        }
+
+    def test_manager_bound_to_model(self):
+        """
+        Tests that the manager knows the model it's accessed from.
+        """
+        self.assertIs(Book.elastic.model, Book)
+        self.assertIs(BookSelection.elastic.model, BookSelection)
+        self.assertIs(self.books[0].elastic.model, Book)
+        self.assertIs(Book.elastic, Book.elastic)
+
+        self.assertRaises(
+            InvalidElasticsearchOperationError, ElasticManager().search,
+            title='Python')
+
+    def test_lazy_search(self):
+        """
+        Tests that no request is sent until results are needed.
+        """
+        results = Book.elastic.search(title='Book')
+
+        self.assertIsInstance(results, SearchResults)
+        self.assertFalse(self.connection.search.called)
+        self.assertEqual(
+            results.query,
+            {'bool': {'should': [{'match': {'title': 'Book'}}]}})
+
+    def test_iteration_in_pages(self):
+        """
+        Tests that results are retrieved in pages, hydrated with one DB query
+        per page and in ES scoring order.
+        """
+        results = Book.elastic.search(
+            query={'match_all': {}}, page_size=3)
+
+        with self.assertNumQueries(3):
+            objs = list(results)
+
+        self.assertEqual(objs, list(reversed(self.books)))
+        self.assertEqual(self.connection.search.call_count, 3)
+        self.assertEqual(objs[0].elastic_score, float(self.books[-1].pk))
+
+        kwargs = self.connection.search.call_args[1]
+        self.assertEqual(kwargs['index'], 'testing-elasticdjango')
+        self.assertEqual(kwargs['doc_type'], 'Book')
+
+    def test_slicing_and_count(self):
+        """
+        Tests that slices and indices are served from the pages of hits,
+        retrieved once.
+        """
+        results = Book.elastic.search(query={'match_all': {}}, page_size=3)
+
+        with self.assertNumQueries(1):
+            objs = results[3:6]
+
+        self.assertEqual(objs, self.books[4:1:-1])
+        self.assertEqual(self.connection.search.call_count, 1)
+        self.assertEqual(
+            self.connection.search.call_args[1]['body']['from'], 3)
+
+        # The other pages are retrieved once, as needed.
+        with self.assertNumQueries(2):
+            self.assertEqual(results[0], self.books[-1])
+            self.assertEqual(results[4], self.books[3])
+            self.assertEqual(results[1:], list(reversed(self.books))[1:])
+        self.assertEqual(len(results), 8)
+        self.assertEqual(self.connection.search.call_count, 3)
+
+        self.assertRaises(IndexError, results.__getitem__, 20)
+        self.assertRaises(ValueError, results.__getitem__, -1)
@@ -0,0 +1,70 @@
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core import serializers
+from django.test import TestCase
+
+import pytest
+from mock import patch
+
+from elastic_django.serializers import FINGERPRINT_FIELD, fingerprint
+from .models import Book, BookExclusion, BookSelection, Edition
+
+
+def django_serializer(obj, fields=None):
+    """
+    Serialization of an object through Django's JSON serializer, which
+    ``ElasticSerializer`` output must be equivalent to.
+    """
+    data = json.loads(serializers.serialize('json', [obj], fields=fields))
+    doc = data[0]['fields']
+    doc.update({'pk': data[0]['pk']})
+    doc[FINGERPRINT_FIELD] = fingerprint(doc)
+    return doc
+
+
+@pytest.mark.django_db
+class ElasticSerializerTestCase(TestCase):
+    pytestmark = pytest.mark.django_db
+
+    def setUp(self):
+        with patch('elastic_django.manager.ElasticManager.index_object'):
+            self.book = Book.objects.create(
+                title='Effective Python', author='Brett Slatkin',
+                isbn=None, publication_year=2015,
+                description='59 Specific Ways to Write Better Python.')
+            self.edition = Edition.objects.create(
+                book=self.book, code=uuid.uuid4(),
+                price=decimal.Decimal('39.99'),
+                published=datetime.date(2015, 3, 8),
+                printed=datetime.datetime(2015, 3, 1, 10, 30, 15, 123456),
+                length=datetime.timedelta(hours=7))
+
+    def test_same_output_as_django_serializer(self):
+        """
+        Tests that compiled serializers produce the same documents as Django's
+        JSON serializer.
+        """
+        self.assertEqual(
+            self.book.elastic_serializer(), django_serializer(self.book))
+        self.assertEqual(
+            self.edition.elastic_serializer(),
+            django_serializer(self.edition))
+
+    def test_compiled_fields(self):
+        """
+        Tests that ``elastic_fields`` and ``elastic_exclude`` are resolved when
+        the model class is created.
+        """
+        def compiled_fields(model):
+            return [name for name, _ in model._meta.document_serializer.fields]
+
+        self.assertEqual(compiled_fields(BookSelection), ['title', 'author'])
+        self.assertEqual(
+            compiled_fields(BookExclusion),
+            ['isbn', 'publication_year', 'description'])
+        self.assertEqual(
+            compiled_fields(Edition),
+            ['book', 'code', 'price', 'published', 'printed', 'length'])
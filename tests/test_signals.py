@@ -0,0 +1,288 @@
+from unittest import TestCase
+
+from asgiref.sync import async_to_sync
+from elasticsearch import Connection, Transport
+from elasticsearch.exceptions import ConnectionError
+from mock import MagicMock, patch
+from prometheus_client import CollectorRegistry
+
+from elastic_django.instrumentation import PrometheusReceiver, StatsdReceiver
+from elastic_django.manager import ElasticManager
+from elastic_django.signals import (
+    es_request, instrumented_connection_class, measure)
+from .models import Book
+
+
+class FakeConnection(Connection):
+    """
+    Connection answering with (or raising) the given responses in turn.
+    """
+    responses = []
+
+    def perform_request(self, method, url, params=None, body=None,
+                        timeout=None, ignore=(), headers=None):
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return 200, {}, response
+
+
+class AsyncFakeConnection(FakeConnection):
+    async def perform_request(self, *args, **kwargs):
+        return super(AsyncFakeConnection, self).perform_request(
+            *args, **kwargs)
+
+
+@patch('elastic_django.manager.get_client')
+class ESRequestSignalTestCase(TestCase):
+    def setUp(self):
+        self.book = Book(
+            pk=1, title='The Name of the Rose', author='Umberto Eco',
+            publication_year=1980)
+        self.receiver = MagicMock()
+        es_request.connect(self.receiver, dispatch_uid='test')
+        self.addCleanup(es_request.disconnect, dispatch_uid='test')
+
+    def test_index_object(self, client_mock):
+        """
+        Tests that indexing an object sends the signal with the request
+        timings and sizes.
+        """
+        connection = client_mock.return_value.connection
+        connection.index.return_value = {'result': 'created'}
+
+        Book.elastic.index_object(self.book)
+
+        self.assertEqual(self.receiver.call_count, 1)
+        kwargs = self.receiver.call_args[1]
+        self.assertIs(kwargs['sender'], Book)
+        self.assertEqual(kwargs['operation'], 'index')
+        self.assertEqual(kwargs['index'], 'testing-elasticdjango')
+        self.assertEqual(kwargs['docs'], 1)
+        self.assertEqual(kwargs['failed'], 0)
+        self.assertEqual(kwargs['retries'], 0)
+        self.assertGreaterEqual(kwargs['duration'], 0)
+        self.assertGreaterEqual(kwargs['serialization_time'], 0)
+        self.assertIsNone(kwargs['error'])
+
+    def test_error(self, client_mock):
+        """
+        Tests that failed requests are reported with their error.
+        """
+        error = ConnectionError('N/A', 'Down', None)
+        client_mock.return_value.connection.delete.side_effect = error
+
+        self.assertRaises(
+            ConnectionError, Book.elastic.remove_object, self.book)
+
+        kwargs = self.receiver.call_args[1]
+        self.assertEqual(kwargs['operation'], 'delete')
+        self.assertEqual(kwargs['failed'], 1)
+        self.assertIs(kwargs['error'], error)
+
+    @patch('elastic_django.manager.streaming_bulk')
+    def test_bulk(self, bulk_mock, client_mock):
+        """
+        Tests that the signal is sent once per ``_bulk`` request, with the
+        number of documents sent and failed.
+        """
+        def consume(connection, actions, **kwargs):
+            for action in actions:
+                yield action['_id'] != 2, {'index': {'_id': action['_id']}}
+
+        bulk_mock.side_effect = consume
+        books = [
+            Book(pk=i, title='Book {0}'.format(i), author='Anonymous',
+                 publication_year=2000)
+            for i in range(1, 4)
+        ]
+
+        ElasticManager().index_objects(books, chunk_size=2)
+
+        self.assertEqual(self.receiver.call_count, 2)
+        calls = [call[1] for call in self.receiver.call_args_list]
+        self.assertEqual([call['operation'] for call in calls], ['bulk'] * 2)
+        self.assertEqual([call['docs'] for call in calls], [2, 1])
+        self.assertEqual([call['failed'] for call in calls], [1, 0])
+        self.assertEqual(calls[0]['index'], 'testing-elasticdjango')
+
+    def test_search_took(self, client_mock):
+        """
+        Tests that searches report the time taken by the ES backend.
+        """
+        client_mock.return_value.connection.search.return_value = {
+            'took': 7, 'hits': {'total': 0, 'hits': []}}
+
+        len(Book.elastic.search(title='rose'))
+
+        kwargs = self.receiver.call_args[1]
+        self.assertEqual(kwargs['operation'], 'search')
+        self.assertEqual(kwargs['took'], 7)
+
+
+class ConnectionInstrumentationTestCase(TestCase):
+    """
+    Tests for the sizes and retries counted by instrumented connections.
+    """
+    def setUp(self):
+        self.receiver = MagicMock()
+        es_request.connect(self.receiver, dispatch_uid='test')
+        self.addCleanup(es_request.disconnect, dispatch_uid='test')
+
+        self.transport = Transport(
+            [{'host': 'localhost'}], max_retries=3,
+            connection_class=instrumented_connection_class(FakeConnection))
+        self.body = {'title': 'The Name of the Rose'}
+        self.encoded = '{"title":"The Name of the Rose"}'
+
+    def test_sizes(self):
+        """
+        Tests that the bodies sent and received are measured, as encoded by
+        the transport.
+        """
+        FakeConnection.responses = ['{"result":"created"}']
+
+        with measure(Book, 'index', 'books'):
+            self.transport.perform_request(
+                'PUT', '/books/Book/1', body=self.body)
+
+        kwargs = self.receiver.call_args[1]
+        self.assertEqual(kwargs['request_bytes'], len(self.encoded))
+        self.assertEqual(
+            kwargs['response_bytes'], len('{"result":"created"}'))
+        self.assertEqual(kwargs['retries'], 0)
+
+    @patch('elasticsearch.transport.time.sleep')
+    def test_retries(self, sleep_mock):
+        """
+        Tests that requests sent again after failed attempts are counted, with
+        their bodies.
+        """
+        error = ConnectionError('N/A', 'Down', None)
+        FakeConnection.responses = [error, error, '{"result":"created"}']
+
+        with measure(Book, 'index', 'books'):
+            self.transport.perform_request(
+                'PUT', '/books/Book/1', body=self.body)
+
+        kwargs = self.receiver.call_args[1]
+        self.assertEqual(kwargs['retries'], 2)
+        self.assertEqual(kwargs['request_bytes'], 3 * len(self.encoded))
+
+        FakeConnection.responses = [error] * 4
+        with self.assertRaises(ConnectionError):
+            with measure(Book, 'index', 'books'):
+                self.transport.perform_request(
+                    'PUT', '/books/Book/1', body=self.body)
+
+        kwargs = self.receiver.call_args[1]
+        self.assertEqual(kwargs['retries'], 3)
+        self.assertEqual(kwargs['response_bytes'], 0)
+        self.assertIs(kwargs['error'], error)
+
+    def test_async(self):
+        """
+        Tests that the requests of async connections are measured too.
+        """
+        connection = instrumented_connection_class(AsyncFakeConnection)()
+        FakeConnection.responses = ['{"result":"created"}']
+
+        async def run():
+            with measure(Book, 'index', 'books'):
+                await connection.perform_request(
+                    'PUT', '/books/Book/1', body=self.encoded)
+
+        async_to_sync(run)()
+
+        kwargs = self.receiver.call_args[1]
+        self.assertEqual(kwargs['request_bytes'], len(self.encoded))
+        self.assertEqual(
+            kwargs['response_bytes'], len('{"result":"created"}'))
+
+    @patch('elastic_django.signals._size')
+    def test_no_receivers(self, size_mock):
+        """
+        Tests that nothing is measured if nobody is listening.
+        """
+        es_request.disconnect(dispatch_uid='test')
+        FakeConnection.responses = ['{"result":"created"}']
+
+        with measure(Book, 'index', 'books'):
+            self.transport.perform_request(
+                'PUT', '/books/Book/1', body=self.body)
+
+        self.assertFalse(size_mock.called)
+
+    def test_cached_classes(self):
+        """
+        Tests that connection classes are only subclassed once.
+        """
+        instrumented = instrumented_connection_class(FakeConnection)
+
+        self.assertTrue(issubclass(instrumented, FakeConnection))
+        self.assertIs(
+            instrumented_connection_class(FakeConnection), instrumented)
+
+
+class ReceiversTestCase(TestCase):
+    def setUp(self):
+        self.kwargs = {
+            'operation': 'bulk', 'index': 'books', 'duration': 0.5,
+            'took': None, 'request_bytes': 2048, 'response_bytes': 512,
+            'retries': 1, 'docs': 10, 'failed': 2, 'serialization_time': 0.25,
+            'error': None,
+        }
+
+    def test_statsd(self):
+        """
+        Tests that metrics are reported as statsd timings and counters.
+        """
+        client = MagicMock()
+        receiver = StatsdReceiver(client, prefix='es').connect()
+        self.addCleanup(receiver.disconnect)
+
+        es_request.send(sender=Book, **self.kwargs)
+
+        timings = dict(call[0] for call in client.timing.call_args_list)
+        self.assertEqual(timings['es.bulk.duration'], 500)
+        self.assertEqual(timings['es.bulk.serialization'], 250)
+        self.assertEqual(timings['es.bulk.docs'], 10)
+        self.assertNotIn('es.bulk.took', timings)
+        client.incr.assert_any_call('es.bulk.requests')
+        client.incr.assert_any_call('es.bulk.retries', 1)
+        client.incr.assert_any_call('es.bulk.failed', 2)
+
+    def test_prometheus(self):
+        """
+        Tests that metrics are reported as Prometheus histograms and counters.
+        """
+        registry = CollectorRegistry()
+        receiver = PrometheusReceiver(registry=registry).connect()
+        self.addCleanup(receiver.disconnect)
+
+        es_request.send(sender=Book, **self.kwargs)
+        self.kwargs['error'] = ConnectionError('N/A', 'Down', None)
+        es_request.send(sender=Book, **self.kwargs)
+
+        labels = {'operation': 'bulk', 'index': 'books'}
+        self.assertEqual(registry.get_sample_value(
+            'elasticsearch_request_duration_seconds_count', labels), 2)
+        self.assertEqual(registry.get_sample_value(
+            'elasticsearch_request_docs_sum', labels), 20)
+        self.assertEqual(registry.get_sample_value(
+            'elasticsearch_retries_total', labels), 2)
+        self.assertEqual(registry.get_sample_value(
+            'elasticsearch_failed_docs_total', labels), 4)
+        self.assertEqual(registry.get_sample_value(
+            'elasticsearch_errors_total', labels), 1)
+
+    def test_disconnect(self):
+        """
+        Tests that disconnected receivers are not called anymore.
+        """
+        client = MagicMock()
+        StatsdReceiver(client).connect().disconnect()
+
+        es_request.send(sender=Book, **self.kwargs)
+
+        self.assertFalse(client.timing.called)
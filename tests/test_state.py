@@ -0,0 +1,40 @@
+import datetime
+from unittest import TestCase
+
+from mock import MagicMock
+
+from elastic_django.state import get_high_water_mark, set_high_water_mark
+from .models import Book
+
+
+class HighWaterMarkTestCase(TestCase):
+    def test_store_and_retrieve(self):
+        """
+        Tests that high-water marks are stored per index and model, in the
+        synchronization state index.
+        """
+        connection = MagicMock()
+        mark = datetime.datetime(2015, 6, 30, 22, 0, 0)
+
+        set_high_water_mark(
+            connection, 'testing-elasticdjango', Book, 'updated', mark)
+
+        kwargs = connection.index.call_args[1]
+        self.assertEqual(kwargs['index'], 'elastic-django-state')
+        self.assertEqual(kwargs['id'], 'testing-elasticdjango:tests.Book')
+        self.assertEqual(
+            kwargs['body']['high_water_mark'], '2015-06-30T22:00:00')
+
+        connection.get.return_value = {
+            'found': True, '_source': kwargs['body']}
+        self.assertEqual(
+            get_high_water_mark(connection, 'testing-elasticdjango', Book),
+            mark)
+
+    def test_not_found(self):
+        connection = MagicMock()
+        connection.get.return_value = {'found': False}
+
+        self.assertIsNone(
+            get_high_water_mark(connection, 'testing-elasticdjango', Book))
+        self.assertEqual(connection.get.call_args[1]['ignore'], 404)